@@ -1,18 +1,183 @@
 # import build in function to count
 from collections import Counter
+# import heap helper to pick the top k without sorting every element
+import heapq
+from array import array
+from operator import itemgetter
 
-def mostfrequent(nums,k):
+# numpy is optional: integer arrays are counted vectorized when it is installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-    # count frequency of each number 
+# use the heap when k is at most this fraction of the distinct elements
+HEAP_FRACTION = 1 / 16
+
+# count with bincount when the value range is at most this many times the length
+BINCOUNT_RANGE_FACTOR = 2
+
+# elements scanned at a time when looking for first occurrences
+FIRST_SCAN_CHUNK = 1 << 16
+
+# array typecodes numpy can count directly
+INTEGER_TYPECODES = "bBhHiIlLqQ"
+
+def mostfrequent(nums, k, strategy="auto"):
+
+    # return the k most frequent elements, most frequent first; elements
+    # with equal counts keep the order in which they first appear
+    if k <= 0:
+        return []
+
+    # pick a strategy from the input type, then from the distinct count
+    if strategy == "auto":
+        strategy = "numpy" if isintegerarray(nums) else None
+    if strategy == "numpy":
+        return topk_numpy(nums, k)
+    if strategy not in (None, "bucket", "heap"):
+        raise ValueError(f"unknown strategy '{strategy}', expected auto, bucket, heap or numpy")
+
+    # count frequency of each number (in order of first appearance)
     freq = Counter(nums)
 
-    # get common elements as per k
-    common = freq.most_common(k) 
+    # a heap pays off when k is small next to the distinct elements
+    if strategy is None:
+        strategy = "heap" if k <= len(freq) * HEAP_FRACTION else "bucket"
+    if strategy == "heap":
+        return topk_heap(freq, k)
+    return topk_bucket(freq, k)
+
+
+def isintegerarray(nums):
+
+    # integer numpy arrays and array.array, which numpy reads without copying
+    if np is None:
+        return False
+    if isinstance(nums, np.ndarray):
+        return nums.dtype.kind in "iu"
+    return isinstance(nums, array) and nums.typecode in INTEGER_TYPECODES
+
+
+def topk_heap(freq, k):
+
+    # O(d log k) over d distinct elements; nlargest is stable, so ties keep
+    # the counter's first-appearance order
+    common = heapq.nlargest(k, freq.items(), key=itemgetter(1))
 
     # extract elements
-    result = [item for item,count in common]
+    return [item for item, count in common]
+
+
+def topk_bucket(freq, k):
+
+    # O(d): group elements by count, each bucket in first-appearance order
+    buckets = {}
+    for item, count in freq.items():
+        buckets.setdefault(count, []).append(item)
 
-    # return frequent element
+    # take buckets from the highest count down (there are few distinct counts)
+    result = []
+    for count in sorted(buckets, reverse=True):
+        result.extend(buckets[count][:k - len(result)])
+        if len(result) == k:
+            break
     return result
 
 
+def topk_numpy(nums, k):
+
+    # vectorized path for integer input
+    if np is None:
+        raise ImportError("the numpy strategy needs NumPy installed")
+    values = np.asarray(nums)
+    if values.size == 0:
+        return []
+    if values.dtype.kind not in "iu":
+        raise ValueError("the numpy strategy needs integer elements")
+    values = values.ravel()
+
+    # dense value ranges count in O(n) with bincount, others by sorting
+    low, high = int(values.min()), int(values.max())
+    if high - low < BINCOUNT_RANGE_FACTOR * values.size + 1024:
+        # an element's slot is its offset from the minimum (computed in
+        # 64 bits, so small types cannot overflow)
+        if values.dtype.itemsize == 8:
+            slots = (values - values.dtype.type(low)).astype(np.intp, copy=False)
+        else:
+            slots = values.astype(np.intp) - low
+        counts = np.bincount(slots)
+        present = counts[counts > 0]
+        threshold = _threshold(present, k)
+        slotsof = None
+    else:
+        # only elements that can make the top k get a slot; the rest share
+        # a last slot counted 0, so the scan looks up a short sorted array
+        unique, counts = np.unique(values, return_counts=True)
+        present = counts
+        threshold = _threshold(present, k)
+        candidates = unique[counts >= threshold]
+        counts = np.append(counts[counts >= threshold], 0)
+        slots = values
+        slotsof = lambda chunk: _candidateslots(candidates, chunk)
+
+    # elements above the threshold all make the top k; those equal to it
+    # that first appear earliest fill the rest
+    above = int(np.count_nonzero(present > threshold))
+    positions = _firstpositions(slots, slotsof, counts, threshold, above, min(k, len(present)) - above)
+
+    # read the winners back at their first positions, in their own type
+    return values[positions].tolist()
+
+
+def _threshold(counts, k):
+
+    # the kth largest count (the smallest when there are k or fewer)
+    if k < len(counts):
+        return np.partition(counts, len(counts) - k)[len(counts) - k]
+    return counts.min()
+
+
+def _candidateslots(candidates, chunk):
+
+    # index of each element in the sorted candidates, or len(candidates)
+    slots = np.searchsorted(candidates, chunk)
+    slots[candidates[np.minimum(slots, len(candidates) - 1)] != chunk] = len(candidates)
+    return slots
+
+
+def _firstpositions(slots, slotsof, counts, threshold, aboveleft, tieleft):
+
+    # scan in input order, in chunks, until the elements above the threshold
+    # and enough of those equal to it have turned up; frequent elements
+    # usually all appear in the first chunk
+    seen = np.zeros(len(counts), dtype=bool)
+    foundslots, foundpositions = [], []
+    for start in range(0, len(slots), FIRST_SCAN_CHUNK):
+        chunk = slots[start:start + FIRST_SCAN_CHUNK]
+        if slotsof is not None:
+            chunk = slotsof(chunk)
+        hits = np.flatnonzero((counts[chunk] >= threshold) & ~seen[chunk])
+        if not hits.size:
+            continue
+
+        # first hit of each slot in this chunk, in input order
+        found, index = np.unique(chunk[hits], return_index=True)
+        order = np.argsort(index)
+        found, positions = found[order], start + hits[index[order]]
+        seen[found] = True
+
+        # keep elements equal to the threshold only while some are needed
+        tie = counts[found] == threshold
+        keep = ~tie
+        keep[np.flatnonzero(tie)[:tieleft]] = True
+        tieleft -= int(np.count_nonzero(keep & tie))
+        aboveleft -= int(np.count_nonzero(~tie))
+        foundslots.append(found[keep])
+        foundpositions.append(positions[keep])
+        if aboveleft == 0 and tieleft == 0:
+            break
+
+    # most frequent first, ties by first appearance
+    found, positions = np.concatenate(foundslots), np.concatenate(foundpositions)
+    return positions[np.lexsort((positions, -counts[found]))]
@@ -0,0 +1,155 @@
+# mostfrequent over files too large for one process: the file is memory
+# mapped, cut into chunks on record boundaries and counted in a process pool
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+import mmap
+import os
+import pickle
+import re
+import tempfile
+import zlib
+
+from freq_elements import HEAP_FRACTION, topk_bucket, topk_heap
+
+# smallest chunk handed to a worker (smaller files are counted in process)
+MIN_CHUNK = 8 << 20
+
+# chunks per worker, so a slow chunk does not hold up the others
+CHUNKS_PER_PROCESS = 2
+
+# token types a file can be read as
+PARSERS = {"bytes": None, "str": bytes.decode, "int": int}
+
+_WHITESPACE = re.compile(rb"\s")
+
+def mostfrequentfile(path, k, processes=None, separator=None, parse="bytes", tempdir=None):
+
+    # the k most frequent tokens of a file, like mostfrequent over them:
+    # tokens are separated by whitespace, or by separator (e.g. b"\n" for
+    # one record per line), and returned as bytes, str or int
+    if k <= 0:
+        return []
+    if parse not in PARSERS:
+        raise ValueError(f"unknown parse '{parse}', expected bytes, str or int")
+    processes = processes or os.cpu_count() or 1
+
+    # cut the file on record boundaries
+    chunks = filechunks(path, processes * CHUNKS_PER_PROCESS, separator)
+
+    # one process: add the chunk counts up and select as mostfrequent does
+    if processes == 1 or len(chunks) < 2:
+        freq = Counter()
+        for start, end in chunks:
+            freq.update(countchunk(path, start, end, separator, parse))
+        if k <= len(freq) * HEAP_FRACTION:
+            return topk_heap(freq, k)
+        return topk_bucket(freq, k)
+
+    # several: each worker counts chunks and spills their counts split into
+    # one shard per worker; then each worker adds up one shard across all
+    # chunks and returns its top k, so no single process merges everything
+    with tempfile.TemporaryDirectory(dir=tempdir) as directory, ProcessPoolExecutor(processes) as pool:
+        jobs = [(path, start, end, separator, parse, directory, index, processes)
+                for index, (start, end) in enumerate(chunks)]
+        list(pool.map(_countshards, jobs))
+        best = []
+        for candidates in pool.map(_reduceshard, [(directory, shard, len(chunks), k) for shard in range(processes)]):
+            best.extend(candidates)
+
+    # most frequent first, ties by first appearance (chunk, then place in it)
+    best.sort(key=lambda candidate: (-candidate[0], candidate[1], candidate[2]))
+    return [token for count, chunk, position, token in best[:k]]
+
+
+def filechunks(path, count, separator=None):
+
+    # (start, end) byte ranges of about count chunks of at least MIN_CHUNK,
+    # each ending just after a separator (or whitespace) or at the file end
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    step = max(MIN_CHUNK, -(-size // count))
+    chunks = []
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            end = _nextboundary(data, start + step, separator) if start + step < size else size
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def countchunk(path, start, end, separator=None, parse="bytes"):
+
+    # count the tokens of one chunk, in order of first appearance; the file
+    # is mapped here, so workers are sent offsets rather than data
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        counts = Counter(data[start:end].split(separator))
+
+    # a chunk ending in a separator splits off an empty token
+    counts.pop(b"", None)
+
+    # parse each distinct token once; equal values spelt differently add up
+    parser = PARSERS[parse]
+    if parser is None:
+        return counts
+    parsed = Counter()
+    for token, count in counts.items():
+        value = parser(token)
+        parsed[value] = parsed.get(value, 0) + count
+    return parsed
+
+
+def _nextboundary(data, position, separator):
+    # first position after a separator at or past position
+    if separator is None:
+        found = _WHITESPACE.search(data, position)
+        return found.end() if found else len(data)
+    found = data.find(separator, position)
+    return found + len(separator) if found >= 0 else len(data)
+
+
+def _shardof(token, shards):
+    # the same shard in every process (hash() of str and bytes is not)
+    if isinstance(token, int):
+        return token % shards
+    if isinstance(token, str):
+        token = token.encode("utf-8", "surrogatepass")
+    return zlib.crc32(token) % shards
+
+
+def _countshards(job):
+
+    # map step: count a chunk and write one file per shard, keeping each
+    # token's place in the chunk so ties can be ordered later
+    path, start, end, separator, parse, directory, index, shards = job
+    parts = [({}, array("q")) for _ in range(shards)]
+    for position, (token, count) in enumerate(countchunk(path, start, end, separator, parse).items()):
+        counts, positions = parts[_shardof(token, shards)]
+        counts[token] = count
+        positions.append(position)
+    for shard, part in enumerate(parts):
+        with open(os.path.join(directory, f"{index}-{shard}.pickle"), "wb") as file:
+            pickle.dump(part, file, pickle.HIGHEST_PROTOCOL)
+
+
+def _reduceshard(job):
+
+    # reduce step: add a shard up over the chunks in file order and return
+    # its k best as (count, first chunk, place in that chunk, token)
+    directory, shard, chunks, k = job
+    totals, first = {}, {}
+    for chunk in range(chunks):
+        with open(os.path.join(directory, f"{chunk}-{shard}.pickle"), "rb") as file:
+            counts, positions = pickle.load(file)
+        for (token, count), position in zip(counts.items(), positions):
+            total = totals.get(token)
+            if total is None:
+                totals[token] = count
+                first[token] = (chunk, position)
+            else:
+                totals[token] = total + count
+    best = heapq.nsmallest(k, totals.items(), key=lambda item: (-item[1], first[item[0]]))
+    return [(count, *first[token], token) for token, count in best]
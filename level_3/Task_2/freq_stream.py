@@ -0,0 +1,236 @@
+# streaming companion to mostfrequent: approximate top k in fixed memory
+from collections import Counter
+from hashlib import blake2b
+from itertools import count as sequence, islice
+from operator import index, itemgetter
+from array import array
+import heapq
+import math
+
+# items read from an iterator at a time
+CHUNK_SIZE = 1 << 16
+
+
+class SpaceSaving:
+
+    # Space-Saving summary: tracks at most capacity items; every item seen
+    # more than total / capacity times is tracked, and each tracked count
+    # overestimates the true count by at most its error
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # count any untracked item may have (nonzero after a merge)
+        self.floor = 0
+        # min-heap of (count, seq, item); entries for old counts are skipped
+        self.heap = []
+        self.seq = sequence()
+
+    def update(self, items):
+
+        # add a chunk of items, counting repeats once
+        for item, weight in Counter(_aslist(items)).items():
+            self.add(item, weight)
+
+    def add(self, item, weight=1):
+
+        # add weight occurrences of item
+        self.total += weight
+        current = self.counts.get(item)
+        if current is not None:
+            self._set(item, current + weight, self.errors[item])
+        elif len(self.counts) < self.capacity:
+            self._set(item, self.floor + weight, self.floor)
+        else:
+            # replace the least counted item; the newcomer may have been it
+            smallest, victim = self._popmin()
+            del self.counts[victim], self.errors[victim]
+            self._set(item, smallest + weight, smallest)
+
+    def minimum(self):
+
+        # largest count an untracked item can have
+        if len(self.counts) < self.capacity:
+            return self.floor
+        return self._peekmin()
+
+    def topk(self, k):
+
+        # (item, count, error) of the k largest counts; the true count lies
+        # between count - error and count, and ties keep tracking order
+        best = heapq.nlargest(k, self.counts.items(), key=itemgetter(1))
+        return [(item, count, self.errors[item]) for item, count in best]
+
+    def merge(self, other):
+
+        # summary of both streams: an item missing from one side may have
+        # had up to that side's minimum there, counted as count and error
+        merged = SpaceSaving(max(self.capacity, other.capacity))
+        lows = self.minimum(), other.minimum()
+        combined = {}
+        for item in list(self.counts) + [item for item in other.counts if item not in self.counts]:
+            combined[item] = (self.counts.get(item, lows[0]) + other.counts.get(item, lows[1]),
+                              self.errors.get(item, lows[0]) + other.errors.get(item, lows[1]))
+        for item, (total, error) in heapq.nlargest(merged.capacity, combined.items(), key=lambda entry: entry[1][0]):
+            merged._set(item, total, error)
+        merged.total = self.total + other.total
+        merged.floor = lows[0] + lows[1]
+        return merged
+
+    def _set(self, item, count, error):
+        self.counts[item] = count
+        self.errors[item] = error
+        heapq.heappush(self.heap, (count, next(self.seq), item))
+        # drop the entries of old counts once they outnumber the live ones
+        if len(self.heap) > 2 * self.capacity + 64:
+            self.heap = [(count, next(self.seq), item) for item, count in self.counts.items()]
+            heapq.heapify(self.heap)
+
+    def _peekmin(self):
+        while self.counts.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0]
+
+    def _popmin(self):
+        smallest = self._peekmin()
+        return smallest, heapq.heappop(self.heap)[2]
+
+
+class CountMinSketch:
+
+    # Count-Min sketch: estimates never undercount, and overcount by at most
+    # epsilon * total with probability 1 - delta. Hashing does not depend on
+    # the process, so sketches with the same shape and seed can be merged
+    # across machines. Items are ints, strings, bytes or have a stable repr
+
+    def __init__(self, epsilon=1e-4, delta=1e-3, seed=0):
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("epsilon and delta must be between 0 and 1")
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        if not 0 <= seed < 1 << 128:
+            raise ValueError("seed must be a 128-bit unsigned integer")
+        self.seed = seed
+        self.salt = seed.to_bytes(16, "little")
+        self.rows = [array("q", bytes(8 * self.width)) for _ in range(self.depth)]
+        self.total = 0
+
+    def update(self, items):
+
+        # add a chunk of items, hashing repeats once
+        for item, weight in Counter(_aslist(items)).items():
+            self.add(item, weight)
+
+    def add(self, item, weight=1):
+        self.total += weight
+        for row, column in zip(self.rows, self._columns(item)):
+            row[column] += weight
+
+    def estimate(self, item):
+
+        # smallest counter over the rows
+        return min(row[column] for row, column in zip(self.rows, self._columns(item)))
+
+    def merge(self, other):
+
+        # counters add up when both sketches hash alike
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("only sketches with the same epsilon, delta and seed can be merged")
+        merged = CountMinSketch.__new__(CountMinSketch)
+        merged.__dict__.update(self.__dict__)
+        merged.rows = [array("q", map(sum, zip(mine, theirs))) for mine, theirs in zip(self.rows, other.rows)]
+        merged.total = self.total + other.total
+        return merged
+
+    def _columns(self, item):
+
+        # one 128-bit hash split in two, combined per row (double hashing)
+        digest = blake2b(_key(item), digest_size=16, salt=self.salt).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + row * second) % self.width for row in range(self.depth)]
+
+
+class HeavyHitters:
+
+    # approximate top k over an unbounded stream in fixed memory: Space-Saving
+    # picks the candidates and Count-Min tightens their counts
+
+    def __init__(self, capacity=1000, epsilon=1e-4, delta=1e-3, seed=0):
+        self.summary = SpaceSaving(capacity)
+        self.sketch = CountMinSketch(epsilon, delta, seed)
+
+    @property
+    def total(self):
+        return self.summary.total
+
+    def update(self, items):
+
+        # add a chunk of items (a list, an iterable or an integer array)
+        for item, weight in Counter(_aslist(items)).items():
+            self.summary.add(item, weight)
+            self.sketch.add(item, weight)
+
+    def topk(self, k):
+
+        # (item, count, error) of the k most frequent items, most frequent
+        # first: the true count lies between count - error and count
+        ranked = []
+        for item, count, error in self.summary.topk(self.summary.capacity):
+            upper = min(count, self.sketch.estimate(item))
+            ranked.append((item, upper, upper - (count - error)))
+        return heapq.nlargest(k, ranked, key=itemgetter(1))
+
+    def merge(self, other):
+        merged = HeavyHitters.__new__(HeavyHitters)
+        merged.summary = self.summary.merge(other.summary)
+        merged.sketch = self.sketch.merge(other.sketch)
+        return merged
+
+
+def streamingmostfrequent(stream, k, capacity=None):
+
+    # approximate mostfrequent over any iterable, read in chunks, keeping
+    # at most capacity counters (10 per requested item by default)
+    if k <= 0:
+        return []
+    hitters = HeavyHitters(capacity or max(100, 10 * k))
+    for chunk in _chunks(stream):
+        hitters.update(chunk)
+
+    # extract elements
+    return [item for item, count, error in hitters.topk(k)]
+
+
+def _chunks(stream):
+    # arrays are sliced, anything else is read from its iterator
+    if hasattr(stream, "tolist"):
+        for start in range(0, len(stream), CHUNK_SIZE):
+            yield stream[start:start + CHUNK_SIZE]
+        return
+    iterator = iter(stream)
+    while True:
+        chunk = list(islice(iterator, CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _aslist(items):
+    # numpy arrays count much faster as python ints
+    return items.tolist() if hasattr(items, "tolist") else items
+
+
+def _key(item):
+    # bytes that do not change between runs (str hashes do)
+    if isinstance(item, str):
+        return b"s" + item.encode("utf-8", "surrogatepass")
+    if isinstance(item, bytes):
+        return b"b" + item
+    try:
+        return b"i" + str(index(item)).encode()
+    except TypeError:
+        return b"r" + repr(item).encode()
@@ -1,3 +1,5 @@
+import pytest
+
 # import result from freq_element
 from freq_elements import mostfrequent
 
@@ -23,3 +25,40 @@ def test_case6():
 
 def test_case7():
     assert mostfrequent([7, 10, 11, 5, 2, 5, 5, 7, 11, 8, 9], 1) == [5]
+
+def test_case8():
+    # equal counts keep the order of first appearance, whatever the strategy
+    for strategy in ("auto", "bucket", "heap"):
+        assert mostfrequent([4, 2, 2, 4, 9, 9, 1], 2, strategy) == [4, 2]
+
+def test_case9():
+    # numpy path agrees with the counter on integer arrays
+    np = pytest.importorskip("numpy")
+    nums = [7, 10, 11, 5, 2, 5, 5, 7, 11, 8, 9]
+    assert mostfrequent(np.array(nums), 3) == mostfrequent(nums, 3, "bucket") == [5, 7, 11]
+    assert mostfrequent(np.array(nums) * 10**12, 1) == [5 * 10**12]
+
+def test_case10():
+    # streaming counts bound the true counts, also after merging two halves
+    from collections import Counter
+    from freq_stream import HeavyHitters, streamingmostfrequent
+    nums = [i % 7 if i % 3 else 1 for i in range(3000)] + list(range(100, 600))
+    truth = Counter(nums)
+    halves = HeavyHitters(capacity=20), HeavyHitters(capacity=20)
+    halves[0].update(nums[:1700])
+    halves[1].update(iter(nums[1700:]))
+    merged = halves[0].merge(halves[1])
+    for item, count, error in merged.topk(5):
+        assert count - error <= truth[item] <= count
+    assert [item for item, count, error in merged.topk(2)] == mostfrequent(nums, 2) == [1, 2]
+    assert streamingmostfrequent(iter(nums), 2, capacity=20) == [1, 2]
+
+def test_case11(tmp_path, monkeypatch):
+    # file counted in small chunks by a pool matches mostfrequent
+    import freq_files
+    monkeypatch.setattr(freq_files, "MIN_CHUNK", 16)
+    nums = [7, 10, 11, 5, 2, 5, 5, 7, 11, 8, 9] * 20 + [11]
+    path = tmp_path / "nums.txt"
+    path.write_text("\n".join(map(str, nums)))
+    assert len(freq_files.filechunks(path, 8)) > 1
+    assert freq_files.mostfrequentfile(path, 3, processes=2, parse="int") == mostfrequent(nums, 3) == [5, 11, 7]
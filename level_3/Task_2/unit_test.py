@@ -1,8 +1,12 @@
 # import unittest
 import unittest
+import os
+import tempfile
 
 # import result from freq_element
 from freq_elements import mostfrequent
+from freq_stream import SpaceSaving, CountMinSketch
+from freq_files import mostfrequentfile
 
 # unittest to test 
 class mostfrequentelements(unittest.TestCase):
@@ -30,5 +34,41 @@ class mostfrequentelements(unittest.TestCase):
     def testcase7(self):
         self.assertEqual(mostfrequent([7, 10, 11, 5, 2, 5, 5, 7, 11, 8, 9], 1), [5])
 
+    def testcase8(self):
+        # equal counts keep the order of first appearance, whatever the strategy
+        for strategy in ("auto", "bucket", "heap"):
+            self.assertEqual(mostfrequent([4, 2, 2, 4, 9, 9, 1], 2, strategy), [4, 2])
+
+    def testcase9(self):
+        # unknown strategies are rejected
+        with self.assertRaises(ValueError):
+            mostfrequent([1, 2], 1, "sort")
+
+    def testcase10(self):
+        # space saving keeps every frequent item within its error bound
+        summary = SpaceSaving(3)
+        summary.update([1, 2, 1, 3, 4, 1, 5, 1, 2])
+        item, count, error = summary.topk(1)[0]
+        self.assertEqual(item, 1)
+        self.assertLessEqual(count - error, 4)
+        self.assertGreaterEqual(count, 4)
+
+    def testcase11(self):
+        # count-min sketches with the same seed merge by adding counters
+        left, right = CountMinSketch(0.01, 0.01), CountMinSketch(0.01, 0.01)
+        left.update(["a", "a", "b"])
+        right.update(["a", "c"])
+        self.assertGreaterEqual(left.merge(right).estimate("a"), 3)
+        with self.assertRaises(ValueError):
+            left.merge(CountMinSketch(0.01, 0.01, seed=1))
+
+    def testcase12(self):
+        # tokens of a file, split on whitespace, keep first-appearance ties
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tokens.txt")
+            with open(path, "w") as file:
+                file.write("b a\tc a\nb\n")
+            self.assertEqual(mostfrequentfile(path, 2, processes=1, parse="str"), ["b", "a"])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,23 +1,66 @@
 import json
-from typing import Dict, List, Union, Any
+import os
+import threading
+from typing import Dict, List, Union, Any, Tuple
+
+# Parsed documents shared by LoadJsonFileShared, by absolute path, with the
+# file signature they were parsed from; least recently used first
+PARSE_CACHE_SIZE = 4
+_parseCache: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+_parseCacheLock = threading.Lock()
+
+def _FileSignature(path: str) -> Tuple[int, int, int]:
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def _ParseJsonFile(filename: str, path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File '{filename}' not found.")
+    except json.JSONDecodeError:
+        raise ValueError(f"File '{filename}' contains invalid JSON.")
 
 def LoadJsonFile(filename: str) -> Dict[str, Any]:
     """
     Load and parse JSON data from a file.
+    Every call parses the file, so the caller owns the document and may
+    change it; callers that only read should use LoadJsonFileShared.
     Raises errors if the file is not found or contains invalid JSON.
     """
+    return _ParseJsonFile(filename, os.path.abspath(filename))
+
+def LoadJsonFileShared(filename: str) -> Dict[str, Any]:
+    """
+    Load and parse JSON data from a file for reading only.
+    The parsed document is cached and returned to every caller until the
+    file's mtime, size or inode changes, including when another process
+    writes it, so it must not be changed. The PARSE_CACHE_SIZE most
+    recently loaded files are kept.
+    Raises the same errors as LoadJsonFile.
+    """
+    path = os.path.abspath(filename)
     try:
-        with open(filename, 'r') as file:
-            return json.load(file)
+        # Stat before reading: a write racing the read only costs a re-parse later
+        signature = _FileSignature(path)
     except FileNotFoundError:
         raise FileNotFoundError(f"File '{filename}' not found.")
-    except json.JSONDecodeError:
-        raise ValueError(f"File '{filename}' contains invalid JSON.")
+    with _parseCacheLock:
+        cached = _parseCache.pop(path, None)
+    if cached is None or cached[0] != signature:
+        cached = (signature, _ParseJsonFile(filename, path))
+    with _parseCacheLock:
+        _parseCache[path] = cached
+        while len(_parseCache) > PARSE_CACHE_SIZE:
+            del _parseCache[next(iter(_parseCache))]
+    return cached[1]
 
 def SaveJsonFile(filename: str, data: Dict[str, Any]) -> None:
     """
     Save dictionary data back to a JSON file with pretty formatting (indentation).
     """
+    _parseCache.pop(os.path.abspath(filename), None)
     with open(filename, 'w') as file:
         json.dump(data, file, indent=4)
 
@@ -7,6 +7,7 @@ import logging
 # Import student-related functions from json_handler
 from json_handler import (
     LoadJsonFile,
+    LoadJsonFileShared,
     SaveJsonFile,
     AddStudent,
     RemoveStudent,
@@ -62,8 +63,8 @@ def CreateStudent(student: StudentModel):
 @router.get("/api/students")
 def GetStudents(studentId: Optional[int] = None, courseCode: Optional[str] = None):
     try:
-        # Load student data from the file
-        data = LoadJsonFile(DATA_FILE)
+        # Load student data from the file; shared, as nothing here changes it
+        data = LoadJsonFileShared(DATA_FILE)
 
         # Return individual student details if ID is provided
         if studentId is not None:
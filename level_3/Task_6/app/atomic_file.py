@@ -0,0 +1,164 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# fcntl is POSIX only; elsewhere files are not locked between processes
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Buffer between the writer and the file, so the checksum is updated in large blocks
+_BUFFER_SIZE = 1 << 20
+
+# Lock files this process holds, open for as long as it runs
+_heldLocks: Dict[str, Any] = {}
+_heldLocksGuard = threading.Lock()
+
+class _ChecksumStream(io.RawIOBase):
+    """
+    Raw file stream that hashes every byte written through it.
+    """
+
+    def __init__(self, raw: io.FileIO):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        written = self.raw.write(data)
+        self.digest.update(memoryview(data)[:written])
+        return written
+
+    def close(self) -> None:
+        if not self.closed:
+            self.raw.close()
+        super().close()
+
+def ChecksumFile(filename: str) -> str:
+    """
+    Return the name of the checksum file kept beside a file.
+    """
+    return filename + '.sha256'
+
+def SyncDirectory(directory: str) -> None:
+    """
+    Make renames in a directory durable (a no-op where directories cannot be opened).
+    """
+    try:
+        descriptor = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+def _ReplaceFile(source: str, target: str, content: Optional[bytes] = None) -> None:
+    # Write content (if given) to source durably, then rename it over target
+    if content is not None:
+        with open(source, 'wb') as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(source, target)
+
+@contextmanager
+def AtomicWrite(filename: str, binary: bool = False) -> Iterator[Any]:
+    """
+    Write a file so that readers only ever see the old or the new content.
+    The content goes to a temporary file beside the target, which is
+    fsynced and renamed over it once the block completes; its SHA-256 is
+    written to ChecksumFile(filename) the same way, in `sha256sum -c`
+    format. If the block raises, the target is left untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    descriptor, tempFile = tempfile.mkstemp(prefix='.' + os.path.basename(filename) + '.', suffix='.tmp', dir=directory)
+    try:
+        # Keep the permissions of the file being replaced (mkstemp creates it private)
+        try:
+            os.chmod(tempFile, os.stat(filename).st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(tempFile, 0o644)
+        stream = _ChecksumStream(io.FileIO(descriptor, 'wb'))
+        buffered = io.BufferedWriter(stream, _BUFFER_SIZE)
+        file = buffered if binary else io.TextIOWrapper(buffered, encoding='utf-8', newline='')
+        with file:
+            yield file
+            file.flush()
+            os.fsync(descriptor)
+        # The data is renamed first; a crash before the checksum follows
+        # leaves a stale checksum, which readers treat as a warning
+        _ReplaceFile(tempFile, filename)
+        checksum = f"{stream.digest.hexdigest()}  {os.path.basename(filename)}\n".encode()
+        _ReplaceFile(tempFile + '.sha256', ChecksumFile(filename), checksum)
+        SyncDirectory(directory)
+    finally:
+        for leftover in (tempFile, tempFile + '.sha256'):
+            try:
+                os.remove(leftover)
+            except FileNotFoundError:
+                pass
+
+def VerifyChecksum(filename: str) -> Optional[bool]:
+    """
+    Check a file against its checksum file.
+    Returns None when there is no checksum file (e.g. a file written by hand).
+    """
+    try:
+        with open(ChecksumFile(filename), 'r') as file:
+            expected = file.read().split()[0]
+    except (FileNotFoundError, IndexError):
+        return None
+    digest = hashlib.sha256()
+    try:
+        with open(filename, 'rb') as file:
+            while True:
+                block = file.read(_BUFFER_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    if digest.hexdigest() != expected:
+        logging.warning(f"File '{filename}' does not match its checksum in '{ChecksumFile(filename)}'.")
+        return False
+    return True
+
+def LockFile(filename: str) -> str:
+    """
+    Return the name of the lock file kept beside a file.
+    """
+    return filename + '.lock'
+
+def LockForProcess(filename: str) -> bool:
+    """
+    Take an exclusive lock on a file's lock file for the rest of the process.
+    Returns False when another process holds it; taking it again in the same
+    process succeeds, so several objects of one process may share the file.
+    """
+    path = os.path.abspath(LockFile(filename))
+    with _heldLocksGuard:
+        if path in _heldLocks:
+            return True
+        if fcntl is None:
+            logging.warning(f"Cannot lock '{path}' on this platform; run a single process over it.")
+            _heldLocks[path] = None
+            return True
+        file = open(path, 'a')
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            return False
+        _heldLocks[path] = file
+        return True
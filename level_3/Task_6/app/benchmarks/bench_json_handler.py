@@ -0,0 +1,308 @@
+"""
+Time the json_handler operations on generated datasets and record wall
+time, peak RSS and allocations per operation as JSON, so runs from two
+commits can be compared.
+
+Every dataset size is measured on the plain dict returned by LoadJsonFile
+and, when the handler has one, on a StudentStore (where LoadJsonFile and
+SaveJsonFile stand for StudentStore.Load and StudentStore.Compact, and
+each change includes its journal commit).
+Allocations are counted in a second, traced pass, so tracing does not
+slow the timed pass down.
+
+Run from the app directory:
+    python -m benchmarks.bench_json_handler --sizes 1000,100000,1000000
+    python -m benchmarks.bench_json_handler --compare benchmarks/results/<older>.json
+Another json_handler can be measured by path, e.g. --handler ../../Task_3/json_handler.py
+"""
+import argparse
+import gc
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.student_generator import COURSE_CATALOGUE, DatasetFile, GenerateStudents
+
+OPERATIONS = ['LoadJsonFile', 'SaveJsonFile', 'GetStudentDetails', 'GetCourseStudents',
+              'UpdateStudentGrade', 'AddStudent', 'RemoveStudent']
+
+# Ratio above which --compare flags an operation as slower
+REGRESSION_RATIO = 1.2
+
+def LoadHandler(name: str) -> Any:
+    # A module name, or the path of a json_handler.py from another task
+    if name.endswith('.py'):
+        spec = importlib.util.spec_from_file_location('bench_handler', name)
+        module = importlib.util.module_from_spec(spec)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(name)))
+        spec.loader.exec_module(module)
+        return module
+    return importlib.import_module(name)
+
+def ResetPeakRss() -> bool:
+    # Linux lets a process reset its peak RSS (VmHWM); elsewhere the peak is process-wide
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+def PeakRss() -> int:
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def GitCommit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Subject:
+    """
+    One dataset under test, as a plain dict or a StudentStore, with the
+    call for each operation. Arguments are drawn from a seeded RNG, so
+    every run makes the same calls.
+    """
+
+    def __init__(self, handler: Any, mode: str, dataFile: str, workDir: str, size: int, seed: int):
+        self.handler = handler
+        self.mode = mode
+        self.dataFile = dataFile
+        self.saveFile = os.path.join(workDir, f"save-{mode}-{size}.json")
+        self.rng = random.Random(seed)
+        self.ids = list(range(1, size + 1))
+        self.nextId = size + 1
+        self.store = None
+        self.data: Any = None
+        self.Load()
+
+    def Load(self) -> None:
+        if self.mode == 'store':
+            workFile = self.saveFile
+            if self.store is None:
+                # Work on a copy, so compaction does not rewrite the shared dataset
+                shutil.copyfile(self.dataFile, workFile)
+            else:
+                self.Close()
+            self.store = self.handler.StudentStore(workFile, compactEvery=sys.maxsize)
+            self.store.Load()
+            self.data = self.store
+        else:
+            # Older handlers cache inside LoadJsonFile: drop the cache, so
+            # every load reads and parses the file
+            getattr(self.handler, '_parseCache', {}).clear()
+            self.data = self.handler.LoadJsonFile(self.dataFile)
+
+    def Save(self) -> None:
+        if self.mode == 'store':
+            self.store.Compact()
+        else:
+            self.handler.SaveJsonFile(self.saveFile, self.data)
+
+    def Call(self, operation: str) -> Callable[[], Any]:
+        """
+        Return a call of the operation with fresh arguments; drawing them is not timed.
+        """
+        handler, data, rng = self.handler, self.data, self.rng
+        if operation == 'LoadJsonFile':
+            return self.Load
+        if operation == 'SaveJsonFile':
+            return self.Save
+        if operation == 'GetStudentDetails':
+            studentId = rng.choice(self.ids)
+            return lambda: handler.GetStudentDetails(data, studentId)
+        if operation == 'GetCourseStudents':
+            code = rng.choice(COURSE_CATALOGUE)[0]
+            return lambda: handler.GetCourseStudents(data, code)
+        if operation == 'UpdateStudentGrade':
+            student = handler.GetStudentDetails(data, rng.choice(self.ids))
+            code = rng.choice(student['courses'])['code']
+            grade = rng.choice(['A', 'B', 'C'])
+            return self._Committed(lambda: handler.UpdateStudentGrade(data, student['id'], code, grade))
+        if operation == 'AddStudent':
+            student = next(GenerateStudents(1, seed=self.nextId))
+            student['id'] = self.nextId
+            self.ids.append(self.nextId)
+            self.nextId += 1
+            return self._Committed(lambda: handler.AddStudent(data, student))
+        if operation == 'RemoveStudent':
+            studentId = self.ids.pop(rng.randrange(len(self.ids)))
+            return self._Committed(lambda: handler.RemoveStudent(data, studentId))
+        raise ValueError(f"Unknown operation '{operation}'.")
+
+    def _Committed(self, mutation: Callable[[], Any]) -> Callable[[], Any]:
+        # A store change is only done once it is in the journal
+        if self.mode != 'store':
+            return mutation
+        store = self.store
+
+        def MutateAndCommit():
+            mutation()
+            store.Commit()
+        return MutateAndCommit
+
+    def Close(self) -> None:
+        if self.store is not None:
+            self.store.WaitForCompaction()
+            self.store.writer.Stop()
+
+def Percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def Measure(subject: Subject, operation: str, calls: int, traceCalls: int) -> Dict[str, Any]:
+    # Timed pass
+    gc.collect()
+    rssReset = ResetPeakRss()
+    timings = []
+    for _ in range(calls):
+        call = subject.Call(operation)
+        start = time.perf_counter_ns()
+        call()
+        timings.append((time.perf_counter_ns() - start) / 1e6)
+    peakRss = PeakRss()
+
+    # Traced pass: allocation peak, net bytes and net blocks per call
+    allocPeak = allocNet = allocBlocks = None
+    if traceCalls:
+        gc.collect()
+        tracemalloc.start()
+        blocksBefore = sys.getallocatedblocks()
+        peak = 0
+        for _ in range(traceCalls):
+            call = subject.Call(operation)
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            call()
+            current, callPeak = tracemalloc.get_traced_memory()
+            peak = max(peak, callPeak - before)
+        allocNet = current / traceCalls
+        allocBlocks = (sys.getallocatedblocks() - blocksBefore) / traceCalls
+        allocPeak = peak
+        tracemalloc.stop()
+
+    return {
+        'calls': calls,
+        'wallSeconds': sum(timings) / 1000,
+        'meanMs': sum(timings) / calls,
+        'p50Ms': Percentile(timings, 0.5),
+        'p95Ms': Percentile(timings, 0.95),
+        'maxMs': max(timings),
+        'peakRssBytes': peakRss,
+        'peakRssIsPerOperation': rssReset,
+        'allocPeakBytes': allocPeak,
+        'allocNetBytesPerCall': allocNet,
+        'allocBlocksPerCall': allocBlocks,
+    }
+
+def CallCounts(operation: str, size: int, calls: int, repeat: int) -> int:
+    # Whole-dataset operations run a few times; lookups and changes many
+    if operation in ('LoadJsonFile', 'SaveJsonFile'):
+        return repeat
+    return calls
+
+def Run(args) -> Dict[str, Any]:
+    handler = LoadHandler(args.handler)
+    modes = ['dict'] + (['store'] if hasattr(handler, 'StudentStore') and not args.dict_only else [])
+    operations = args.operations.split(',') if args.operations else OPERATIONS
+    results = []
+    with tempfile.TemporaryDirectory() as workDir:
+        for size in (int(value) for value in args.sizes.split(',')):
+            dataFile = DatasetFile(args.data_dir or workDir, size, args.seed)
+            for mode in modes:
+                subject = Subject(handler, mode, dataFile, workDir, size, args.seed)
+                try:
+                    for operation in operations:
+                        calls = CallCounts(operation, size, args.calls, args.repeat)
+                        traceCalls = 0 if args.no_alloc else min(calls, args.trace_calls)
+                        result = Measure(subject, operation, calls, traceCalls)
+                        result.update({'size': size, 'mode': mode, 'operation': operation})
+                        results.append(result)
+                        print(f"{size:>9,} {mode:5} {operation:18} p50 {result['p50Ms']:10.3f} ms  "
+                              f"p95 {result['p95Ms']:10.3f} ms  peak RSS {result['peakRssBytes'] / 2**20:8.1f} MiB",
+                              flush=True)
+                finally:
+                    subject.Close()
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': GitCommit(),
+            'handler': args.handler,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+        },
+        'results': results
+    }
+
+def Compare(current: Dict[str, Any], previous: Dict[str, Any]) -> int:
+    """
+    Print the p50 ratio of every operation measured in both runs.
+    Returns the number of operations slower than REGRESSION_RATIO.
+    """
+    older = {(r['size'], r['mode'], r['operation']): r for r in previous['results']}
+    regressions = 0
+    print(f"\ncompared with {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')}):")
+    for result in current['results']:
+        before = older.get((result['size'], result['mode'], result['operation']))
+        if before is None or not before['p50Ms']:
+            continue
+        ratio = result['p50Ms'] / before['p50Ms']
+        flag = '  SLOWER' if ratio > REGRESSION_RATIO else ''
+        regressions += bool(flag)
+        print(f"{result['size']:>9,} {result['mode']:5} {result['operation']:18} "
+              f"{before['p50Ms']:10.3f} -> {result['p50Ms']:10.3f} ms  ({ratio:5.2f}x){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,100000', help="comma-separated student counts")
+    parser.add_argument('--operations', help="comma-separated subset of: " + ', '.join(OPERATIONS))
+    parser.add_argument('--calls', type=int, default=200, help="calls per lookup or change operation")
+    parser.add_argument('--repeat', type=int, default=3, help="calls per load or save")
+    parser.add_argument('--trace-calls', type=int, default=20, help="calls in the traced allocation pass")
+    parser.add_argument('--no-alloc', action='store_true', help="skip the traced allocation pass")
+    parser.add_argument('--dict-only', action='store_true', help="skip the StudentStore runs")
+    parser.add_argument('--handler', default='json_handler', help="module name or path of a json_handler.py")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', help="keep generated datasets here between runs")
+    parser.add_argument('--output', help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare with")
+    args = parser.parse_args()
+
+    report = Run(args)
+    output = args.output or os.path.join('benchmarks', 'results', f"{report['meta']['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+        if Compare(report, previous):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare GET /api/students requests/sec through FastAPI's default
+JSONResponse path, through DumpJson without caching, and through the
+pre-encoded response cache.
+
+Run from the app directory:
+    python -m benchmarks.bench_response_cache --students 10000 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+import students
+import response_cache
+from json_handler import StudentStore, SaveJsonStudents
+from response_cache import ResponseCache
+from student_repository import StudentRepository
+from benchmarks.student_generator import GenerateStudents
+
+async def RequestsPerSecond(app: FastAPI, path: str, params: dict, count: int) -> float:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        # Warm up (the cached path stores its entry here)
+        (await client.get(path, params=params)).raise_for_status()
+        start = time.perf_counter()
+        for _ in range(count):
+            (await client.get(path, params=params)).raise_for_status()
+        return count / (time.perf_counter() - start)
+
+async def Run(args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        dataFile = os.path.join(directory, "students_data.json")
+        SaveJsonStudents(dataFile, GenerateStudents(args.students))
+        store = StudentStore(dataFile)
+        store.Load()
+        students.repository = StudentRepository(store)
+
+        # The previous route: a plain dict through jsonable_encoder and JSONResponse
+        baseline = FastAPI()
+
+        @baseline.get("/api/students")
+        def GetStudents(courseCode: str = None):
+            if courseCode is not None:
+                return store.CourseStudents(courseCode)
+            return {"students": store.AllStudents()}
+
+        current = FastAPI()
+        current.include_router(students.router)
+
+        encoder = "orjson" if response_cache.orjson is not None else "json"
+        print(f"students: {args.students:,}  requests per case: {args.requests}  encoder: {encoder}")
+        for label, params in (("all students", {}), ("course roster", {"courseCode": "CS101"})):
+            students.responseCache = ResponseCache(maxEntries=0)
+            baselineRate = await RequestsPerSecond(baseline, "/api/students", params, args.requests)
+            encodedRate = await RequestsPerSecond(current, "/api/students", params, args.requests)
+            students.responseCache = ResponseCache()
+            cachedRate = await RequestsPerSecond(current, "/api/students", params, args.requests)
+            print(f"{label:14}  default: {baselineRate:9.1f} req/s  encoded: {encodedRate:9.1f} req/s  "
+                  f"cached: {cachedRate:9.1f} req/s  ({cachedRate / baselineRate:.1f}x)")
+        store.writer.Stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=200)
+    asyncio.run(Run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
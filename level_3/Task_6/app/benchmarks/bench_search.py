@@ -0,0 +1,72 @@
+"""
+Measure StudentSearchIndex build time and query latency.
+
+Run from the app directory:
+    python -m benchmarks.bench_search --students 1000000
+"""
+import argparse
+import random
+import time
+
+from student_search import StudentSearchIndex
+
+FIRST_NAMES = ['John', 'Emma', 'Liam', 'Olivia', 'Noah', 'Ava', 'Elijah', 'Sophia', 'James', 'Isabella',
+               'William', 'Mia', 'Benjamin', 'Charlotte', 'Lucas', 'Amelia', 'Henry', 'Harper', 'Mateo', 'Evelyn']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore']
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ten', 'vo', 'zu', 'an', 'el', 'is', 'or', 'pe', 'qui', 'sa', 'tor', 'ul']
+
+def MakeStudents(count: int, seed: int = 42):
+    # Common first names with a long tail of generated surnames
+    rng = random.Random(seed)
+    students = {}
+    for studentId in range(1, count + 1):
+        first = rng.choice(FIRST_NAMES)
+        if rng.random() < 0.3:
+            last = rng.choice(LAST_NAMES)
+        else:
+            last = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        students[studentId] = {
+            'id': studentId,
+            'name': f"{first} {last}",
+            'age': rng.randint(17, 30),
+            'courses': [],
+            'contact': {'email': f"{first}.{last}{studentId}@example.com".lower(), 'phone': ''}
+        }
+    return students
+
+def Percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    students = MakeStudents(args.students)
+    start = time.perf_counter()
+    index = StudentSearchIndex(students)
+    print(f"students: {args.students:,}  index build: {time.perf_counter() - start:.1f} s")
+
+    rng = random.Random(7)
+    sample = [students[rng.randint(1, args.students)] for _ in range(args.queries)]
+    cases = {
+        'common first name': lambda s: s['name'].split()[0],
+        'surname prefix': lambda s: s['name'].split()[1][:4],
+        'full name': lambda s: s['name'],
+        'email prefix': lambda s: s['contact']['email'][:len(s['contact']['email']) - 6],
+        'misspelt surname': lambda s: s['name'].split()[1][::-1][:2][::-1] + s['name'].split()[1][2:] + 'x',
+    }
+    for label, MakeQuery in cases.items():
+        timings = []
+        for student in sample:
+            query = MakeQuery(student)
+            start = time.perf_counter()
+            index.Search(query, 20)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{label:18}  p50: {Percentile(timings, 0.5):6.2f} ms  p99: {Percentile(timings, 0.99):6.2f} ms")
+
+if __name__ == '__main__':
+    main()
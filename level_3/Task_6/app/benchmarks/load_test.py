@@ -0,0 +1,306 @@
+"""
+Load-test main.app in process through httpx's ASGITransport and report
+throughput and latency percentiles per request type.
+
+Each of --concurrency clients sends requests back to back for --duration
+seconds, picking the next one at random from a weighted mix. Mongo and
+SMTP are replaced with local fakes: the users collection with the
+in-process FakeCollection from the tests, seeded with --users accounts,
+and SendRecoveryEmail with a stub that waits --smtp-latency seconds.
+Students are served by the JSON store (or --backend sqlite/mongo, the
+latter on a FakeCollection) from a generated dataset of --students.
+There is no network or server in the loop, so the numbers are the
+app's own capacity on this machine, an upper bound for a deployment.
+
+Run from the app directory:
+    python -m benchmarks.load_test --mix read-heavy --concurrency 32 --duration 30
+    python -m benchmarks.load_test --mix login --concurrency 16
+    python -m benchmarks.load_test --mix list-course:80,search:15,add-student:5 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+# The auth modules refuse to import without a secret
+os.environ.setdefault("SECRET_KEY", "load-test-secret")
+
+from httpx import AsyncClient, ASGITransport
+
+import auth_routes
+import students
+from main import app
+from mongo_config import get_user_collection
+from response_cache import ResponseCache
+from benchmarks.bench_json_handler import Percentile
+from benchmarks.student_generator import COURSE_CATALOGUE, COURSE_WEIGHTS, DatasetFile, GenerateStudents
+
+# The Mongo stand-in lives with the tests that it was written for
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test"))
+from fake_mongo import FakeCollection
+
+USER_PASSWORD = "LoadTest123!"
+
+# Named request mixes, as request type -> weight
+MIXES: Dict[str, Dict[str, int]] = {
+    "read-heavy": {"list-course": 90, "update-grade": 10},
+    "browse": {"page": 40, "get-student": 30, "search": 20, "course-stats": 10},
+    "write-heavy": {"update-grade": 50, "add-student": 25, "list-course": 25},
+    "login": {"login": 100},
+    "auth": {"login": 80, "me": 15, "reset-password": 5},
+}
+
+class LoadState:
+    """
+    What the clients share: the seeded students and users, and a counter
+    handing out new student IDs. Arguments are drawn from one seeded RNG
+    per client, so a run repeats with the same seed.
+    """
+
+    def __init__(self, studentList: List[Dict[str, Any]], userCount: int):
+        self.studentIds = [student['id'] for student in studentList]
+        self.courseCodes = {student['id']: [course['code'] for course in student['courses']]
+                            for student in studentList}
+        self.surnames = sorted({student['name'].split()[-1] for student in studentList})
+        self.userCount = userCount
+        self.nextId = max(self.studentIds, default=0) + 1
+        self.tokens: List[str] = []
+
+    def UserEmail(self, rng: random.Random) -> str:
+        return f"loaduser{rng.randrange(self.userCount)}@example.com"
+
+def _PopularCourse(rng: random.Random) -> str:
+    # Weighted like the generated enrolments, so popular courses are asked for most
+    return rng.choices(COURSE_CATALOGUE, weights=COURSE_WEIGHTS)[0][0]
+
+async def _ListCourse(client: AsyncClient, state: LoadState, rng: random.Random):
+    return await client.get("/api/students", params={"courseCode": _PopularCourse(rng)})
+
+async def _GetStudent(client: AsyncClient, state: LoadState, rng: random.Random):
+    return await client.get("/api/students", params={"studentId": rng.choice(state.studentIds)})
+
+async def _Page(client: AsyncClient, state: LoadState, rng: random.Random):
+    # Pages start after a cursor ID, so a random existing ID picks a random page
+    return await client.get("/api/students", params={"cursor": rng.choice(state.studentIds), "limit": 50})
+
+async def _CheckPaging(client: AsyncClient, state: LoadState) -> None:
+    # A page request the API ignores would measure the same first page every time
+    ordered = sorted(state.studentIds)
+    cursors = ordered[:1] + ordered[len(ordered) // 2:len(ordered) // 2 + 1]
+    firstIds = []
+    for cursor in cursors:
+        response = await client.get("/api/students", params={"cursor": cursor, "limit": 50})
+        response.raise_for_status()
+        firstIds.append(response.json()["students"][0]["id"])
+    if len(set(firstIds)) != len(cursors) or any(first <= cursor for first, cursor in zip(firstIds, cursors)):
+        raise RuntimeError(f"Paging with cursors {cursors} returned pages starting at {firstIds}.")
+
+async def _Search(client: AsyncClient, state: LoadState, rng: random.Random):
+    surname = rng.choice(state.surnames)
+    return await client.get("/api/students/search", params={"q": surname[:rng.randint(2, len(surname))]})
+
+async def _CourseStats(client: AsyncClient, state: LoadState, rng: random.Random):
+    return await client.get(f"/api/courses/{_PopularCourse(rng)}/stats")
+
+async def _UpdateGrade(client: AsyncClient, state: LoadState, rng: random.Random):
+    studentId = rng.choice(state.studentIds)
+    payload = {"courseCode": rng.choice(state.courseCodes[studentId]), "newGrade": rng.choice("ABCDF")}
+    return await client.put(f"/api/students/{studentId}", json=payload)
+
+async def _AddStudent(client: AsyncClient, state: LoadState, rng: random.Random):
+    student = next(GenerateStudents(1, seed=state.nextId))
+    student['id'] = state.nextId
+    state.nextId += 1
+    return await client.post("/api/students", json=student)
+
+async def _Login(client: AsyncClient, state: LoadState, rng: random.Random):
+    response = await client.post("/auth/login", json={"Email": state.UserEmail(rng), "Password": USER_PASSWORD})
+    if response.status_code == 200 and len(state.tokens) < 1000:
+        state.tokens.append(response.json()["AccessToken"])
+    return response
+
+async def _Me(client: AsyncClient, state: LoadState, rng: random.Random):
+    if not state.tokens:
+        return await _Login(client, state, rng)
+    return await client.get("/auth/me", params={"token": rng.choice(state.tokens)})
+
+async def _ResetPassword(client: AsyncClient, state: LoadState, rng: random.Random):
+    return await client.post("/auth/reset-password", json={"Email": state.UserEmail(rng)})
+
+REQUEST_TYPES: Dict[str, Callable[[AsyncClient, LoadState, random.Random], Awaitable[Any]]] = {
+    "list-course": _ListCourse,
+    "get-student": _GetStudent,
+    "page": _Page,
+    "search": _Search,
+    "course-stats": _CourseStats,
+    "update-grade": _UpdateGrade,
+    "add-student": _AddStudent,
+    "login": _Login,
+    "me": _Me,
+    "reset-password": _ResetPassword,
+}
+AUTH_REQUEST_TYPES = {"login", "me", "reset-password"}
+
+def ParseMix(mix: str) -> Dict[str, int]:
+    """
+    Return the weights of a named mix or of a "type:weight,..." list.
+    """
+    if mix in MIXES:
+        return MIXES[mix]
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.strip().partition(":")
+        if name not in REQUEST_TYPES:
+            raise ValueError(f"Unknown request type '{name}', expected one of: {', '.join(REQUEST_TYPES)}.")
+        weights[name] = int(weight or 1)
+    return weights
+
+async def _SeedUsers(count: int) -> FakeCollection:
+    # Hashing is deliberately slow, so every account shares one hash
+    from auth_utils import HashPassword
+    users = FakeCollection("users")
+    hashed = HashPassword(USER_PASSWORD)
+    await users.insert_many([{"Username": f"LoadUser{i}", "Email": f"loaduser{i}@example.com", "HashedPassword": hashed}
+                             for i in range(count)])
+    return users
+
+async def _SendRecoveryEmail(email_to: str, token: str, latency: float = 0.0):
+    # Stands in for the SMTP round trip
+    await asyncio.sleep(latency)
+
+async def _CreateRepository(backend: str, dataFile: str, directory: str):
+    if backend == "json":
+        from json_handler import StudentStore
+        from student_repository import StudentRepository
+        return StudentRepository(StudentStore(dataFile))
+    if backend == "sqlite":
+        from sqlite_store import SqliteStudentStore
+        from student_repository import StudentRepository
+        return StudentRepository(SqliteStudentStore(os.path.join(directory, "students.db"), importFile=dataFile))
+    if backend == "mongo":
+        from mongo_students import MongoStudentRepository
+        collection = FakeCollection("students")
+        with open(dataFile) as file:
+            await collection.insert_many(json.load(file)["students"])
+        return MongoStudentRepository(collection, FakeCollection("counters"))
+    raise ValueError(f"Unknown backend '{backend}', expected 'json', 'sqlite' or 'mongo'.")
+
+async def _Client(client: AsyncClient, state: LoadState, weights: Dict[str, int], seed: int, deadline: float,
+                  samples: Dict[str, List[float]], errors: Dict[str, int]) -> None:
+    rng = random.Random(seed)
+    names, cumWeights = list(weights), []
+    for weight in weights.values():
+        cumWeights.append((cumWeights[-1] if cumWeights else 0) + weight)
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, cum_weights=cumWeights)[0]
+        start = time.perf_counter()
+        try:
+            response = await REQUEST_TYPES[name](client, state, rng)
+            failed = response.status_code >= 400
+        except Exception:
+            failed = True
+        samples[name].append((time.perf_counter() - start) * 1000)
+        errors[name] += failed
+
+async def RunLoad(args) -> Dict[str, Any]:
+    weights = ParseMix(args.mix)
+    with tempfile.TemporaryDirectory() as directory:
+        dataFile = os.path.join(directory, "students_data.json")
+        shutil.copyfile(DatasetFile(args.data_dir or directory, args.students, args.seed), dataFile)
+        state = LoadState(list(GenerateStudents(args.students, args.seed)), args.users)
+
+        repository = await _CreateRepository(args.backend, dataFile, directory)
+        await repository.Start()
+        originals = (students.repository, students.responseCache, auth_routes.SendRecoveryEmail)
+        students.repository, students.responseCache = repository, ResponseCache()
+        auth_routes.SendRecoveryEmail = lambda email_to, token: _SendRecoveryEmail(email_to, token, args.smtp_latency)
+        if AUTH_REQUEST_TYPES & set(weights):
+            users = await _SeedUsers(args.users)
+            app.dependency_overrides[get_user_collection] = lambda: users
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://load", timeout=None) as client:
+                if "page" in weights:
+                    await _CheckPaging(client, state)
+
+                # Warm up caches and lazy loading outside the measurement
+                warmup = {name: [] for name in weights}
+                await asyncio.gather(*(_Client(client, state, weights, args.seed + 10_000 + i,
+                                               time.perf_counter() + args.warmup, warmup, dict.fromkeys(weights, 0))
+                                       for i in range(args.concurrency)))
+
+                samples: Dict[str, List[float]] = {name: [] for name in weights}
+                errors: Dict[str, int] = dict.fromkeys(weights, 0)
+                start = time.perf_counter()
+                await asyncio.gather(*(_Client(client, state, weights, args.seed + i, start + args.duration,
+                                               samples, errors)
+                                       for i in range(args.concurrency)))
+                elapsed = time.perf_counter() - start
+        finally:
+            await repository.Stop()
+            students.repository, students.responseCache, auth_routes.SendRecoveryEmail = originals
+            app.dependency_overrides.pop(get_user_collection, None)
+
+    allSamples = [value for values in samples.values() for value in values]
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "elapsedSeconds": elapsed,
+        "total": _Summary(allSamples, sum(errors.values()), elapsed),
+        "requests": {name: _Summary(samples[name], errors[name], elapsed) for name in weights},
+    }
+
+def _Summary(latencies: List[float], errorCount: int, elapsed: float) -> Dict[str, Any]:
+    if not latencies:
+        return {"count": 0, "errors": errorCount, "perSecond": 0.0}
+    return {
+        "count": len(latencies),
+        "errors": errorCount,
+        "perSecond": len(latencies) / elapsed,
+        "p50Ms": Percentile(latencies, 0.50),
+        "p90Ms": Percentile(latencies, 0.90),
+        "p99Ms": Percentile(latencies, 0.99),
+        "maxMs": max(latencies),
+    }
+
+def PrintReport(report: Dict[str, Any]) -> None:
+    rows: List[Tuple[str, Dict[str, Any]]] = list(report["requests"].items()) + [("total", report["total"])]
+    print(f"{'request':15} {'count':>8} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, summary in rows:
+        if not summary["count"]:
+            print(f"{name:15} {0:>8} {summary['errors']:>7}")
+            continue
+        print(f"{name:15} {summary['count']:>8,} {summary['errors']:>7,} {summary['perSecond']:>9,.0f} "
+              f"{summary['p50Ms']:>9.2f} {summary['p90Ms']:>9.2f} {summary['p99Ms']:>9.2f} {summary['maxMs']:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default="read-heavy",
+                        help=f"one of {', '.join(MIXES)}, or type:weight pairs of: {', '.join(REQUEST_TYPES)}")
+    parser.add_argument("--concurrency", type=int, default=16, help="clients sending requests at once")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before the run")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000, help="accounts in the fake users collection")
+    parser.add_argument("--backend", default="json", choices=["json", "sqlite", "mongo"])
+    parser.add_argument("--smtp-latency", type=float, default=0.05, help="seconds the fake SMTP send takes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", help="keep generated datasets here between runs")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    # The app logs at INFO; one line per request would swamp the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = asyncio.run(RunLoad(args))
+    PrintReport(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Deterministic generator of realistic student datasets for benchmarks.
+
+Courses follow a Zipf-like popularity over a catalogue of departments,
+most students take three or four courses, and grades and ages cluster the
+way they do in practice. Students are generated one after another from a
+single seeded RNG, so the first 1,000 students of a 1M dataset are the
+1k dataset.
+
+Write a dataset file from the app directory:
+    python -m benchmarks.student_generator --students 100000 --output students_100k.json
+"""
+import argparse
+import os
+import random
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Tuple
+
+from json_handler import SaveJsonStudents
+
+# The dashboard's courses first, so the most popular ones are those the UI offers
+COURSE_CATALOGUE: List[Tuple[str, str]] = [
+    ('CS101', 'Introduction to Programming'),
+    ('MT102', 'Mathematics'),
+    ('EN101', 'English Literature'),
+    ('PH201', 'Physics'),
+    ('CS202', 'Data Structures'),
+    ('CH101', 'Chemistry'),
+    ('MT201', 'Linear Algebra'),
+    ('BI101', 'Biology'),
+    ('EC101', 'Microeconomics'),
+    ('CS301', 'Algorithms'),
+    ('HI101', 'World History'),
+    ('MT301', 'Probability'),
+    ('PH301', 'Quantum Mechanics'),
+    ('CS310', 'Databases'),
+    ('EC201', 'Macroeconomics'),
+    ('BI201', 'Genetics'),
+    ('CH201', 'Organic Chemistry'),
+    ('EN201', 'Creative Writing'),
+    ('CS320', 'Operating Systems'),
+    ('PS101', 'Psychology'),
+    ('CS330', 'Computer Networks'),
+    ('MT401', 'Numerical Analysis'),
+    ('HI201', 'Modern History'),
+    ('PH401', 'Astrophysics'),
+    ('CS410', 'Machine Learning'),
+    ('AR101', 'Art History'),
+    ('MU101', 'Music Theory'),
+    ('PL101', 'Philosophy'),
+    ('LA101', 'Latin'),
+    ('CS450', 'Compilers'),
+]
+# Relative popularity of the catalogue, falling off with rank
+COURSE_WEIGHTS = [1 / (rank + 1) ** 0.8 for rank in range(len(COURSE_CATALOGUE))]
+
+COURSES_PER_STUDENT = [1, 2, 3, 4, 5, 6]
+COURSES_PER_STUDENT_WEIGHTS = [10, 20, 30, 25, 10, 5]
+
+GRADES = ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D', 'F', 'N/A']
+GRADE_WEIGHTS = [4, 10, 10, 14, 16, 12, 10, 9, 5, 5, 3, 2]
+
+AGES = list(range(17, 31))
+AGE_WEIGHTS = [2, 12, 18, 18, 16, 12, 7, 5, 3, 2, 2, 1, 1, 1]
+
+FIRST_NAMES = ['John', 'Emma', 'Liam', 'Olivia', 'Noah', 'Ava', 'Elijah', 'Sophia', 'James', 'Isabella',
+               'William', 'Mia', 'Benjamin', 'Charlotte', 'Lucas', 'Amelia', 'Henry', 'Harper', 'Mateo',
+               'Evelyn', 'Priya', 'Wei', 'Fatima', 'Yuki', 'Omar', 'Chloe', 'Arjun', 'Sofia', 'Kwame', 'Ines']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor',
+              'Moore', 'Nguyen', 'Patel', 'Kim', 'Chen', 'Singh', 'Okafor', 'Kowalski', 'Rossi', 'Sato']
+
+def GenerateStudents(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """
+    Yield count students with IDs 1..count in the shape of the data file.
+    """
+    rng = random.Random(seed)
+    # Cumulative weights, so each draw does not have to add them up again
+    courseIndexes = range(len(COURSE_CATALOGUE))
+    courseWeights = list(accumulate(COURSE_WEIGHTS))
+    countWeights = list(accumulate(COURSES_PER_STUDENT_WEIGHTS))
+    gradeWeights = list(accumulate(GRADE_WEIGHTS))
+    ageWeights = list(accumulate(AGE_WEIGHTS))
+    for studentId in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        courseCount = rng.choices(COURSES_PER_STUDENT, cum_weights=countWeights)[0]
+        # Draw by popularity without repeats
+        picked: Dict[int, None] = {}
+        while len(picked) < courseCount:
+            picked[rng.choices(courseIndexes, cum_weights=courseWeights)[0]] = None
+        yield {
+            'id': studentId,
+            'name': f"{first} {last}",
+            'age': rng.choices(AGES, cum_weights=ageWeights)[0],
+            'courses': [
+                {'code': COURSE_CATALOGUE[index][0], 'name': COURSE_CATALOGUE[index][1],
+                 'grade': rng.choices(GRADES, cum_weights=gradeWeights)[0]}
+                for index in picked
+            ],
+            'contact': {
+                'email': f"{first}.{last}{studentId}@example.com".lower(),
+                'phone': f"555-{rng.randrange(10_000_000):07d}"
+            }
+        }
+
+def DatasetFile(directory: str, count: int, seed: int = 42) -> str:
+    """
+    Return the path of a generated data file, writing it on first use.
+    """
+    filename = os.path.join(directory, f"students-{count}-seed{seed}.json")
+    if not os.path.exists(filename):
+        os.makedirs(directory, exist_ok=True)
+        SaveJsonStudents(filename, GenerateStudents(count, seed))
+    return filename
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='students_generated.json')
+    args = parser.parse_args()
+    SaveJsonStudents(args.output, GenerateStudents(args.students, args.seed))
+    print(f"Wrote {args.students:,} students to {args.output}")
+
+if __name__ == '__main__':
+    main()
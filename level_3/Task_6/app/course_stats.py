@@ -0,0 +1,71 @@
+from typing import Dict, Any, Iterator, Optional
+
+def _FirstCourses(student: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    # A student counts once per course; grade updates change the first
+    # matching course entry, so that is the one whose grade is counted
+    seen = set()
+    for course in student['courses']:
+        if course['code'] not in seen:
+            seen.add(course['code'])
+            yield course
+
+class CourseStats:
+    """
+    Per-course aggregates kept up to date as students change: enrollment
+    count, grade distribution and total age. Every mutation adjusts the
+    totals of the courses it touches, so reading a course's statistics
+    does not scan the students.
+    """
+
+    def __init__(self):
+        # Course code -> {'enrolled': int, 'ageTotal': number, 'grades': {grade: count}}
+        self.courses: Dict[str, Dict[str, Any]] = {}
+
+    def AddStudent(self, student: Dict[str, Any]) -> None:
+        for course in _FirstCourses(student):
+            totals = self.courses.setdefault(course['code'], {'enrolled': 0, 'ageTotal': 0, 'grades': {}})
+            totals['enrolled'] += 1
+            totals['ageTotal'] += student['age']
+            grades = totals['grades']
+            grades[course.get('grade')] = grades.get(course.get('grade'), 0) + 1
+
+    def RemoveStudent(self, student: Dict[str, Any]) -> None:
+        for course in _FirstCourses(student):
+            totals = self.courses.get(course['code'])
+            if totals is None:
+                continue
+            totals['enrolled'] -= 1
+            totals['ageTotal'] -= student['age']
+            self._Uncount(totals['grades'], course.get('grade'))
+            if totals['enrolled'] <= 0:
+                del self.courses[course['code']]
+
+    def ChangeGrade(self, courseCode: str, oldGrade: Optional[str], newGrade: Optional[str]) -> None:
+        totals = self.courses.get(courseCode)
+        if totals is None:
+            return
+        grades = totals['grades']
+        self._Uncount(grades, oldGrade)
+        grades[newGrade] = grades.get(newGrade, 0) + 1
+
+    def Get(self, courseCode: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the statistics of a course, or None if nobody is enrolled.
+        """
+        totals = self.courses.get(courseCode)
+        if totals is None:
+            return None
+        return {
+            'code': courseCode,
+            'enrolled': totals['enrolled'],
+            'averageAge': totals['ageTotal'] / totals['enrolled'],
+            'grades': dict(totals['grades'])
+        }
+
+    @staticmethod
+    def _Uncount(grades: Dict[Optional[str], int], grade: Optional[str]) -> None:
+        count = grades.get(grade, 0) - 1
+        if count > 0:
+            grades[grade] = count
+        else:
+            grades.pop(grade, None)
@@ -1,100 +1,1090 @@
 import json
-from typing import Dict, List, Union, Any
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Dict, List, Union, Any, Optional, Tuple, Iterable, Iterator, Callable
 import logging
 
+from student_journal import StudentJournal
+from student_writer import StudentWriter
+from course_stats import CourseStats
+from student_search import StudentSearchIndex, RankStudents
+from student_snapshot import StudentSnapshot, WriteStudentSnapshot
+from atomic_file import AtomicWrite, VerifyChecksum, LockForProcess, LockFile
+
+# Changes a backend remembers for GET /api/students/changes; clients that
+# are further behind get a resync marker instead
+CHANGE_LOG_SIZE = 10000
+
+# Stores with more students build their search index on a background thread
+SEARCH_INDEX_SYNC_LIMIT = 20000
+
+# Parsed documents shared by LoadJsonFileShared, by absolute path, with the
+# file signature they were parsed from; least recently used first
+PARSE_CACHE_SIZE = 4
+_parseCache: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+_parseCacheLock = threading.Lock()
+
+def _FileSignature(path: str) -> Tuple[int, int, int]:
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def _ParseJsonFile(filename: str, path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        logging.error(f"File '{filename}' not found.")
+        raise FileNotFoundError(f"File '{filename}' not found.")
+    except json.JSONDecodeError:
+        logging.error(f"File '{filename}' contains invalid JSON.")
+        raise ValueError(f"File '{filename}' contains invalid JSON.")
+
 def LoadJsonFile(filename: str) -> Dict[str, Any]:
     """
     Load and parse JSON data from a file.
+    Every call parses the file, so the caller owns the document and may
+    change it; callers that only read should use LoadJsonFileShared.
     Raises errors if the file is not found or contains invalid JSON.
     """
+    return _ParseJsonFile(filename, os.path.abspath(filename))
+
+def LoadJsonFileShared(filename: str) -> Dict[str, Any]:
+    """
+    Load and parse JSON data from a file for reading only.
+    The parsed document is cached and returned to every caller until the
+    file's mtime, size or inode changes, including when another process
+    writes it, so it must not be changed. The PARSE_CACHE_SIZE most
+    recently loaded files are kept.
+    Raises the same errors as LoadJsonFile.
+    """
+    path = os.path.abspath(filename)
     try:
-        with open(filename, 'r') as file:
-            return json.load(file)
+        # Stat before reading: a write racing the read only costs a re-parse later
+        signature = _FileSignature(path)
     except FileNotFoundError:
         logging.error(f"File '{filename}' not found.")
         raise FileNotFoundError(f"File '{filename}' not found.")
-    except json.JSONDecodeError:
-        logging.error(f"File '{filename}' contains invalid JSON.")
-        raise ValueError(f"File '{filename}' contains invalid JSON.")
+    with _parseCacheLock:
+        cached = _parseCache.pop(path, None)
+    if cached is None or cached[0] != signature:
+        cached = (signature, _ParseJsonFile(filename, path))
+    with _parseCacheLock:
+        _parseCache[path] = cached
+        while len(_parseCache) > PARSE_CACHE_SIZE:
+            del _parseCache[next(iter(_parseCache))]
+    return cached[1]
 
 def SaveJsonFile(filename: str, data: Dict[str, Any]) -> None:
     """
     Save dictionary data back to a JSON file with pretty formatting (indentation).
+    The file is replaced atomically, so readers never see it half written.
     """
-    with open(filename, 'w') as file:
+    _parseCache.pop(os.path.abspath(filename), None)
+    with AtomicWrite(filename) as file:
         json.dump(data, file, indent=4)
 
-def AddStudent(data: Dict[str, Any], studentInfo: Dict[str, Any]) -> None:
+class _JsonStreamReader:
     """
-    Add a new student to the list of students.
-    Ensures that studentInfo includes all required fields and ID is unique.
+    Incremental reader over a JSON text file that decodes one value at a
+    time, keeping only the unread tail of the file in memory.
     """
+
+    def __init__(self, file: Any, filename: str, chunkSize: int):
+        self.file = file
+        self.filename = filename
+        self.chunkSize = chunkSize
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def Fill(self) -> None:
+        # Read at least as much again as is buffered, so a value larger
+        # than one chunk is re-scanned a logarithmic number of times
+        chunk = self.file.read(max(self.chunkSize, len(self.buffer) - self.pos))
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+
+    def Peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self.Fill()
+
+    def Expect(self, char: str) -> None:
+        if self.Peek() != char:
+            raise self.Invalid()
+        self.pos += 1
+
+    def Decode(self) -> Any:
+        self.Peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise self.Invalid()
+                self.Fill()
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self.Fill()
+                continue
+            self.pos = end
+            return value
+
+    def Invalid(self) -> ValueError:
+        logging.error(f"File '{self.filename}' contains invalid JSON.")
+        return ValueError(f"File '{self.filename}' contains invalid JSON.")
+
+def IterJsonStudents(filename: str, chunkSize: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the records of the top-level "students" array one at a time,
+    without parsing the whole file into memory first.
+    Raises the same errors as LoadJsonFile.
+    """
+    try:
+        file = open(filename, 'r')
+    except FileNotFoundError:
+        logging.error(f"File '{filename}' not found.")
+        raise FileNotFoundError(f"File '{filename}' not found.")
+
+    with file:
+        reader = _JsonStreamReader(file, filename, chunkSize)
+        reader.Expect('{')
+        if reader.Peek() == '}':
+            return
+        while True:
+            key = reader.Decode()
+            reader.Expect(':')
+            if key == 'students':
+                reader.Expect('[')
+                if reader.Peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.Decode()
+                        if reader.Peek() == ']':
+                            reader.pos += 1
+                            break
+                        reader.Expect(',')
+            else:
+                # Other top-level values are decoded and dropped
+                reader.Decode()
+            if reader.Peek() == '}':
+                return
+            reader.Expect(',')
+
+def SaveJsonStudents(filename: str, students: Iterable[Dict[str, Any]]) -> None:
+    """
+    Write students to a JSON data file one record at a time.
+    The output matches SaveJsonFile(filename, {'students': [...]}), and the
+    file is likewise replaced atomically.
+    """
+    _parseCache.pop(os.path.abspath(filename), None)
+    with AtomicWrite(filename) as file:
+        file.write('{\n    "students": [')
+        first = True
+        for student in students:
+            file.write('\n        ' if first else ',\n        ')
+            file.write(json.dumps(student, indent=4).replace('\n', '\n        '))
+            first = False
+        file.write(']\n}' if first else '\n    ]\n}')
+
+def ScanCourseStudents(filename: str, courseCode: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the students of a data file enrolled in a course, streaming the file.
+    """
+    for student in IterJsonStudents(filename):
+        if any(course['code'] == courseCode for course in student['courses']):
+            yield student
+
+def _StudentExists(studentId: int) -> ValueError:
+    logging.error(f"Student with ID {studentId} already exists.")
+    return ValueError(f"Student with ID {studentId} already exists.")
+
+def _StudentNotFound(studentId: int) -> ValueError:
+    logging.error(f"Student with ID {studentId} not found.")
+    return ValueError(f"Student with ID {studentId} not found.")
+
+def _CourseNotFound(studentId: int, courseCode: str) -> ValueError:
+    logging.error(f"Course with code '{courseCode}' not found for student ID {studentId}.")
+    return ValueError(f"Course with code '{courseCode}' not found for student ID {studentId}.")
+
+def _NoCourseStudents(courseCode: str) -> ValueError:
+    logging.error(f"No students found enrolled in course '{courseCode}'.")
+    return ValueError(f"No students found enrolled in course '{courseCode}'.")
+
+def _InvalidPageSize(limit: int) -> ValueError:
+    logging.error(f"Invalid page size {limit}.")
+    return ValueError(f"Page size must be at least 1, got {limit}.")
+
+class StudentBackend:
+    """
+    Storage backend for students.
+    The json_handler functions delegate to these methods when given a
+    backend instead of a plain dict, so routes work unchanged whichever
+    backend is configured. Mutations should go through Submit(), which
+    applies them on a single writer thread and commits them in groups.
+    """
+
+    def __init__(self):
+        # Guards the backend against concurrent requests from the threadpool
+        self.lock = threading.RLock()
+        self.writer = StudentWriter(self)
+
+    def StartLoading(self) -> None:
+        """
+        Prepare the backend for requests; called before each use.
+        """
+
+    def Submit(self, mutation: Callable[['StudentBackend'], Any]) -> Future:
+        """
+        Queue mutation(backend) on the single writer thread.
+        The returned future resolves once the mutation is committed.
+        """
+        return self.writer.Submit(mutation)
+
+    def Commit(self) -> None:
+        """
+        Make the mutations applied so far durable.
+        """
+        raise NotImplementedError
+
+    def Rollback(self) -> None:
+        """
+        Discard the mutations applied since the last commit.
+        """
+        raise NotImplementedError
+
+    def Compact(self) -> None:
+        """
+        Reclaim space used by committed mutations.
+        """
+
+    def Version(self) -> str:
+        """
+        Return a token that changes whenever the students change.
+        """
+        raise NotImplementedError
+
+    def ToDict(self) -> Dict[str, Any]:
+        """
+        Return the students in the same shape as the JSON data file.
+        """
+        return {'students': self.AllStudents()}
+
+    def AllStudents(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def Add(self, studentInfo: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def Remove(self, studentId: int) -> None:
+        raise NotImplementedError
+
+    def UpdateGrade(self, studentId: int, courseCode: str, newGrade: str) -> None:
+        raise NotImplementedError
+
+    def Get(self, studentId: int) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def CourseStudents(self, courseCode: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def Page(self, limit: int, cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        raise NotImplementedError
+
+    def CourseStats(self, courseCode: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def Search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def Changes(self, since: Optional[str]) -> Dict[str, Any]:
+        """
+        Return the changes since an earlier version, as StudentChanges does.
+        """
+        raise NotImplementedError
+
+def SinceVersion(since: Optional[str], epoch: str) -> Optional[int]:
+    """
+    Return the counter of an "<epoch>-<counter>" version (or its ETag) from
+    the given epoch, or None for any other version.
+    """
+    if not since:
+        return None
+    sinceEpoch, _, counter = since.strip().removeprefix('W/').strip('"').rpartition('-')
+    if sinceEpoch != epoch or not counter.isdigit():
+        return None
+    return int(counter)
+
+def StudentChanges(version: str, changedIds: Iterable[int], students: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build a changes response: the current version, the changed students
+    that still exist and the IDs of those that were removed.
+    """
+    found = {student['id'] for student in students}
+    return {
+        'version': version,
+        'students': students,
+        'deleted': sorted(set(changedIds) - found)
+    }
+
+class _SnapshotPreview:
+    """
+    Lookups by ID against a binary snapshot with the journal applied on
+    top, used to answer Get() while the full store is still loading.
+    """
+
+    def __init__(self, snapshot: StudentSnapshot, records: Iterable[Dict[str, Any]]):
+        self.snapshot = snapshot
+        # Students changed by the journal; None marks a removed student
+        self.overlay: Dict[int, Optional[Dict[str, Any]]] = {}
+        for record in records:
+            op = record.get('op')
+            if op == 'add':
+                self.overlay[record['student']['id']] = record['student']
+            elif op == 'remove':
+                self.overlay[record['id']] = None
+            elif op == 'grade':
+                student = self.Get(record['id'])
+                if student is not None:
+                    for course in student['courses']:
+                        if course['code'] == record['courseCode']:
+                            course['grade'] = record['newGrade']
+                            break
+                    self.overlay[record['id']] = student
+
+    def Get(self, studentId: int) -> Optional[Dict[str, Any]]:
+        if studentId in self.overlay:
+            return self.overlay[studentId]
+        return self.snapshot.Get(studentId)
+
+class StudentStore(StudentBackend):
+    """
+    Resident copy of the student data file, indexed by student ID.
+    The file is parsed once by Load() and every lookup afterwards is a
+    dictionary access instead of a scan over the students list.
+    An inverted index from course code to student IDs is kept alongside,
+    together with per-course statistics that every mutation updates. A
+    name and email search index is built when the store loads (off the
+    lock, on a background thread, for large stores) and kept up to date by
+    every mutation; searches scan the students until it is ready. The IDs
+    of the students changed by the last CHANGE_LOG_SIZE versions are kept
+    for Changes().
+
+    Mutations are not written back to the data file straight away: Commit()
+    appends them to a journal, Load() replays the journal on top of the
+    data file and Compact() folds it into a new snapshot of the data file.
+    Concurrent callers should go through Submit(), which serialises
+    mutations on a single writer thread and group-commits them. Once the
+    journal reaches compactEvery records, Commit() rotates it and a
+    background thread writes the snapshot, so commits never wait for it.
+    Snapshots replace the files atomically, with a checksum beside them.
+
+    One process owns the files: the first load takes a lock beside the
+    data file, and loading fails in any other process while it is held, as
+    their journal appends and compactions would overwrite each other.
+
+    With a snapshotFile, every snapshot is also written in the binary
+    snapshot format and loading prefers it over the JSON data file while it
+    is at least as recent. StartLoading() then answers Get() straight from
+    the memory-mapped snapshot while the rest loads in the background.
+    """
+
+    def __init__(self, filename: str, journalFile: Optional[str] = None, compactEvery: int = 10000,
+                 snapshotFile: Optional[str] = None):
+        super().__init__()
+        self.filename = filename
+        self.journal = StudentJournal(journalFile or filename + '.journal')
+        self.snapshotFile = snapshotFile
+        # Answers Get() from the binary snapshot until loading finishes
+        self.preview: Optional[_SnapshotPreview] = None
+        # Journal length at which Commit() writes a fresh snapshot
+        self.compactEvery = compactEvery
+        self.journalLength = 0
+        # Mutation records not yet written to the journal
+        self.pending: List[Dict[str, Any]] = []
+        self.students: Dict[int, Dict[str, Any]] = {}
+        # Course code -> student IDs (a dict keeps enrollment order)
+        self.courses: Dict[str, Dict[int, None]] = {}
+        # Enrollment, grade and age aggregates per course
+        self.stats = CourseStats()
+        # Name and email search index, built by each load
+        self.search: Optional[StudentSearchIndex] = None
+        # Index changes made while a background build runs, replayed onto it
+        self.searchBacklog: Optional[List[Tuple[bool, Dict[str, Any]]]] = None
+        # Bumped by every load, so a build for an earlier load is discarded
+        self.searchGeneration = 0
+        # Student IDs in ascending order, for stable paging
+        self.sortedIds: List[int] = []
+        self.loaded = False
+        # Bumped by every change; the epoch tells this process's versions
+        # apart from those of earlier runs over the same files
+        self.version = 0
+        self.epoch = os.urandom(4).hex()
+        # ID of the student changed by each of the latest versions, oldest first
+        self.changes: "deque[int]" = deque(maxlen=CHANGE_LOG_SIZE)
+        # Keeps journal writes (and journal rotations) in commit order
+        self.commitLock = threading.Lock()
+        # Held while a snapshot is written, in the background or by Compact()
+        self.compactionLock = threading.Lock()
+
+    def Load(self) -> None:
+        """
+        Stream the latest snapshot, replay the journal and rebuild the indexes.
+        """
+        with self.lock:
+            self._ClaimFiles()
+            self.students = {}
+            self.courses = {}
+            self.stats = CourseStats()
+            self.search = None
+            self.searchBacklog = None
+            self.searchGeneration += 1
+            self.pending = []
+            snapshot = self._OpenSnapshot()
+            if snapshot is None:
+                # Only a warning: the data file is the one copy there is
+                VerifyChecksum(self.filename)
+            source = snapshot if snapshot is not None else IterJsonStudents(self.filename)
+            for student in source:
+                if student['id'] in self.students:
+                    logging.warning(f"Duplicate student ID {student['id']} in '{self.filename}' ignored.")
+                    continue
+                self.students[student['id']] = student
+                self._IndexStudent(student)
+            self.journalLength = 0
+            for record in self.journal.Read():
+                self._Replay(record)
+                self.journalLength += 1
+            self.sortedIds = sorted(self.students)
+            # The first load shows the files as they were when the epoch began;
+            # reloading later may change what readers see, in ways not logged
+            if self.loaded:
+                self.version += 1
+                self.changes.clear()
+            self.loaded = True
+            self.preview = None
+            self._StartSearchIndex()
+            # Give the next start a binary snapshot to begin from, written
+            # in the background (a compaction writes one anyway)
+            if snapshot is None and self.snapshotFile is not None and self.compactionLock.acquire(blocking=False):
+                self._InBackground(self._WriteSnapshot, list(self.students.values()))
+
+    def EnsureLoaded(self) -> None:
+        """
+        Load the data file on first use only.
+        """
+        if self.loaded:
+            return
+        with self.lock:
+            if not self.loaded:
+                self.Load()
+
+    def StartLoading(self) -> None:
+        """
+        Load the store on a background thread, answering Get() from the
+        binary snapshot meanwhile; other operations wait for the load.
+        Loads in the foreground when there is no current binary snapshot.
+        """
+        if self.loaded or self.preview is not None:
+            return
+        with self.lock:
+            if self.loaded or self.preview is not None:
+                return
+            self._ClaimFiles()
+            snapshot = self._OpenSnapshot()
+            if snapshot is None:
+                self.Load()
+                return
+            self.preview = _SnapshotPreview(snapshot, self.journal.Read())
+        threading.Thread(target=self.EnsureLoaded, name="StudentStoreLoader", daemon=True).start()
+
+    def _ClaimFiles(self) -> None:
+        if not LockForProcess(self.filename):
+            logging.error(f"'{self.filename}' is in use by another process.")
+            raise RuntimeError(f"'{self.filename}' is in use by another process (its lock file is "
+                               f"'{LockFile(self.filename)}'); the JSON backend serves one worker process.")
+
+    def Commit(self) -> None:
+        """
+        Append the pending mutations to the journal.
+        Readers are not blocked while the journal is written.
+        Compacts once the journal reaches compactEvery records.
+        """
+        with self.commitLock:
+            with self.lock:
+                records, self.pending = self.pending, []
+            try:
+                self.journal.Append(records)
+            except Exception:
+                # Keep the records so the next commit retries them
+                with self.lock:
+                    self.pending[:0] = records
+                raise
+            self.journalLength += len(records)
+            # Skipped while a snapshot is being written; a later commit retries
+            if self.journalLength >= self.compactEvery and self.compactionLock.acquire(blocking=False):
+                self._InBackground(self._WriteCompaction, self._RotateJournal())
+
+    def Rollback(self) -> None:
+        """
+        Discard the pending mutations by reloading the store from its files.
+        The reload starts a new version, so readers that saw the discarded
+        mutations resync.
+        """
+        with self.commitLock:
+            with self.lock:
+                self.Load()
+
+    def Compact(self) -> None:
+        """
+        Write the current students as a new snapshot of the data file
+        and empty the journal, waiting for the writes to finish.
+        """
+        with self.compactionLock:
+            with self.commitLock:
+                students = self._RotateJournal()
+            self._WriteCompaction(students)
+
+    def WaitForCompaction(self) -> None:
+        """
+        Wait for a snapshot being written in the background, if any.
+        """
+        with self.compactionLock:
+            pass
+
+    def _RotateJournal(self) -> List[Dict[str, Any]]:
+        # Called under commitLock. Records still pending are part of the
+        # snapshot and get journaled by a later commit, which replays
+        # idempotently on top of it, as do the rotated records
+        students = self.AllStudents()
+        self.journal.Rotate()
+        self.journalLength = 0
+        return students
+
+    def _WriteCompaction(self, students: List[Dict[str, Any]]) -> None:
+        # The rotated journal is only dropped once both snapshots are durable
+        SaveJsonStudents(self.filename, students)
+        if self.snapshotFile is not None:
+            self._WriteSnapshot(students)
+        self.journal.DiscardRotated()
+
+    def _InBackground(self, write: Callable[[List[Dict[str, Any]]], None], students: List[Dict[str, Any]]) -> None:
+        # Run a snapshot write on its own thread; the caller holds compactionLock,
+        # which the thread releases. Not a daemon, so exiting waits for it
+        def Run() -> None:
+            try:
+                write(students)
+            except Exception as e:
+                logging.error(f"Background snapshot of '{self.filename}' failed: {e}")
+            finally:
+                self.compactionLock.release()
+        threading.Thread(target=Run, name="StudentStoreCompactor").start()
+
+    def _OpenSnapshot(self) -> Optional[StudentSnapshot]:
+        # The binary snapshot is only used while it is at least as recent as
+        # the JSON data file, which stays the import/export format
+        if self.snapshotFile is None:
+            return None
+        try:
+            if os.stat(self.snapshotFile).st_mtime_ns < os.stat(self.filename).st_mtime_ns:
+                return None
+            # A snapshot failing its checksum is skipped for the data file
+            if VerifyChecksum(self.snapshotFile) is False:
+                return None
+            return StudentSnapshot(self.snapshotFile)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logging.warning(f"Ignoring unreadable binary snapshot '{self.snapshotFile}'.")
+            return None
+
+    def Version(self) -> str:
+        """
+        Return the store version, which every change increases.
+        """
+        return f"{self.epoch}-{self.version}"
+
+    def _WriteSnapshot(self, students: Iterable[Dict[str, Any]]) -> None:
+        try:
+            WriteStudentSnapshot(self.snapshotFile, students)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not write binary snapshot '{self.snapshotFile}': {e}")
+
+    def AllStudents(self) -> List[Dict[str, Any]]:
+        """
+        Return every student in insertion order.
+        """
+        self.EnsureLoaded()
+        with self.lock:
+            return list(self.students.values())
+
+    def Add(self, studentInfo: Dict[str, Any]) -> None:
+        """
+        Add a new student, rejecting duplicate IDs.
+        """
+        self.EnsureLoaded()
+        with self.lock:
+            if studentInfo['id'] in self.students:
+                raise _StudentExists(studentInfo['id'])
+            self.students[studentInfo['id']] = studentInfo
+            self._IndexStudent(studentInfo)
+            insort(self.sortedIds, studentInfo['id'])
+            self.pending.append({'op': 'add', 'student': studentInfo})
+            self._Changed(studentInfo['id'])
+
+    def Remove(self, studentId: int) -> None:
+        """
+        Remove a student by ID.
+        """
+        self.EnsureLoaded()
+        with self.lock:
+            student = self.students.pop(studentId, None)
+            if student is None:
+                raise _StudentNotFound(studentId)
+            self._UnindexStudent(student)
+            del self.sortedIds[bisect_left(self.sortedIds, studentId)]
+            self.pending.append({'op': 'remove', 'id': studentId})
+            self._Changed(studentId)
+
+    def UpdateGrade(self, studentId: int, courseCode: str, newGrade: str) -> None:
+        """
+        Update one course grade of a student.
+        """
+        self.EnsureLoaded()
+        with self.lock:
+            if not self._SetGrade(self.Get(studentId), courseCode, newGrade):
+                raise _CourseNotFound(studentId, courseCode)
+            self.pending.append({'op': 'grade', 'id': studentId, 'courseCode': courseCode, 'newGrade': newGrade})
+            self._Changed(studentId)
+
+    def _SetGrade(self, student: Dict[str, Any], courseCode: str, newGrade: str) -> bool:
+        # Copy on write: the student is replaced rather than changed in place,
+        # so the lists handed to snapshot writers never see a later change
+        # (which Rollback() may yet undo); returns False for an unknown course
+        for position, course in enumerate(student['courses']):
+            if course['code'] == courseCode:
+                self.stats.ChangeGrade(courseCode, course.get('grade'), newGrade)
+                courses = list(student['courses'])
+                courses[position] = {**course, 'grade': newGrade}
+                self.students[student['id']] = {**student, 'courses': courses}
+                return True
+        return False
+
+    def Get(self, studentId: int) -> Dict[str, Any]:
+        """
+        Return a student by ID.
+        """
+        preview = self.preview
+        if preview is not None and not self.loaded:
+            student = preview.Get(studentId)
+        else:
+            self.EnsureLoaded()
+            student = self.students.get(studentId)
+        if student is None:
+            raise _StudentNotFound(studentId)
+        return student
+
+    def CourseStudents(self, courseCode: str) -> List[Dict[str, Any]]:
+        """
+        Return every student enrolled in a course, in enrollment order.
+        """
+        self.EnsureLoaded()
+        with self.lock:
+            return [self.students[studentId] for studentId in self.courses.get(courseCode, ())]
+
+    def Page(self, limit: int, cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Return up to limit students ordered by ID, starting after the cursor ID,
+        along with the cursor for the next page (None on the last page).
+        """
+        self.EnsureLoaded()
+        with self.lock:
+            start = 0 if cursor is None else bisect_right(self.sortedIds, cursor)
+            pageIds = self.sortedIds[start:start + limit]
+            nextCursor = pageIds[-1] if start + limit < len(self.sortedIds) else None
+            return [self.students[studentId] for studentId in pageIds], nextCursor
+
+    def CourseStats(self, courseCode: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the statistics of a course, or None if nobody is enrolled.
+        """
+        self.EnsureLoaded()
+        with self.lock:
+            return self.stats.Get(courseCode)
+
+    def Search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Return up to limit students whose name or email matches the query, best first.
+        """
+        self.EnsureLoaded()
+        with self.lock:
+            if self.search is not None:
+                return self.search.Search(query, limit)
+            students = list(self.students.values())
+        # The index is still being built: rank every student, off the lock
+        return RankStudents(query, students, limit)
+
+    def WaitForSearchIndex(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the search index of the current load; returns whether it is ready.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.search is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _StartSearchIndex(self) -> None:
+        # Called under lock at the end of a load. Small stores index in
+        # place; large ones index a copy off the lock, recording the changes
+        # made meanwhile, and swap the index in once it has caught up
+        if len(self.students) <= SEARCH_INDEX_SYNC_LIMIT:
+            self.search = StudentSearchIndex(self.students)
+            return
+        self.searchBacklog = []
+        threading.Thread(target=self._BuildSearchIndex, args=(self.searchGeneration, dict(self.students)),
+                         name="StudentSearchIndexer", daemon=True).start()
+
+    def _BuildSearchIndex(self, generation: int, students: Dict[int, Dict[str, Any]]) -> None:
+        try:
+            index = StudentSearchIndex(students)
+        except Exception as e:
+            logging.error(f"Building the student search index failed: {e}")
+            return
+        with self.lock:
+            if generation != self.searchGeneration or self.searchBacklog is None:
+                return
+            index.students = self.students
+            for added, student in self.searchBacklog:
+                if added:
+                    index.Add(student)
+                else:
+                    index.Remove(student)
+            self.search, self.searchBacklog = index, None
+
+    def Changes(self, since: Optional[str]) -> Dict[str, Any]:
+        """
+        Return the students changed since an earlier version of this store.
+        """
+        self.EnsureLoaded()
+        with self.lock:
+            # The log covers the versions after the oldest one it reaches back to
+            oldest = self.version - len(self.changes)
+            sinceVersion = SinceVersion(since, self.epoch)
+            if sinceVersion is None or not oldest <= sinceVersion <= self.version:
+                return {'version': self.Version(), 'resync': True}
+            changedIds = set(islice(self.changes, sinceVersion - oldest, None))
+            students = [self.students[studentId] for studentId in sorted(changedIds) if studentId in self.students]
+            return StudentChanges(self.Version(), changedIds, students)
+
+    def _Changed(self, studentId: int) -> None:
+        self.version += 1
+        self.changes.append(studentId)
+
+    def _Replay(self, record: Dict[str, Any]) -> None:
+        # Records may already be reflected in the snapshot if a crash hit
+        # between writing it and emptying the journal, so replay is idempotent
+        op = record.get('op')
+        if op == 'add':
+            student = record['student']
+            previous = self.students.get(student['id'])
+            if previous is not None:
+                self._UnindexStudent(previous)
+            self.students[student['id']] = student
+            self._IndexStudent(student)
+        elif op == 'remove':
+            student = self.students.pop(record['id'], None)
+            if student is not None:
+                self._UnindexStudent(student)
+        elif op == 'grade':
+            student = self.students.get(record['id'])
+            if student is not None:
+                self._SetGrade(student, record['courseCode'], record['newGrade'])
+        else:
+            logging.warning(f"Ignoring unknown journal record: {record}")
+
+    def _IndexStudent(self, student: Dict[str, Any]) -> None:
+        for course in student['courses']:
+            self.courses.setdefault(course['code'], {})[student['id']] = None
+        self.stats.AddStudent(student)
+        if self.search is not None:
+            self.search.Add(student)
+        elif self.searchBacklog is not None:
+            self.searchBacklog.append((True, student))
+
+    def _UnindexStudent(self, student: Dict[str, Any]) -> None:
+        self.stats.RemoveStudent(student)
+        if self.search is not None:
+            self.search.Remove(student)
+        elif self.searchBacklog is not None:
+            self.searchBacklog.append((False, student))
+        for course in student['courses']:
+            enrolled = self.courses.get(course['code'])
+            if enrolled is None:
+                continue
+            enrolled.pop(student['id'], None)
+            if not enrolled:
+                del self.courses[course['code']]
+
+StudentData = Union[Dict[str, Any], 'StudentBackend']
+
+def _ValidateStudentInfo(studentInfo: Dict[str, Any]) -> None:
     requiredKeys = {'id', 'name', 'age', 'courses', 'contact'}
     if not requiredKeys.issubset(studentInfo.keys()):
         logging.error(f"Student info missing required fields: {requiredKeys}")
         raise ValueError(f"Student info missing required fields: {requiredKeys}")
 
+def AddStudent(data: StudentData, studentInfo: Dict[str, Any]) -> None:
+    """
+    Add a new student to the list of students.
+    Ensures that studentInfo includes all required fields and ID is unique.
+    """
+    _ValidateStudentInfo(studentInfo)
+
+    if isinstance(data, StudentBackend):
+        data.Add(studentInfo)
+        return
+
     # Prevent duplicate IDs
     if any(student['id'] == studentInfo['id'] for student in data.get('students', [])):
-        logging.error(f"Student with ID {studentInfo['id']} already exists.")
-        raise ValueError(f"Student with ID {studentInfo['id']} already exists.")
+        raise _StudentExists(studentInfo['id'])
 
     data.setdefault('students', []).append(studentInfo)
 
-def RemoveStudent(data: Dict[str, Any], studentId: int) -> None:
+def AddStudents(data: StudentData, studentInfos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Add a batch of new students in one pass.
+    Students that are invalid or whose ID already exists (in the data or
+    earlier in the batch) are skipped; returns one error entry per skipped
+    student with its position in the batch.
+    """
+    errors = []
+
+    if isinstance(data, StudentBackend):
+        with data.lock:
+            for index, studentInfo in enumerate(studentInfos):
+                try:
+                    AddStudent(data, studentInfo)
+                except ValueError as e:
+                    errors.append({'index': index, 'id': studentInfo.get('id'), 'error': str(e)})
+        return errors
+
+    # Collect the existing IDs once instead of scanning the list per student
+    students = data.setdefault('students', [])
+    existingIds = {student['id'] for student in students}
+    for index, studentInfo in enumerate(studentInfos):
+        try:
+            _ValidateStudentInfo(studentInfo)
+            if studentInfo['id'] in existingIds:
+                raise _StudentExists(studentInfo['id'])
+        except ValueError as e:
+            errors.append({'index': index, 'id': studentInfo.get('id'), 'error': str(e)})
+            continue
+        existingIds.add(studentInfo['id'])
+        students.append(studentInfo)
+    return errors
+
+def RemoveStudent(data: StudentData, studentId: int) -> None:
     """
     Remove a student from the list using their unique ID.
     Raises an error if student is not found.
     """
+    if isinstance(data, StudentBackend):
+        data.Remove(studentId)
+        return
+
     students = data.get('students', [])
     for i, student in enumerate(students):
         if student['id'] == studentId:
             del students[i]
             return
-    logging.error(f"Student with ID {studentId} not found.")
-    raise ValueError(f"Student with ID {studentId} not found.")
+    raise _StudentNotFound(studentId)
 
-def UpdateStudentGrade(data: Dict[str, Any], studentId: int, courseCode: str, newGrade: str) -> None:
+def UpdateStudentGrade(data: StudentData, studentId: int, courseCode: str, newGrade: str) -> None:
     """
     Update the grade for a specific course of a given student.
     Raises an error if the student or course is not found.
     """
+    if isinstance(data, StudentBackend):
+        data.UpdateGrade(studentId, courseCode, newGrade)
+        return
+
     for student in data.get('students', []):
         if student['id'] == studentId:
             for course in student['courses']:
                 if course['code'] == courseCode:
                     course['grade'] = newGrade
                     return
-            logging.error(f"Course with code '{courseCode}' not found for student ID {studentId}.")
-            raise ValueError(f"Course with code '{courseCode}' not found for student ID {studentId}.")
-    logging.error(f"Student with ID {studentId} not found.")
-    raise ValueError(f"Student with ID {studentId} not found.")
+            raise _CourseNotFound(studentId, courseCode)
+    raise _StudentNotFound(studentId)
+
+def UpdateStudentGrades(data: StudentData, updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Apply a batch of grade updates in one pass.
+    Each update has studentId, courseCode and newGrade. Updates whose student
+    or course is not found are skipped; returns one error entry per skipped
+    update with its position in the batch.
+    """
+    errors = []
+
+    if isinstance(data, StudentBackend):
+        with data.lock:
+            for index, update in enumerate(updates):
+                try:
+                    data.UpdateGrade(update['studentId'], update['courseCode'], update['newGrade'])
+                except ValueError as e:
+                    errors.append({'index': index, 'studentId': update['studentId'],
+                                   'courseCode': update['courseCode'], 'error': str(e)})
+        return errors
+
+    # Index the students once instead of scanning the list per update
+    studentsById: Dict[int, Dict[str, Any]] = {}
+    for student in data.get('students', []):
+        studentsById.setdefault(student['id'], student)
+    for index, update in enumerate(updates):
+        student = studentsById.get(update['studentId'])
+        try:
+            if student is None:
+                raise _StudentNotFound(update['studentId'])
+            for course in student['courses']:
+                if course['code'] == update['courseCode']:
+                    course['grade'] = update['newGrade']
+                    break
+            else:
+                raise _CourseNotFound(update['studentId'], update['courseCode'])
+        except ValueError as e:
+            errors.append({'index': index, 'studentId': update['studentId'],
+                           'courseCode': update['courseCode'], 'error': str(e)})
+    return errors
 
-def GetStudentDetails(data: Dict[str, Any], studentId: int) -> Dict[str, Any]:
+def GetStudentDetails(data: StudentData, studentId: int) -> Dict[str, Any]:
     """
     Retrieve full information of a student by their ID.
     """
+    if isinstance(data, StudentBackend):
+        return data.Get(studentId)
+
     for student in data.get('students', []):
         if student['id'] == studentId:
             return student
-    logging.error(f"Student with ID {studentId} not found.")
-    raise ValueError(f"Student with ID {studentId} not found.")
+    raise _StudentNotFound(studentId)
 
-def GetCourseStudents(data: Dict[str, Any], courseCode: str) -> List[Dict[str, Any]]:
+def GetCourseStudents(data: StudentData, courseCode: str) -> List[Dict[str, Any]]:
     """
     Get a list of students who are enrolled in a specific course.
     Returns a list of dictionaries containing full student details.
     Raises error if no students are found in the course.
     """
-    enrolledStudents = []
-    for student in data.get('students', []):
-        for course in student['courses']:
-            if course['code'] == courseCode:
-                enrolledStudents.append(student)
-                break  # No need to check more courses for this student
+    if isinstance(data, StudentBackend):
+        enrolledStudents = data.CourseStudents(courseCode)
+    else:
+        enrolledStudents = []
+        for student in data.get('students', []):
+            for course in student['courses']:
+                if course['code'] == courseCode:
+                    enrolledStudents.append(student)
+                    break  # No need to check more courses for this student
 
     if not enrolledStudents:
-        logging.error(f"No students found enrolled in course '{courseCode}'.")
-        raise ValueError(f"No students found enrolled in course '{courseCode}'.")
+        raise _NoCourseStudents(courseCode)
 
     return enrolledStudents
+
+def GetCourseStats(data: StudentData, courseCode: str) -> Dict[str, Any]:
+    """
+    Get the enrollment count, grade distribution and average student age of a course.
+    Raises error if no students are found in the course.
+    """
+    if isinstance(data, StudentBackend):
+        stats = data.CourseStats(courseCode)
+    else:
+        courseStats = CourseStats()
+        for student in data.get('students', []):
+            if any(course['code'] == courseCode for course in student['courses']):
+                courseStats.AddStudent(student)
+        stats = courseStats.Get(courseCode)
+
+    if stats is None:
+        raise _NoCourseStudents(courseCode)
+
+    return stats
+
+def SearchStudents(data: StudentData, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Find students by name or email address, best matches first.
+    Matches word prefixes of the name and email prefixes, then falls back
+    to fuzzy (trigram) matching for misspelt queries.
+    """
+    if limit < 1:
+        raise _InvalidPageSize(limit)
+
+    if isinstance(data, StudentBackend):
+        return data.Search(query, limit)
+
+    return RankStudents(query, data.get('students', []), limit)
+
+def GetStudentChanges(data: StudentData, since: Optional[str]) -> Dict[str, Any]:
+    """
+    Get what changed since an earlier version: the current version, the
+    students added or changed since then and the IDs of those removed.
+    When the change log no longer reaches back that far (or since is
+    missing or from another store), returns {'version', 'resync': True}
+    instead, and the client should reload every student.
+    """
+    if isinstance(data, StudentBackend):
+        return data.Changes(since)
+
+    # A plain dict keeps no versions
+    return {'version': None, 'resync': True}
+
+STUDENT_FIELDS = ('id', 'name', 'age', 'courses', 'contact')
+
+def ParseFields(fields: str) -> List[str]:
+    """
+    Parse a comma-separated field list such as "id,name".
+    Raises an error for fields that students do not have.
+    """
+    fieldList = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fieldList if field not in STUDENT_FIELDS]
+    if unknown or not fieldList:
+        logging.error(f"Invalid student fields requested: {fields}")
+        raise ValueError(f"Invalid student fields '{fields}'. Choose from: {', '.join(STUDENT_FIELDS)}.")
+    return fieldList
+
+def ProjectStudents(students: Iterable[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """
+    Keep only the requested fields of each student (all fields when None).
+    """
+    if fields is None:
+        return list(students)
+    return [{field: student[field] for field in fields if field in student} for student in students]
+
+def GetStudentsPage(data: StudentData, limit: int, cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Get one page of students ordered by ID, starting after the cursor ID.
+    Returns the students and the cursor for the next page (None on the last page).
+    """
+    if limit < 1:
+        raise _InvalidPageSize(limit)
+
+    if isinstance(data, StudentBackend):
+        return data.Page(limit, cursor)
+
+    students = sorted(data.get('students', []), key=lambda student: student['id'])
+    if cursor is not None:
+        students = [student for student in students if student['id'] > cursor]
+    nextCursor = students[limit - 1]['id'] if len(students) > limit else None
+    return students[:limit], nextCursor
@@ -15,6 +15,12 @@ Database = client["AuthDB"]
 # Reference to the users collection
 UserCollection: Collection = Database["users"]
 
+# Reference to the students collection (used when STUDENTS_BACKEND=mongo)
+StudentCollection: Collection = Database["students"]
+
+# Reference to the counters collection (holds the students version)
+CounterCollection: Collection = Database["counters"]
+
 async def get_user_collection():
     client = AsyncMongoClient(os.getenv("MONGODB_URI"))
     db = client["AuthDB"]
@@ -0,0 +1,407 @@
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from course_stats import CourseStats
+from student_search import SearchSeed, SearchTerms, RankStudents
+from student_events import StudentEventHub
+from json_handler import (
+    _ValidateStudentInfo,
+    _StudentExists,
+    _StudentNotFound,
+    _CourseNotFound,
+    _NoCourseStudents,
+    _InvalidPageSize,
+    SinceVersion,
+    StudentChanges
+)
+
+# Server error code for a unique index violation
+DUPLICATE_KEY = 11000
+
+# Versions whose changed student IDs the counter document keeps
+CHANGE_LOG_ENTRIES = 1000
+
+# Seconds after which an announced change that never bumped the version is
+# taken to be lost (its writer died) and is logged by whichever replica reads
+PENDING_GRACE_SECONDS = 30
+
+# Field holding a student's search terms, never returned to callers
+SEARCH_TERMS = 'searchTerms'
+
+class MongoStudentRepository:
+    """
+    Async access to students kept in a MongoDB collection, so several app
+    replicas can share them. Students are stored as their JSON documents,
+    with a unique index on id and an index on courses.code. Each document
+    also carries its search terms (see SearchTerms), in an indexed array
+    that prefix searches look up. Reads project away _id and the terms (and
+    any unrequested fields) on the server, and batches are written with a
+    single insert_many or bulk_write.
+
+    The version is a counter document in the counters collection, bumped
+    after each change, so every replica agrees on it. The same update logs
+    the IDs of the changed students for the last CHANGE_LOG_ENTRIES
+    versions. As the data and the counter cannot be written atomically
+    without a transaction, each change is first announced in the counter's
+    pending list, and the bump removes it. A change still pending after
+    PENDING_GRACE_SECONDS lost its bump (its writer died, or the write
+    failed with an unknown outcome); the next read of the version logs its
+    students instead, so clients refetch whatever state they are in.
+    Changes made through this replica are published to events.
+    """
+
+    def __init__(self, collection, counters):
+        self.collection = collection
+        self.counters = counters
+        self.indexed = False
+        self.events = StudentEventHub()
+
+    async def Start(self) -> None:
+        """
+        Create the indexes the queries rely on (once per process), and add
+        search terms to any students stored without them.
+        """
+        if self.indexed:
+            return
+        await self.collection.create_index([('id', ASCENDING)], unique=True)
+        await self.collection.create_index([('courses.code', ASCENDING), ('id', ASCENDING)])
+        await self.collection.create_index([(SEARCH_TERMS, ASCENDING)])
+        missing = await self.collection.find(
+            {SEARCH_TERMS: {'$exists': False}}, {'_id': 0, 'id': 1, 'name': 1, 'contact': 1}
+        ).to_list(None)
+        if missing:
+            await self.collection.bulk_write([
+                UpdateOne({'id': student['id']}, {'$set': {SEARCH_TERMS: SearchTerms(student)}})
+                for student in missing
+            ], ordered=False)
+        self.indexed = True
+
+    async def Stop(self) -> None:
+        # The client is shared with the auth routes and closed with the app
+        pass
+
+    async def Version(self) -> str:
+        """
+        Return the students version. Read it before the students, so a
+        response is never tagged with a version newer than its data.
+        """
+        counter = await self._Counter({'_id': 0, 'epoch': 1, 'version': 1, 'pending': 1})
+        if not counter.get('version'):
+            return "0"
+        return f"{counter['epoch']}-{counter['version']}"
+
+    async def _Counter(self, projection: Dict[str, int]) -> Dict[str, Any]:
+        # The counter document ({} before the first change), after logging
+        # any change whose writer announced it but never bumped the version
+        counter = await self.counters.find_one({'_id': self.collection.name}, projection)
+        if counter is None:
+            return {}
+        lost = [entry for entry in counter.get('pending', []) if entry['at'] < time.time() - PENDING_GRACE_SECONDS]
+        for entry in lost:
+            # Conditional on the entry, so only one replica logs it
+            await self.counters.update_one(
+                {'_id': self.collection.name, 'pending.token': entry['token']},
+                self._Bump(entry['ids'], entry['token'])
+            )
+        if lost:
+            logging.warning(f"Logged {len(lost)} student change(s) whose version bump was lost.")
+            counter = await self.counters.find_one({'_id': self.collection.name}, projection)
+        return counter
+
+    async def _Announce(self, studentIds: List[int]) -> str:
+        # Record a change about to be written; returns the token the bump clears.
+        # A recreated counter gets a new epoch, so its versions never repeat old ones
+        token = os.urandom(8).hex()
+        await self.counters.update_one(
+            {'_id': self.collection.name},
+            {
+                '$push': {'pending': {'token': token, 'ids': studentIds, 'at': time.time()}},
+                '$setOnInsert': {'epoch': os.urandom(4).hex(), 'version': 0}
+            },
+            upsert=True
+        )
+        return token
+
+    async def _Withdraw(self, token: str) -> None:
+        # The announced change was not made
+        await self.counters.update_one({'_id': self.collection.name}, {'$pull': {'pending': {'token': token}}})
+
+    async def _BumpVersion(self, studentIds: List[int], token: str) -> None:
+        await self.counters.update_one({'_id': self.collection.name}, self._Bump(studentIds, token))
+
+    @staticmethod
+    def _Bump(studentIds: List[int], token: str) -> Dict[str, Any]:
+        # The last entry of changes always belongs to the current version,
+        # as both move in one atomic update, which also clears the announcement
+        return {
+            '$inc': {'version': 1},
+            '$push': {'changes': {'$each': [studentIds], '$slice': -CHANGE_LOG_ENTRIES}},
+            '$pull': {'pending': {'token': token}}
+        }
+
+    @staticmethod
+    def _Projection(fields: Optional[List[str]], withId: bool = False) -> Dict[str, int]:
+        # Excluding the terms cannot be mixed with including fields, which leaves them out anyway
+        if fields is None:
+            return {'_id': 0, SEARCH_TERMS: 0}
+        projection = {'_id': 0}
+        projection.update({field: 1 for field in fields})
+        if withId:
+            projection['id'] = 1
+        return projection
+
+    @staticmethod
+    def _Document(studentInfo: Dict[str, Any]) -> Dict[str, Any]:
+        # A copy to insert (the driver adds _id to the document it is given), with its search terms
+        return {**studentInfo, SEARCH_TERMS: SearchTerms(studentInfo)}
+
+    async def Add(self, studentInfo: Dict[str, Any]) -> None:
+        _ValidateStudentInfo(studentInfo)
+        # Duplicate IDs are rejected by the unique index
+        await self.Start()
+        token = await self._Announce([studentInfo['id']])
+        try:
+            await self.collection.insert_one(self._Document(studentInfo))
+        except DuplicateKeyError:
+            await self._Withdraw(token)
+            raise _StudentExists(studentInfo['id'])
+        await self._BumpVersion([studentInfo['id']], token)
+        self.events.Added(studentInfo)
+
+    async def AddMany(self, studentInfos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add a batch of students with one unordered insert_many.
+        Returns one error entry per skipped student with its position in the
+        batch, like AddStudents in json_handler.
+        """
+        errors, documents, positions, batchIds = [], [], [], set()
+        for index, studentInfo in enumerate(studentInfos):
+            try:
+                _ValidateStudentInfo(studentInfo)
+                # Report repeats within the batch here, so the first one wins
+                if studentInfo['id'] in batchIds:
+                    raise _StudentExists(studentInfo['id'])
+            except ValueError as e:
+                errors.append({'index': index, 'id': studentInfo.get('id'), 'error': str(e)})
+                continue
+            batchIds.add(studentInfo['id'])
+            documents.append(self._Document(studentInfo))
+            positions.append(index)
+
+        token = None
+        if documents:
+            await self.Start()
+            token = await self._Announce([document['id'] for document in documents])
+            try:
+                await self.collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # Report the rejected students; the rest of the batch was inserted
+                for writeError in e.details.get('writeErrors', []):
+                    index = positions[writeError['index']]
+                    studentId = studentInfos[index]['id']
+                    if writeError['code'] == DUPLICATE_KEY:
+                        message = str(_StudentExists(studentId))
+                    else:
+                        logging.error(f"Error inserting student with ID {studentId}: {writeError['errmsg']}")
+                        message = writeError['errmsg']
+                    errors.append({'index': index, 'id': studentId, 'error': message})
+
+        failed = {error['index'] for error in errors}
+        added = [studentInfos[index] for index in positions if index not in failed]
+        if added:
+            await self._BumpVersion([studentInfo['id'] for studentInfo in added], token)
+        elif token is not None:
+            await self._Withdraw(token)
+        for studentInfo in added:
+            self.events.Added(studentInfo)
+        return sorted(errors, key=lambda error: error['index'])
+
+    async def Remove(self, studentId: int) -> None:
+        token = await self._Announce([studentId])
+        result = await self.collection.delete_one({'id': studentId})
+        if result.deleted_count == 0:
+            await self._Withdraw(token)
+            raise _StudentNotFound(studentId)
+        await self._BumpVersion([studentId], token)
+        self.events.Removed(studentId)
+
+    async def UpdateGrade(self, studentId: int, courseCode: str, newGrade: str) -> None:
+        # The positional operator updates the first matching course, like the other backends
+        token = await self._Announce([studentId])
+        result = await self.collection.update_one(
+            {'id': studentId, 'courses.code': courseCode},
+            {'$set': {'courses.$.grade': newGrade}}
+        )
+        if result.matched_count:
+            await self._BumpVersion([studentId], token)
+            self.events.GradeUpdated(studentId, courseCode, newGrade)
+            return
+        await self._Withdraw(token)
+        if await self.collection.find_one({'id': studentId}, {'_id': 1}) is None:
+            raise _StudentNotFound(studentId)
+        raise _CourseNotFound(studentId, courseCode)
+
+    async def UpdateGrades(self, updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Apply a batch of grade updates with one bulk_write.
+        Returns one error entry per skipped update with its position in the
+        batch, like UpdateStudentGrades in json_handler.
+        """
+        # bulk_write only reports totals, so check the students and courses up front
+        studentIds = list({update['studentId'] for update in updates})
+        found = await self.collection.find(
+            {'id': {'$in': studentIds}}, {'_id': 0, 'id': 1, 'courses.code': 1}
+        ).to_list(None)
+        courseCodes = {student['id']: {course['code'] for course in student.get('courses', [])}
+                       for student in found}
+
+        errors, operations, applied = [], [], []
+        for index, update in enumerate(updates):
+            studentId, courseCode = update['studentId'], update['courseCode']
+            if studentId not in courseCodes:
+                error = _StudentNotFound(studentId)
+            elif courseCode not in courseCodes[studentId]:
+                error = _CourseNotFound(studentId, courseCode)
+            else:
+                operations.append(UpdateOne(
+                    {'id': studentId, 'courses.code': courseCode},
+                    {'$set': {'courses.$.grade': update['newGrade']}}
+                ))
+                applied.append(update)
+                continue
+            errors.append({'index': index, 'studentId': studentId, 'courseCode': courseCode, 'error': str(error)})
+
+        # Ordered, so repeated updates of one grade apply in batch order
+        if operations:
+            changedIds = list({update['studentId'] for update in applied})
+            token = await self._Announce(changedIds)
+            await self.collection.bulk_write(operations, ordered=True)
+            await self._BumpVersion(changedIds, token)
+        for update in applied:
+            self.events.GradeUpdated(update['studentId'], update['courseCode'], update['newGrade'])
+        return errors
+
+    async def Get(self, studentId: int, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        student = await self.collection.find_one({'id': studentId}, self._Projection(fields))
+        if student is None:
+            raise _StudentNotFound(studentId)
+        return student
+
+    async def CourseStudents(self, courseCode: str, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        students = await self.collection.find(
+            {'courses.code': courseCode}, self._Projection(fields)
+        ).sort('id', ASCENDING).to_list(None)
+        if not students:
+            raise _NoCourseStudents(courseCode)
+        return students
+
+    async def CourseStats(self, courseCode: str) -> Dict[str, Any]:
+        """
+        Return the enrollment count, grade distribution and average age of a course.
+        Only the ages and courses of enrolled students are read, through the
+        courses.code index.
+        """
+        students = await self.collection.find(
+            {'courses.code': courseCode}, {'_id': 0, 'age': 1, 'courses.code': 1, 'courses.grade': 1}
+        ).to_list(None)
+        stats = CourseStats()
+        for student in students:
+            stats.AddStudent(student)
+        courseStats = stats.Get(courseCode)
+        if courseStats is None:
+            raise _NoCourseStudents(courseCode)
+        return courseStats
+
+    async def Search(self, query: str, limit: int, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Return up to limit students whose name or email matches the query, best first.
+        Candidates are every student with a search term starting with the
+        query's seed word (the whole query, for email queries), found through
+        the index on the terms. All of them are ranked like the JSON store's
+        search index; fuzzy matches are not found.
+        """
+        if limit < 1:
+            raise _InvalidPageSize(limit)
+        seed = SearchSeed(query)
+        if not seed:
+            return []
+        await self.Start()
+        normalized = query.casefold().strip()
+        prefix = normalized if '@' in normalized else seed
+        # The terms are case-folded, so an anchored case-sensitive regex is an index range scan
+        candidates = await self.collection.find(
+            {SEARCH_TERMS: {'$regex': f"^{re.escape(prefix)}"}}, {'_id': 0, 'id': 1, 'name': 1, 'contact': 1}
+        ).to_list(None)
+        best = [student['id'] for student in RankStudents(query, candidates, limit)]
+        if not best:
+            return []
+        # Read the winners whole; one removed in between is left out
+        students = await self.collection.find(
+            {'id': {'$in': best}}, self._Projection(fields, withId=True)
+        ).to_list(None)
+        studentsById = {student['id']: student for student in students}
+        ranked = [studentsById[studentId] for studentId in best if studentId in studentsById]
+        if fields is not None and 'id' not in fields:
+            for student in ranked:
+                del student['id']
+        return ranked
+
+    async def Changes(self, since: Optional[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Return the students changed since an earlier version, as
+        GetStudentChanges in json_handler does. The counter is read first, so
+        the students are at least as new as the version returned.
+        """
+        counter = await self._Counter({'_id': 0, 'epoch': 1, 'version': 1, 'changes': 1, 'pending': 1})
+        if not counter.get('version'):
+            # Nothing has changed since the counter was (re)created
+            if since is not None and since.strip().removeprefix('W/').strip('"') == "0":
+                return StudentChanges("0", [], [])
+            return {'version': "0", 'resync': True}
+        version = f"{counter['epoch']}-{counter['version']}"
+        changes = counter.get('changes', [])
+        oldest = counter['version'] - len(changes)
+        sinceVersion = SinceVersion(since, counter['epoch'])
+        if sinceVersion is None or not oldest <= sinceVersion <= counter['version']:
+            return {'version': version, 'resync': True}
+        changedIds = {studentId for entry in changes[sinceVersion - oldest:] for studentId in entry}
+        students = await self.collection.find(
+            {'id': {'$in': list(changedIds)}}, self._Projection(fields, withId=True)
+        ).sort('id', ASCENDING).to_list(None)
+        response = StudentChanges(version, changedIds, students)
+        if fields is not None and 'id' not in fields:
+            for student in students:
+                del student['id']
+        return response
+
+    async def Page(self, limit: int, cursor: Optional[int] = None,
+                   fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Return up to limit students ordered by ID, starting after the cursor ID,
+        along with the cursor for the next page (None on the last page).
+        """
+        if limit < 1:
+            raise _InvalidPageSize(limit)
+        query = {'id': {'$gt': cursor}} if cursor is not None else {}
+        # Fetch one extra document to learn whether another page follows
+        students = await self.collection.find(
+            query, self._Projection(fields, withId=True)
+        ).sort('id', ASCENDING).limit(limit + 1).to_list(None)
+        nextCursor = students[limit - 1]['id'] if len(students) > limit else None
+        students = students[:limit]
+        if fields is not None and 'id' not in fields:
+            for student in students:
+                del student['id']
+        return students, nextCursor
+
+    async def AllStudents(self, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Return every student ordered by ID.
+        """
+        return await self.collection.find({}, self._Projection(fields)).sort('id', ASCENDING).to_list(None)
@@ -0,0 +1,63 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from fastapi.responses import JSONResponse
+
+# orjson encodes several times faster than the json module; it is optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def DumpJson(content: Any) -> bytes:
+    """
+    Encode content as compact UTF-8 JSON, with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that renders with DumpJson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return DumpJson(content)
+
+class ResponseCache:
+    """
+    Encoded response bodies for the current version of the student data.
+    Entries are keyed by the data version they were read at, so any change
+    (which moves the version on) invalidates them all; the least recently
+    used entries are dropped beyond maxEntries.
+    """
+
+    def __init__(self, maxEntries: int = 1024):
+        self.maxEntries = maxEntries
+        self.version: Optional[str] = None
+        self.entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def Get(self, version: str, key: Hashable) -> Optional[bytes]:
+        with self.lock:
+            if version != self.version:
+                return None
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def Put(self, version: str, key: Hashable, body: bytes) -> None:
+        if self.maxEntries <= 0:
+            return
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
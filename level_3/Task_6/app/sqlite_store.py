@@ -0,0 +1,438 @@
+import json
+import os
+import sqlite3
+import threading
+import logging
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from student_search import SearchSeed, RankStudents, _Words
+from json_handler import (
+    StudentBackend,
+    IterJsonStudents,
+    SinceVersion,
+    StudentChanges,
+    CHANGE_LOG_SIZE,
+    _StudentExists,
+    _StudentNotFound,
+    _CourseNotFound
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id      INTEGER PRIMARY KEY,
+    name    TEXT NOT NULL,
+    age     INTEGER NOT NULL,
+    contact TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS courses (
+    student_id INTEGER NOT NULL,
+    position   INTEGER NOT NULL,
+    code       TEXT NOT NULL,
+    name       TEXT,
+    grade      TEXT,
+    PRIMARY KEY (student_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS courses_by_code ON courses (code, student_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', lower(hex(randomblob(4))));
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+CREATE TABLE IF NOT EXISTS changes (
+    version    INTEGER NOT NULL,
+    student_id INTEGER NOT NULL,
+    PRIMARY KEY (version, student_id)
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO meta (key, value) SELECT 'changes_from', value FROM meta WHERE key = 'version';
+"""
+
+# The email address and its local part, of a students row named "new"
+_EMAIL = "json_extract(new.contact, '$.email')"
+_LOCAL_PART = f"CASE WHEN instr({_EMAIL}, '@') > 0 THEN substr({_EMAIL}, 1, instr({_EMAIL}, '@') - 1) ELSE {_EMAIL} END"
+
+# Full-text index of the search terms, keyed by student ID and kept in step
+# with the students table by triggers. Underscores stay inside tokens, as
+# they do in the words the JSON store's search index is built from
+SEARCH_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS student_terms USING fts5(name, local, email, tokenize = "unicode61 tokenchars '_'");
+CREATE TRIGGER IF NOT EXISTS students_terms_insert AFTER INSERT ON students BEGIN
+    INSERT INTO student_terms (rowid, name, local, email) VALUES (new.id, new.name, {_LOCAL_PART}, {_EMAIL});
+END;
+CREATE TRIGGER IF NOT EXISTS students_terms_delete AFTER DELETE ON students BEGIN
+    DELETE FROM student_terms WHERE rowid = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS students_terms_update AFTER UPDATE OF name, contact ON students BEGIN
+    UPDATE student_terms SET name = new.name, local = {_LOCAL_PART}, email = {_EMAIL} WHERE rowid = new.id;
+END;
+"""
+
+class SqliteStudentStore(StudentBackend):
+    """
+    Student backend kept in an embedded SQLite database.
+    Students and their courses live in normalized tables, indexed by
+    student ID and by course code. The database runs in WAL mode, so
+    several processes can share it and readers are not blocked by the
+    writer. Reads see committed data only. The version is a counter in the
+    database, bumped in the same transaction as each change, so every
+    process sharing the file agrees on it. The changes table logs the
+    student changed by each of the last CHANGE_LOG_SIZE versions. Names
+    and email addresses are searched through an FTS5 index.
+
+    When the database is empty and importFile exists, its students are
+    imported on first use, so switching from the JSON backend keeps the
+    existing data.
+    """
+
+    def __init__(self, filename: str, importFile: Optional[str] = None):
+        super().__init__()
+        self.filename = filename
+        self.importFile = importFile
+        self.loaded = False
+        # Write connection, shared under self.lock by the writer thread
+        self.connection = self._Connect(checkSameThread=False)
+        # Read connections, one per thread
+        self.readers = threading.local()
+
+    def _Connect(self, checkSameThread: bool = True) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened and committed explicitly
+        connection = sqlite3.connect(self.filename, timeout=30, isolation_level=None,
+                                     check_same_thread=checkSameThread)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        return connection
+
+    def _Reader(self) -> sqlite3.Connection:
+        connection = getattr(self.readers, 'connection', None)
+        if connection is None:
+            connection = self.readers.connection = self._Connect()
+        return connection
+
+    def StartLoading(self) -> None:
+        """
+        Create the tables and import the JSON data file on first use.
+        """
+        if self.loaded:
+            return
+        with self.lock:
+            if self.loaded:
+                return
+            self.connection.executescript(SCHEMA)
+            self._CreateSearchIndex()
+            empty = self.connection.execute("SELECT NOT EXISTS (SELECT 1 FROM students)").fetchone()[0]
+            if empty and self.importFile is not None and os.path.exists(self.importFile):
+                self._Begin()
+                for student in IterJsonStudents(self.importFile):
+                    self._Insert(student)
+                self.Commit()
+                logging.info(f"Imported students from '{self.importFile}' into '{self.filename}'.")
+            self.loaded = True
+
+    def _CreateSearchIndex(self) -> None:
+        # Databases created before the search index get it filled from the
+        # students already there
+        created = self.connection.execute(
+            "SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'student_terms')"
+        ).fetchone()[0]
+        self.connection.executescript(SEARCH_SCHEMA)
+        if not created:
+            self._Begin()
+            self.connection.execute(
+                "INSERT INTO student_terms (rowid, name, local, email) "
+                f"SELECT new.id, new.name, {_LOCAL_PART}, {_EMAIL} FROM students AS new"
+            )
+            self.Commit()
+
+    def Commit(self) -> None:
+        """
+        Commit the open transaction, if any.
+        """
+        with self.lock:
+            if self.connection.in_transaction:
+                self.connection.execute("COMMIT")
+
+    def Rollback(self) -> None:
+        """
+        Roll the open transaction back, if any.
+        """
+        with self.lock:
+            if self.connection.in_transaction:
+                self.connection.execute("ROLLBACK")
+
+    def Compact(self) -> None:
+        """
+        Fold the write-ahead log back into the database file.
+        """
+        with self.lock:
+            self.Commit()
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def Close(self) -> None:
+        self.writer.Stop()
+        with self.lock:
+            self.Commit()
+            self.connection.close()
+
+    def AllStudents(self) -> List[Dict[str, Any]]:
+        """
+        Return every student ordered by ID.
+        """
+        self.StartLoading()
+        reader = self._Reader()
+        rows = reader.execute("SELECT id, name, age, contact FROM students ORDER BY id").fetchall()
+        courses = reader.execute(
+            "SELECT student_id, code, name, grade FROM courses ORDER BY student_id, position"
+        ).fetchall()
+        return self._Assemble(rows, courses)
+
+    def Add(self, studentInfo: Dict[str, Any]) -> None:
+        """
+        Add a new student, rejecting duplicate IDs.
+        """
+        self.StartLoading()
+        with self.lock:
+            self._Begin()
+            self.connection.execute("SAVEPOINT add_student")
+            try:
+                self._Insert(studentInfo)
+                self._BumpVersion(studentInfo['id'])
+            except sqlite3.IntegrityError:
+                self.connection.execute("ROLLBACK TO add_student")
+                raise _StudentExists(studentInfo['id'])
+            except Exception:
+                self.connection.execute("ROLLBACK TO add_student")
+                raise
+            finally:
+                self.connection.execute("RELEASE add_student")
+
+    def Remove(self, studentId: int) -> None:
+        """
+        Remove a student by ID.
+        """
+        self.StartLoading()
+        with self.lock:
+            self._Begin()
+            if self.connection.execute("DELETE FROM students WHERE id = ?", (studentId,)).rowcount == 0:
+                raise _StudentNotFound(studentId)
+            self.connection.execute("DELETE FROM courses WHERE student_id = ?", (studentId,))
+            self._BumpVersion(studentId)
+
+    def UpdateGrade(self, studentId: int, courseCode: str, newGrade: str) -> None:
+        """
+        Update one course grade of a student.
+        """
+        self.StartLoading()
+        with self.lock:
+            self._Begin()
+            updated = self.connection.execute(
+                "UPDATE courses SET grade = ? WHERE student_id = ? AND position = "
+                "(SELECT MIN(position) FROM courses WHERE student_id = ? AND code = ?)",
+                (newGrade, studentId, studentId, courseCode)
+            ).rowcount
+            if updated:
+                self._BumpVersion(studentId)
+                return
+            if self.connection.execute("SELECT 1 FROM students WHERE id = ?", (studentId,)).fetchone() is None:
+                raise _StudentNotFound(studentId)
+            raise _CourseNotFound(studentId, courseCode)
+
+    def Get(self, studentId: int) -> Dict[str, Any]:
+        """
+        Return a student by ID.
+        """
+        self.StartLoading()
+        reader = self._Reader()
+        rows = reader.execute("SELECT id, name, age, contact FROM students WHERE id = ?", (studentId,)).fetchall()
+        if not rows:
+            raise _StudentNotFound(studentId)
+        courses = reader.execute(
+            "SELECT student_id, code, name, grade FROM courses WHERE student_id = ? ORDER BY position", (studentId,)
+        ).fetchall()
+        return self._Assemble(rows, courses)[0]
+
+    def CourseStudents(self, courseCode: str) -> List[Dict[str, Any]]:
+        """
+        Return every student enrolled in a course, ordered by ID.
+        """
+        self.StartLoading()
+        reader = self._Reader()
+        enrolled = "SELECT student_id FROM courses WHERE code = ?"
+        rows = reader.execute(
+            f"SELECT id, name, age, contact FROM students WHERE id IN ({enrolled}) ORDER BY id", (courseCode,)
+        ).fetchall()
+        courses = reader.execute(
+            f"SELECT student_id, code, name, grade FROM courses WHERE student_id IN ({enrolled}) "
+            "ORDER BY student_id, position", (courseCode,)
+        ).fetchall()
+        return self._Assemble(rows, courses)
+
+    def Page(self, limit: int, cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Return up to limit students ordered by ID, starting after the cursor ID,
+        along with the cursor for the next page (None on the last page).
+        """
+        self.StartLoading()
+        reader = self._Reader()
+        # Fetch one extra row to learn whether another page follows
+        if cursor is None:
+            rows = reader.execute(
+                "SELECT id, name, age, contact FROM students ORDER BY id LIMIT ?", (limit + 1,)
+            ).fetchall()
+        else:
+            rows = reader.execute(
+                "SELECT id, name, age, contact FROM students WHERE id > ? ORDER BY id LIMIT ?", (cursor, limit + 1)
+            ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if not rows:
+            return [], None
+        courses = reader.execute(
+            "SELECT student_id, code, name, grade FROM courses WHERE student_id BETWEEN ? AND ? "
+            "ORDER BY student_id, position", (rows[0][0], rows[-1][0])
+        ).fetchall()
+        return self._Assemble(rows, courses), rows[-1][0] if more else None
+
+    def CourseStats(self, courseCode: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the statistics of a course, or None if nobody is enrolled.
+        Aggregated by SQLite over the course code index.
+        """
+        self.StartLoading()
+        # A student counts once per course, with the grade of the first matching entry
+        rows = self._Reader().execute(
+            "SELECT c.grade, COUNT(*), SUM(s.age) FROM courses c JOIN students s ON s.id = c.student_id "
+            "WHERE c.code = ? AND c.position = "
+            "(SELECT MIN(position) FROM courses WHERE student_id = c.student_id AND code = c.code) "
+            "GROUP BY c.grade", (courseCode,)
+        ).fetchall()
+        if not rows:
+            return None
+        enrolled = sum(count for _, count, _ in rows)
+        return {
+            'code': courseCode,
+            'enrolled': enrolled,
+            'averageAge': sum(ageTotal for _, _, ageTotal in rows) / enrolled,
+            'grades': {grade: count for grade, count, _ in rows}
+        }
+
+    def Search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Return up to limit students whose name or email matches the query, best first.
+        The FTS5 index finds every student with a name word or email local
+        part starting with the query's seed word (an email starting with its
+        local part, for email queries). All of them are ranked like the JSON
+        store's search index; fuzzy matches are not found.
+        """
+        self.StartLoading()
+        words = _Words(SearchSeed(query))
+        if not words:
+            return []
+        phrase = '"' + ' '.join(words) + '"*'
+        match = f"email : ^{phrase}" if '@' in query else f"{{name local}} : {phrase}"
+        reader = self._Reader()
+        # Rank on names and contacts, then read the courses of the winners only
+        candidates = [
+            {'id': studentId, 'name': name, 'contact': json.loads(contact)}
+            for studentId, name, contact in reader.execute(
+                "SELECT s.id, s.name, s.contact FROM student_terms JOIN students s ON s.id = student_terms.rowid "
+                "WHERE student_terms MATCH ?", (match,)
+            )
+        ]
+        best = [student['id'] for student in RankStudents(query, candidates, limit)]
+        if not best:
+            return []
+        placeholders = ','.join('?' * len(best))
+        rows = reader.execute(
+            f"SELECT id, name, age, contact FROM students WHERE id IN ({placeholders}) ORDER BY id", best
+        ).fetchall()
+        courses = reader.execute(
+            f"SELECT student_id, code, name, grade FROM courses WHERE student_id IN ({placeholders}) "
+            "ORDER BY student_id, position", best
+        ).fetchall()
+        # A winner removed in between is left out
+        studentsById = {student['id']: student for student in self._Assemble(rows, courses)}
+        return [studentsById[studentId] for studentId in best if studentId in studentsById]
+
+    def Version(self) -> str:
+        """
+        Return the committed database version.
+        """
+        self.StartLoading()
+        epoch, version = self._Reader().execute(
+            "SELECT (SELECT value FROM meta WHERE key = 'epoch'), (SELECT value FROM meta WHERE key = 'version')"
+        ).fetchone()
+        return f"{epoch}-{version}"
+
+    def Changes(self, since: Optional[str]) -> Dict[str, Any]:
+        """
+        Return the students changed since an earlier version of the database.
+        """
+        self.StartLoading()
+        reader = self._Reader()
+        # One read transaction, so the version, log and students agree
+        reader.execute("BEGIN")
+        try:
+            epoch, version, changesFrom = reader.execute(
+                "SELECT (SELECT value FROM meta WHERE key = 'epoch'), "
+                "(SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'version'), "
+                "(SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'changes_from')"
+            ).fetchone()
+            sinceVersion = SinceVersion(since, epoch)
+            if sinceVersion is None or not max(changesFrom, version - CHANGE_LOG_SIZE) <= sinceVersion <= version:
+                return {'version': f"{epoch}-{version}", 'resync': True}
+            changed = "SELECT student_id FROM changes WHERE version > ?"
+            changedIds = [row[0] for row in reader.execute(changed, (sinceVersion,))]
+            rows = reader.execute(
+                f"SELECT id, name, age, contact FROM students WHERE id IN ({changed}) ORDER BY id", (sinceVersion,)
+            ).fetchall()
+            courses = reader.execute(
+                f"SELECT student_id, code, name, grade FROM courses WHERE student_id IN ({changed}) "
+                "ORDER BY student_id, position", (sinceVersion,)
+            ).fetchall()
+        finally:
+            reader.execute("COMMIT")
+        return StudentChanges(f"{epoch}-{version}", changedIds, self._Assemble(rows, courses))
+
+    def _BumpVersion(self, studentId: int) -> None:
+        # Log the changed student under the new version, forgetting the oldest entries
+        self.connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        self.connection.execute(
+            "INSERT OR IGNORE INTO changes (version, student_id) "
+            "SELECT CAST(value AS INTEGER), ? FROM meta WHERE key = 'version'", (studentId,)
+        )
+        self.connection.execute(
+            "DELETE FROM changes WHERE version <= (SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'version') - ?",
+            (CHANGE_LOG_SIZE,)
+        )
+
+    def _Begin(self) -> None:
+        if not self.connection.in_transaction:
+            self.connection.execute("BEGIN IMMEDIATE")
+
+    def _Insert(self, student: Dict[str, Any]) -> None:
+        self.connection.execute(
+            "INSERT INTO students (id, name, age, contact) VALUES (?, ?, ?, ?)",
+            (student['id'], student['name'], student['age'], json.dumps(student['contact']))
+        )
+        self.connection.executemany(
+            "INSERT INTO courses (student_id, position, code, name, grade) VALUES (?, ?, ?, ?, ?)",
+            [(student['id'], position, course['code'], course.get('name'), course.get('grade'))
+             for position, course in enumerate(student['courses'])]
+        )
+
+    @staticmethod
+    def _Assemble(rows: Iterable[Tuple], courses: Iterable[Tuple]) -> List[Dict[str, Any]]:
+        # Both inputs are ordered by student ID, courses by position within a student
+        coursesById: Dict[int, List[Dict[str, Any]]] = {}
+        for studentId, code, name, grade in courses:
+            coursesById.setdefault(studentId, []).append({'code': code, 'name': name, 'grade': grade})
+        return [
+            {
+                'id': studentId,
+                'name': name,
+                'age': age,
+                'courses': coursesById.get(studentId, []),
+                'contact': json.loads(contact)
+            }
+            for studentId, name, age, contact in rows
+        ]
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from response_cache import DumpJson
+
+logger = logging.getLogger(__name__)
+
+# Comment line sent on an idle stream, so proxies keep the connection open
+KEEPALIVE = b": keepalive\n\n"
+
+class EventSubscription:
+    """
+    One client's bounded buffer of encoded events. A client that falls
+    bufferSize events behind is a slow consumer: its buffer is dropped and
+    its stream ends with an overflow event, so the client reloads the
+    students instead of the server holding events for it without limit.
+    """
+
+    def __init__(self, bufferSize: int):
+        self.bufferSize = bufferSize
+        self.buffer: "deque[bytes]" = deque()
+        self.closed = False
+        self.ready = asyncio.Event()
+
+    def Offer(self, message: bytes) -> bool:
+        """
+        Queue an event; returns False once the subscription is closed.
+        """
+        if self.closed:
+            return False
+        if len(self.buffer) >= self.bufferSize:
+            self.closed = True
+            self.buffer.clear()
+        else:
+            self.buffer.append(message)
+        self.ready.set()
+        return not self.closed
+
+    async def Next(self, timeout: float) -> Optional[bytes]:
+        """
+        Return the next event, KEEPALIVE after timeout seconds without one,
+        or None when the subscription was closed for falling behind.
+        """
+        if not self.buffer and not self.closed:
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return KEEPALIVE
+        if self.closed:
+            return None
+        return self.buffer.popleft()
+
+class StudentEventHub:
+    """
+    Fans student changes out to Server-Sent Events subscribers in this
+    process. The repositories publish after each change is committed; each
+    event is encoded once and queued on every subscription.
+    """
+
+    def __init__(self, bufferSize: int = 256, heartbeat: float = 15.0):
+        self.bufferSize = bufferSize
+        self.heartbeat = heartbeat
+        self.subscriptions: Set[EventSubscription] = set()
+        self.lastId = 0
+
+    def Subscribe(self) -> EventSubscription:
+        subscription = EventSubscription(self.bufferSize)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def Unsubscribe(self, subscription: EventSubscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def Publish(self, kind: str, data: Dict[str, Any]) -> None:
+        """
+        Send an event to every subscriber, dropping those that fell behind.
+        """
+        self.lastId += 1
+        message = b"id: %d\nevent: %s\ndata: %s\n\n" % (self.lastId, kind.encode(), DumpJson(data))
+        for subscription in list(self.subscriptions):
+            if not subscription.Offer(message):
+                logger.warning(f"Disconnecting slow student event subscriber ({self.bufferSize} events behind)")
+                self.subscriptions.discard(subscription)
+
+    def Added(self, student: Dict[str, Any]) -> None:
+        self.Publish("added", {"student": student})
+
+    def GradeUpdated(self, studentId: int, courseCode: str, grade: str) -> None:
+        self.Publish("updated", {"studentId": studentId, "courseCode": courseCode, "grade": grade})
+
+    def Removed(self, studentId: int) -> None:
+        self.Publish("deleted", {"studentId": studentId})
+
+    async def Stream(self, subscription: EventSubscription) -> AsyncIterator[bytes]:
+        """
+        Yield the subscription's events in text/event-stream format until it
+        is closed; unsubscribes when the client goes away.
+        """
+        try:
+            # Ask browsers to wait a few seconds before reconnecting
+            yield b"retry: 3000\n\n"
+            while True:
+                message = await subscription.Next(self.heartbeat)
+                if message is None:
+                    yield b"event: overflow\ndata: {}\n\n"
+                    return
+                yield message
+        finally:
+            self.Unsubscribe(subscription)
@@ -0,0 +1,108 @@
+import json
+import os
+import shutil
+import logging
+from typing import Dict, List, Any, Iterator, Optional
+
+class StudentJournal:
+    """
+    Append-only log of student mutations, one JSON record per line.
+    Records are replayed on top of the last snapshot of the data file.
+
+    A snapshot is written while new records keep arriving: Rotate() moves
+    the records so far to a rotated segment and later appends start a new
+    file. The rotated segment is replayed before the journal until
+    DiscardRotated() drops it, once the snapshot covering it is durable.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.rotatedFile = filename + '.rotated'
+        self.file: Optional[Any] = None
+
+    def Append(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Durably append a batch of records with a single write and fsync.
+        A failed append is cut back off the file, so the batch is either
+        all in the journal or not in it at all.
+        """
+        if not records:
+            return
+        if self.file is None:
+            self.file = open(self.filename, 'a')
+        size = self.file.tell()
+        try:
+            self.file.write(''.join(json.dumps(record) + '\n' for record in records))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except Exception:
+            self._CutBack(size)
+            raise
+
+    def Read(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the journal records in the order they were written, those of
+        a rotated segment first. A torn final line left by a crash
+        mid-append is skipped.
+        """
+        yield from self._ReadFile(self.rotatedFile)
+        yield from self._ReadFile(self.filename)
+
+    def Rotate(self) -> None:
+        """
+        Move the records written so far to the rotated segment.
+        A segment left by an interrupted snapshot is kept and extended, so
+        no record is dropped before a snapshot covers it.
+        """
+        self.Close()
+        if not os.path.exists(self.filename):
+            return
+        if os.path.exists(self.rotatedFile):
+            with open(self.filename, 'rb') as source, open(self.rotatedFile, 'ab') as target:
+                shutil.copyfileobj(source, target)
+                target.flush()
+                os.fsync(target.fileno())
+            os.remove(self.filename)
+        else:
+            os.replace(self.filename, self.rotatedFile)
+
+    def DiscardRotated(self) -> None:
+        """
+        Drop the rotated segment, once a durable snapshot covers it.
+        """
+        try:
+            os.remove(self.rotatedFile)
+        except FileNotFoundError:
+            pass
+
+    def _CutBack(self, size: int) -> None:
+        # Drop whatever part of a failed append reached the file; reopened
+        # by the next append, as the buffer may still hold the batch
+        file, self.file = self.file, None
+        try:
+            file.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(self.filename, size)
+        except OSError as e:
+            logging.error(f"Failed to cut a failed append off '{self.filename}': {e}")
+
+    def _ReadFile(self, filename: str) -> Iterator[Dict[str, Any]]:
+        try:
+            with open(filename, 'r') as file:
+                for lineNumber, line in enumerate(file, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logging.warning(f"Ignoring unreadable journal record at line {lineNumber} of '{filename}'.")
+                        return
+        except FileNotFoundError:
+            return
+
+    def Close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from student_events import StudentEventHub
+
+from json_handler import (
+    StudentBackend,
+    AddStudent,
+    AddStudents,
+    RemoveStudent,
+    UpdateStudentGrade,
+    UpdateStudentGrades,
+    GetStudentDetails,
+    GetCourseStudents,
+    GetCourseStats,
+    GetStudentsPage,
+    SearchStudents,
+    GetStudentChanges,
+    ProjectStudents
+)
+
+class StudentRepository:
+    """
+    Async access to students kept in a StudentBackend (JSON or SQLite).
+    Mutations are queued on the backend's single writer and awaited without
+    blocking the event loop; reads run in the threadpool. The routes use the
+    same methods on MongoStudentRepository, so either can serve them.
+    Committed changes are published to events.
+    """
+
+    def __init__(self, backend: StudentBackend):
+        self.backend = backend
+        self.events = StudentEventHub()
+
+    async def Start(self) -> None:
+        """
+        Start loading the backend (the JSON store loads in the background).
+        """
+        await run_in_threadpool(self.backend.StartLoading)
+
+    async def Stop(self) -> None:
+        """
+        Commit any queued changes and stop the backend's writer.
+        """
+        await run_in_threadpool(self.backend.writer.Stop)
+
+    async def Version(self) -> str:
+        return await run_in_threadpool(self.backend.Version)
+
+    async def _Submit(self, mutation: Callable[[StudentBackend], Any]) -> Any:
+        return await asyncio.wrap_future(self.backend.Submit(mutation))
+
+    async def Add(self, studentInfo: Dict[str, Any]) -> None:
+        await self._Submit(lambda data: AddStudent(data, studentInfo))
+        self.events.Added(studentInfo)
+
+    async def AddMany(self, studentInfos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add a batch of students with one commit; returns the per-student errors.
+        """
+        errors = await self._Submit(lambda data: AddStudents(data, studentInfos))
+        failed = {error['index'] for error in errors}
+        for index, studentInfo in enumerate(studentInfos):
+            if index not in failed:
+                self.events.Added(studentInfo)
+        return errors
+
+    async def Remove(self, studentId: int) -> None:
+        await self._Submit(lambda data: RemoveStudent(data, studentId))
+        self.events.Removed(studentId)
+
+    async def UpdateGrade(self, studentId: int, courseCode: str, newGrade: str) -> None:
+        await self._Submit(lambda data: UpdateStudentGrade(data, studentId, courseCode, newGrade))
+        self.events.GradeUpdated(studentId, courseCode, newGrade)
+
+    async def UpdateGrades(self, updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Apply a batch of grade updates with one commit; returns the per-update errors.
+        """
+        errors = await self._Submit(lambda data: UpdateStudentGrades(data, updates))
+        failed = {error['index'] for error in errors}
+        for index, update in enumerate(updates):
+            if index not in failed:
+                self.events.GradeUpdated(update['studentId'], update['courseCode'], update['newGrade'])
+        return errors
+
+    async def Get(self, studentId: int, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        student = await run_in_threadpool(GetStudentDetails, self.backend, studentId)
+        return ProjectStudents([student], fields)[0]
+
+    async def CourseStudents(self, courseCode: str, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        students = await run_in_threadpool(GetCourseStudents, self.backend, courseCode)
+        return ProjectStudents(students, fields)
+
+    async def CourseStats(self, courseCode: str) -> Dict[str, Any]:
+        return await run_in_threadpool(GetCourseStats, self.backend, courseCode)
+
+    async def Search(self, query: str, limit: int, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        students = await run_in_threadpool(SearchStudents, self.backend, query, limit)
+        return ProjectStudents(students, fields)
+
+    async def Changes(self, since: Optional[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        changes = await run_in_threadpool(GetStudentChanges, self.backend, since)
+        if 'students' in changes:
+            changes['students'] = ProjectStudents(changes['students'], fields)
+        return changes
+
+    async def Page(self, limit: int, cursor: Optional[int] = None,
+                   fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        students, nextCursor = await run_in_threadpool(GetStudentsPage, self.backend, limit, cursor)
+        return ProjectStudents(students, fields), nextCursor
+
+    async def AllStudents(self, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        students = await run_in_threadpool(self.backend.AllStudents)
+        return ProjectStudents(students, fields)
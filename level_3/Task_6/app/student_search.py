@@ -0,0 +1,264 @@
+import re
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nlargest
+from operator import itemgetter
+from typing import Dict, List, Any, Iterable, Iterator, Mapping, Set
+
+_WORD = re.compile(r"\w+")
+
+# Smallest trigram similarity reported as a fuzzy match
+FUZZY_THRESHOLD = 0.3
+# Trigram postings read per fuzzy query, rarest trigrams first
+MAX_POSTINGS_SCANNED = 20_000
+
+def _Words(text: Any) -> List[str]:
+    return _WORD.findall(str(text).casefold())
+
+def _Email(student: Dict[str, Any]) -> str:
+    contact = student.get('contact')
+    email = contact.get('email') if isinstance(contact, dict) else None
+    return str(email).casefold().strip() if email else ''
+
+def _Terms(student: Dict[str, Any]) -> Set[str]:
+    # Name words and the local part of the email address
+    terms = set(_Words(student.get('name', '')))
+    localPart = _Email(student).partition('@')[0]
+    if localPart:
+        terms.add(localPart)
+    return terms
+
+def _Trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _StudentWords(student: Dict[str, Any]) -> List[str]:
+    return _Words(student.get('name', '')) + _Words(_Email(student).partition('@')[0])
+
+def _PrefixScore(query: str, student: Dict[str, Any]) -> float:
+    # query is case-folded; 0 unless every query word starts a term
+    if '@' in query:
+        email = _Email(student)
+        if email == query:
+            return 2.0
+        if email.startswith(query):
+            return 1.0 + len(query) / len(email)
+        return 0.0
+    words = _Words(query)
+    if not words:
+        return 0.0
+    terms = _Terms(student)
+    exact = 0
+    for word in words:
+        if word in terms:
+            exact += 1
+        elif not any(term.startswith(word) for term in terms):
+            return 0.0
+    return 1.0 + (1 + exact) / (1 + len(words))
+
+def _Similarity(queryGrams: List[Set[str]], student: Dict[str, Any]) -> float:
+    # Average over the query words of the best trigram Jaccard similarity
+    # against any word of the student's name or email local part
+    studentGrams = [_Trigrams(word) for word in set(_StudentWords(student))]
+    if not studentGrams or not queryGrams:
+        return 0.0
+    total = 0.0
+    for grams in queryGrams:
+        total += max(len(grams & other) / len(grams | other) for other in studentGrams)
+    return total / len(queryGrams)
+
+def ScoreStudent(query: str, student: Dict[str, Any]) -> float:
+    """
+    Score how well a student matches a search query.
+    Prefix matches score above 1, more the more query words are whole
+    words (2 when all are, or when the email matches exactly). Fuzzy
+    matches score their trigram similarity, and 0 means no match.
+    """
+    query = query.casefold().strip()
+    score = _PrefixScore(query, student)
+    if score or '@' in query:
+        return score
+    similarity = _Similarity([_Trigrams(word) for word in _Words(query)], student)
+    return similarity if similarity >= FUZZY_THRESHOLD else 0.0
+
+def SearchSeed(query: str) -> str:
+    """
+    Return the query word to look prefix candidates up by: the email
+    local part for email queries, otherwise the longest (most selective)
+    word. Empty when the query has no words.
+    """
+    normalized = query.casefold().strip()
+    if '@' in normalized:
+        return normalized.partition('@')[0]
+    return max(_Words(normalized), key=len, default='')
+
+def SearchTerms(student: Dict[str, Any]) -> List[str]:
+    """
+    Return the case-folded terms prefix queries are matched against: the
+    name words, the email local part and the whole email address.
+    """
+    terms = _Terms(student)
+    email = _Email(student)
+    if email:
+        terms.add(email)
+    return sorted(terms)
+
+def RankStudents(query: str, students: Iterable[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """
+    Return the best limit matches of the query, best first (ties by ID).
+    """
+    scored = ((ScoreStudent(query, student), student) for student in students)
+    best = nlargest(limit, ((score, -student['id'], student) for score, student in scored if score > 0),
+                    key=itemgetter(0, 1))
+    return [student for _, _, student in best]
+
+class StudentSearchIndex:
+    """
+    Prefix and trigram index over student names and email addresses.
+    The terms are the case-folded name words and email local part of each
+    student. A sorted list of the distinct terms answers prefix queries
+    with a binary search: every student under the rarest query word's
+    terms is checked, so no prefix match is missed. Trigram postings find
+    candidates for fuzzy matching when a query has too few prefix matches.
+
+    Trigram postings are append-only arrays. Candidates are always scored
+    against the current student, so entries left behind by removed
+    students only cost a lookup; the postings are rebuilt once stale
+    entries outnumber live ones.
+    """
+
+    def __init__(self, students: Mapping[int, Dict[str, Any]]):
+        # The indexed students by ID, kept up to date by the owner
+        self.students = students
+        self.terms: List[str] = []
+        # Term -> student ID, or a dict of IDs when several students share it
+        self.termIds: Dict[str, Any] = {}
+        self.trigrams: Dict[str, array] = {}
+        self.livePostings = 0
+        self.totalPostings = 0
+        self._Build()
+
+    def Add(self, student: Dict[str, Any]) -> None:
+        for term in _Terms(student):
+            self._AddTerm(term, student['id'])
+        self._AddTrigrams(student)
+
+    def Remove(self, student: Dict[str, Any]) -> None:
+        for term in _Terms(student):
+            self._RemoveTerm(term, student['id'])
+        self.livePostings -= sum(len(_Trigrams(word)) for word in set(_StudentWords(student)))
+        if self.totalPostings > 2 * self.livePostings + 1024:
+            self._BuildTrigrams()
+
+    def Search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Return up to limit students matching the query, best first.
+        """
+        seed = SearchSeed(query)
+        if not seed:
+            return []
+        normalized = query.casefold().strip()
+
+        # Every query word must start a term, so the students of the rarest
+        # word's terms hold all the prefix matches; each is checked in full
+        words = [seed] if '@' in normalized else _Words(normalized)
+        rarest = min(words, key=self._PrefixCount)
+        scores: Dict[int, float] = {}
+        for studentId in self._PrefixIds(rarest):
+            student = self.students.get(studentId)
+            if student is not None:
+                score = _PrefixScore(normalized, student)
+                if score > 0:
+                    scores[studentId] = score
+
+        # Fill up with fuzzy matches found through the rarest trigrams
+        if len(scores) < limit and '@' not in normalized:
+            queryGrams = [_Trigrams(word) for word in _Words(normalized)]
+            counts: Counter = Counter()
+            scanned = 0
+            for posting in sorted((self.trigrams.get(gram, ()) for gram in set().union(*queryGrams)), key=len):
+                if scanned and scanned + len(posting) > MAX_POSTINGS_SCANNED:
+                    break
+                counts.update(posting)
+                scanned += len(posting)
+            for studentId, _ in nlargest(limit * 5, counts.items(), key=itemgetter(1)):
+                student = self.students.get(studentId)
+                if student is not None and studentId not in scores:
+                    similarity = _Similarity(queryGrams, student)
+                    if similarity >= FUZZY_THRESHOLD:
+                        scores[studentId] = similarity
+
+        best = nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [self.students[studentId] for studentId, _ in best]
+
+    def _PrefixTerms(self, prefix: str) -> Iterator[str]:
+        position = bisect_left(self.terms, prefix)
+        while position < len(self.terms) and self.terms[position].startswith(prefix):
+            yield self.terms[position]
+            position += 1
+
+    def _PrefixCount(self, prefix: str) -> int:
+        # Postings of the terms starting with prefix, counted without collecting them
+        return sum(len(ids) if isinstance(ids, dict) else 1
+                   for ids in map(self.termIds.__getitem__, self._PrefixTerms(prefix)))
+
+    def _PrefixIds(self, prefix: str) -> List[int]:
+        # IDs of every term starting with prefix, the exact term first
+        ids: Dict[int, None] = {}
+        for term in self._PrefixTerms(prefix):
+            termIds = self.termIds[term]
+            if isinstance(termIds, dict):
+                ids.update(termIds)
+            else:
+                ids[termIds] = None
+        return list(ids)
+
+    def _Build(self) -> None:
+        for student in self.students.values():
+            for term in _Terms(student):
+                ids = self.termIds.get(term)
+                if ids is None:
+                    self.termIds[term] = student['id']
+                elif isinstance(ids, dict):
+                    ids[student['id']] = None
+                elif ids != student['id']:
+                    self.termIds[term] = {ids: None, student['id']: None}
+        self.terms = sorted(self.termIds)
+        self._BuildTrigrams()
+
+    def _BuildTrigrams(self) -> None:
+        self.trigrams = {}
+        self.livePostings = self.totalPostings = 0
+        for student in self.students.values():
+            self._AddTrigrams(student)
+
+    def _AddTrigrams(self, student: Dict[str, Any]) -> None:
+        for word in set(_StudentWords(student)):
+            for gram in _Trigrams(word):
+                posting = self.trigrams.get(gram)
+                if posting is None:
+                    posting = self.trigrams[gram] = array('q')
+                posting.append(student['id'])
+                self.livePostings += 1
+                self.totalPostings += 1
+
+    def _AddTerm(self, term: str, studentId: int) -> None:
+        ids = self.termIds.get(term)
+        if ids is None:
+            self.termIds[term] = studentId
+            insort(self.terms, term)
+        elif isinstance(ids, dict):
+            ids[studentId] = None
+        elif ids != studentId:
+            self.termIds[term] = {ids: None, studentId: None}
+
+    def _RemoveTerm(self, term: str, studentId: int) -> None:
+        ids = self.termIds.get(term)
+        if isinstance(ids, dict):
+            ids.pop(studentId, None)
+            if len(ids) == 1:
+                self.termIds[term] = next(iter(ids))
+        elif ids == studentId:
+            del self.termIds[term]
+            del self.terms[bisect_left(self.terms, term)]
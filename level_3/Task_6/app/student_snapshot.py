@@ -0,0 +1,232 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import logging
+from array import array
+from typing import Dict, List, Any, Iterable, Iterator, Optional
+
+from atomic_file import AtomicWrite
+
+# File layout, all integers little-endian:
+#   header    magic, version, student count, string count and the offsets
+#             of the sections below
+#   records   one length-prefixed record per student, in store order
+#   strings   string count + 1 offsets (u64) followed by the UTF-8 blob
+#   index     (id i64, record offset u64) pairs sorted by id
+MAGIC = b'SKRS'
+VERSION = 1
+_HEADER = struct.Struct('<4sHHIIQQQ')
+_RECORD_HEADER = struct.Struct('<IB')
+_STANDARD_RECORD = struct.Struct('<qiIH')
+_COURSE = struct.Struct('<III')
+_CONTACT = struct.Struct('<II')
+_INDEX_ENTRY = struct.Struct('<qQ')
+
+# Record kinds: field by field through the string table, or the record's JSON
+_STANDARD = 0
+_JSON = 1
+
+# The key order written by StudentModel
+_STUDENT_KEYS = ('id', 'name', 'age', 'courses', 'contact')
+_COURSE_KEYS = ('code', 'name', 'grade')
+_CONTACT_KEYS = ('email', 'phone')
+
+def _IsStandardShape(student: Dict[str, Any]) -> bool:
+    # Exactly the shape written by StudentModel; anything else (extra keys,
+    # other key order, unhashable grades) cannot be packed field by field
+    if tuple(student) != _STUDENT_KEYS:
+        return False
+    contact = student['contact']
+    if not isinstance(contact, dict) or tuple(contact) != _CONTACT_KEYS:
+        return False
+    if not isinstance(student['courses'], list):
+        return False
+    for course in student['courses']:
+        if not isinstance(course, dict) or tuple(course) != _COURSE_KEYS:
+            return False
+        if not isinstance(course['code'], str) or not isinstance(course['name'], str):
+            return False
+        try:
+            hash(course['grade'])
+        except TypeError:
+            return False
+    return True
+
+def _IsEncodable(student: Dict[str, Any]) -> bool:
+    if not _IsStandardShape(student):
+        return False
+    if not isinstance(student['id'], int) or not -2**63 <= student['id'] < 2**63:
+        return False
+    if not isinstance(student['age'], int) or not -2**31 <= student['age'] < 2**31:
+        return False
+    contact = student['contact']
+    strings = [student['name'], contact['email'], contact['phone']]
+    for course in student['courses']:
+        strings.extend((course['code'], course['name'], course['grade']))
+    return len(student['courses']) < 2**16 and all(isinstance(value, str) for value in strings)
+
+def WriteStudentSnapshot(filename: str, students: Iterable[Dict[str, Any]]) -> None:
+    """
+    Write students to a binary snapshot file.
+    The file is replaced atomically (see AtomicWrite), so readers that have
+    the old snapshot memory-mapped keep a consistent view.
+    """
+    stringNumbers: Dict[str, int] = {}
+
+    def StringNumber(value: str) -> int:
+        number = stringNumbers.get(value)
+        if number is None:
+            number = stringNumbers[value] = len(stringNumbers)
+        return number
+
+    records = bytearray()
+    index = []
+    for student in students:
+        if not isinstance(student.get('id'), int) or not -2**63 <= student['id'] < 2**63:
+            logging.error(f"Student ID {student.get('id')!r} cannot be stored in a binary snapshot.")
+            raise ValueError(f"Student ID {student.get('id')!r} cannot be stored in a binary snapshot.")
+        index.append((student['id'], _HEADER.size + len(records)))
+
+        if _IsEncodable(student):
+            body = bytearray(_STANDARD_RECORD.pack(
+                student['id'], student['age'], StringNumber(student['name']), len(student['courses'])
+            ))
+            for course in student['courses']:
+                body += _COURSE.pack(
+                    StringNumber(course['code']), StringNumber(course['name']), StringNumber(course['grade'])
+                )
+            body += _CONTACT.pack(StringNumber(student['contact']['email']), StringNumber(student['contact']['phone']))
+            kind = _STANDARD
+        else:
+            body = json.dumps(student).encode('utf-8')
+            kind = _JSON
+        records += _RECORD_HEADER.pack(len(body), kind)
+        records += body
+
+    encoded = [value.encode('utf-8') for value in stringNumbers]
+    offsets = array('Q', [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+
+    index.sort()
+    for previous, current in zip(index, index[1:]):
+        if previous[0] == current[0]:
+            logging.error(f"Duplicate student ID {current[0]} in binary snapshot.")
+            raise ValueError(f"Duplicate student ID {current[0]} in binary snapshot.")
+
+    stringsOffset = _HEADER.size + len(records)
+    indexOffset = stringsOffset + len(offsets) * 8 + sum(len(value) for value in encoded)
+    header = _HEADER.pack(MAGIC, VERSION, 0, len(index), len(encoded), stringsOffset, indexOffset, _HEADER.size)
+
+    with AtomicWrite(filename, binary=True) as file:
+        file.write(header)
+        file.write(records)
+        file.write(offsets.tobytes())
+        for value in encoded:
+            file.write(value)
+        for studentId, offset in index:
+            file.write(_INDEX_ENTRY.pack(studentId, offset))
+
+class StudentSnapshot:
+    """
+    Read-only, memory-mapped view of a binary student snapshot.
+    Opening only reads the header; Get() binary-searches the ID index and
+    decodes a single record, so lookups can be served before (or instead
+    of) decoding the whole dataset.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < _HEADER.size:
+                raise self._Invalid()
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self.stringCount, self.stringsOffset, self.indexOffset, self.recordsOffset = \
+            _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or self.indexOffset + self.count * _INDEX_ENTRY.size != size:
+            self.map.close()
+            raise self._Invalid()
+        self.blobOffset = self.stringsOffset + (self.stringCount + 1) * 8
+        # Strings decoded so far, by number
+        self.strings: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every student in store order.
+        """
+        self._DecodeAllStrings()
+        offset = self.recordsOffset
+        for _ in range(self.count):
+            student, offset = self._DecodeRecord(offset)
+            yield student
+
+    def Get(self, studentId: int) -> Optional[Dict[str, Any]]:
+        """
+        Return a student by ID, or None if the snapshot does not have it.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entryId, offset = _INDEX_ENTRY.unpack_from(self.map, self.indexOffset + middle * _INDEX_ENTRY.size)
+            if entryId == studentId:
+                return self._DecodeRecord(offset)[0]
+            if entryId < studentId:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def Close(self) -> None:
+        self.map.close()
+
+    def _Invalid(self) -> ValueError:
+        logging.error(f"File '{self.filename}' is not a version {VERSION} student snapshot.")
+        return ValueError(f"File '{self.filename}' is not a version {VERSION} student snapshot.")
+
+    def _String(self, number: int) -> str:
+        value = self.strings.get(number)
+        if value is None:
+            start, end = struct.unpack_from('<QQ', self.map, self.stringsOffset + number * 8)
+            value = self.strings[number] = self.map[self.blobOffset + start:self.blobOffset + end].decode('utf-8')
+        return value
+
+    def _DecodeAllStrings(self) -> None:
+        if len(self.strings) == self.stringCount:
+            return
+        offsets = array('Q')
+        offsets.frombytes(self.map[self.stringsOffset:self.blobOffset])
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        blob = self.map[self.blobOffset:self.indexOffset]
+        self.strings = {number: blob[offsets[number]:offsets[number + 1]].decode('utf-8')
+                        for number in range(self.stringCount)}
+
+    def _DecodeRecord(self, offset: int):
+        length, kind = _RECORD_HEADER.unpack_from(self.map, offset)
+        start = offset + _RECORD_HEADER.size
+        end = start + length
+        if kind == _JSON:
+            return json.loads(self.map[start:end].decode('utf-8')), end
+
+        String = self._String
+        studentId, age, name, courseCount = _STANDARD_RECORD.unpack_from(self.map, start)
+        position = start + _STANDARD_RECORD.size
+        courses: List[Dict[str, Any]] = []
+        for code, courseName, grade in _COURSE.iter_unpack(self.map[position:position + courseCount * _COURSE.size]):
+            courses.append({'code': String(code), 'name': String(courseName), 'grade': String(grade)})
+        email, phone = _CONTACT.unpack_from(self.map, position + courseCount * _COURSE.size)
+        return {
+            'id': studentId,
+            'name': String(name),
+            'age': age,
+            'courses': courses,
+            'contact': {'email': String(email), 'phone': String(phone)}
+        }, end
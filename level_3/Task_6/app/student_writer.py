@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+class StudentWriter:
+    """
+    Single writer thread that applies every mutation of a StudentStore.
+    Mutations are queued by Submit() and applied one at a time; all the
+    mutations that arrive within batchWindow seconds of each other share
+    one journal commit (group commit). Each caller's future is resolved
+    once the commit covering its mutation is durable. When the commit
+    fails, the batch is rolled back and every future in it gets the error.
+    """
+
+    def __init__(self, store: Any, batchWindow: float = 0.002, maxBatch: int = 1000):
+        self.store = store
+        self.batchWindow = batchWindow
+        self.maxBatch = maxBatch
+        self.queue: "queue.Queue[Optional[Tuple[Callable[[Any], Any], Future]]]" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.startLock = threading.Lock()
+
+    def Submit(self, mutation: Callable[[Any], Any]) -> Future:
+        """
+        Queue mutation(store) for the writer thread.
+        The returned future holds its result, or the error it raised.
+        """
+        self._EnsureStarted()
+        future: Future = Future()
+        self.queue.put((mutation, future))
+        return future
+
+    def Stop(self) -> None:
+        """
+        Commit everything already queued and stop the writer thread.
+        """
+        with self.startLock:
+            if self.thread is None:
+                return
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def _EnsureStarted(self) -> None:
+        if self.thread is not None:
+            return
+        with self.startLock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._Run, name="StudentWriter", daemon=True)
+                self.thread.start()
+
+    def _Run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+
+            # Gather whatever else arrives within the batch window
+            deadline = time.monotonic() + self.batchWindow
+            while len(batch) < self.maxBatch:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._ApplyBatch(batch)
+
+    def _ApplyBatch(self, batch: List[Tuple[Callable[[Any], Any], Future]]) -> None:
+        outcomes = []
+        with self.store.lock:
+            for mutation, future in batch:
+                try:
+                    outcomes.append((future, mutation(self.store), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+
+        # One durable journal write for the whole batch
+        try:
+            self.store.Commit()
+            commitError = None
+        except Exception as e:
+            logging.error(f"Failed to commit student changes: {e}")
+            commitError = e
+            # Callers are told the batch failed, so it must not show or be committed later
+            try:
+                self.store.Rollback()
+            except Exception as rollbackError:
+                logging.error(f"Failed to roll back student changes: {rollbackError}")
+
+        for future, result, error in outcomes:
+            if error is None:
+                error = commitError
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
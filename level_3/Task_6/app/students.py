@@ -1,22 +1,19 @@
 # Import necessary FastAPI and utility modules
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Optional, List, Dict, Any
+from dotenv import load_dotenv
 import logging
+import os
 
-# Import student-related functions from json_handler
-from json_handler import (
-    LoadJsonFile,
-    SaveJsonFile,
-    AddStudent,
-    RemoveStudent,
-    UpdateStudentGrade,
-    GetStudentDetails,
-    GetCourseStudents
-)
+# Import the student backends and field helpers
+from json_handler import StudentStore, ParseFields
+from student_repository import StudentRepository
+from response_cache import DumpJson, FastJSONResponse, ResponseCache
 
-# Create a new API router for student routes
-router = APIRouter()
+# Create a new API router for student routes, encoding responses with DumpJson
+router = APIRouter(default_response_class=FastJSONResponse)
 
 # Set up a logger for this module
 logger = logging.getLogger(__name__)
@@ -24,11 +21,78 @@ logger = logging.getLogger(__name__)
 # Path to the JSON file that stores student data
 DATA_FILE = "students_data.json"
 
+# Largest page a client may request from GET /api/students
+MAX_PAGE_SIZE = 1000
+
+# Most results a client may request from GET /api/students/search
+MAX_SEARCH_RESULTS = 100
+
+# Binary copy of the student data that the JSON backend starts from
+SNAPSHOT_FILE = DATA_FILE + ".snap"
+
+# Load environment variables
+load_dotenv()
+
+# Storage backend for students: "json" (default), "sqlite" or "mongo"
+STUDENTS_BACKEND = os.getenv("STUDENTS_BACKEND", "json")
+
+# SQLite database used by the "sqlite" backend
+SQLITE_FILE = os.getenv("STUDENTS_SQLITE_FILE", "students.db")
+
+# Create the repository for the configured student backend
+def CreateRepository():
+    if STUDENTS_BACKEND == "json":
+        # Resident student store, parsed once instead of on every request
+        return StudentRepository(StudentStore(DATA_FILE, snapshotFile=SNAPSHOT_FILE))
+    if STUDENTS_BACKEND == "sqlite":
+        # Imports students_data.json the first time the database is used
+        from sqlite_store import SqliteStudentStore
+        return StudentRepository(SqliteStudentStore(SQLITE_FILE, importFile=DATA_FILE))
+    if STUDENTS_BACKEND == "mongo":
+        # Shares the app's Mongo client, so replicas see the same students
+        from mongo_config import StudentCollection, CounterCollection
+        from mongo_students import MongoStudentRepository
+        return MongoStudentRepository(StudentCollection, CounterCollection)
+    raise RuntimeError(f"Unknown STUDENTS_BACKEND '{STUDENTS_BACKEND}', expected 'json', 'sqlite' or 'mongo'.")
+
+repository = CreateRepository()
+
+# Encoded GET /api/students bodies for the current data version
+responseCache = ResponseCache()
+
+# Start the student backend when the app starts
+# (the JSON store serves lookups by ID from its binary snapshot while it loads)
+@router.on_event("startup")
+async def StartStudentRepository():
+    await repository.Start()
+
+# Commit any queued student changes before the app stops
+@router.on_event("shutdown")
+async def StopStudentRepository():
+    await repository.Stop()
+
+# Check an If-None-Match header against the current ETag
+# (weak comparison, as HTTP specifies for If-None-Match)
+def ETagMatches(ifNoneMatch: Optional[str], etag: str) -> bool:
+    if not ifNoneMatch:
+        return False
+    for candidate in ifNoneMatch.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
 # Model for updating a student's course grade
 class CourseGradeUpdate(BaseModel):
     courseCode: str
     newGrade: str
 
+# Model for one grade update in a batch (used in PATCH request)
+class StudentGradeUpdate(BaseModel):
+    studentId: int
+    courseCode: str
+    newGrade: str
+
 # Model for a student (used in POST request)
 class StudentModel(BaseModel):
     id: int
@@ -39,16 +103,10 @@ class StudentModel(BaseModel):
 
 # POST - Add a new student to the system
 @router.post("/api/students")
-def CreateStudent(student: StudentModel):
+async def CreateStudent(student: StudentModel):
     try:
-        # Load existing student data
-        data = LoadJsonFile(DATA_FILE)
-
-        # Add new student to the data
-        AddStudent(data, student.dict())
-
-        # Save updated data back to the file
-        SaveJsonFile(DATA_FILE, data)
+        # Add the student and wait for the commit
+        await repository.Add(student.dict())
 
         # Return success message
         return {"message": "Student added successfully."}
@@ -58,44 +116,222 @@ def CreateStudent(student: StudentModel):
         logger.error(f"Error adding student: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+# POST - Add a batch of students with a single commit
+# Valid students are added even if others in the batch fail; the response
+# lists an error for each rejected student with its position in the batch
+@router.post("/api/students/bulk")
+async def CreateStudentsBulk(students: List[Dict[str, Any]]):
+    try:
+        # Validate each student on its own so one bad entry does not reject the batch
+        studentInfos, errors = [], []
+        for index, student in enumerate(students):
+            try:
+                studentInfos.append((index, StudentModel.parse_obj(student).dict()))
+            except ValidationError as e:
+                errors.append({"index": index, "id": student.get("id"), "error": str(e)})
+
+        # Add the valid students as one batch, so they share one commit
+        addErrors = await repository.AddMany([studentInfo for _, studentInfo in studentInfos])
+
+        # Map the errors back to positions in the original batch
+        for error in addErrors:
+            error["index"] = studentInfos[error["index"]][0]
+        errors = sorted(errors + addErrors, key=lambda error: error["index"])
+
+        # Return how many students were added and why the others were not
+        return {
+            "message": "Students added successfully." if not errors else "Some students could not be added.",
+            "added": len(studentInfos) - len(addErrors),
+            "errors": errors
+        }
+
+    except Exception as e:
+        # Log and return any error that occurs
+        logger.error(f"Error adding students: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
 # GET - Retrieve a student by ID, list students by course, or get all students
+# All-students listings can be paged with limit/cursor (ordered by ID) and
+# every response can be narrowed with fields, e.g. fields=id,name
+# Responses carry an ETag of the student data version; a request whose
+# If-None-Match still matches gets 304 Not Modified without a body
+# Encoded bodies of student details, course rosters and full listings are
+# cached until the data version changes
 @router.get("/api/students")
-def GetStudents(studentId: Optional[int] = None, courseCode: Optional[str] = None):
+async def GetStudents(
+    request: Request,
+    studentId: Optional[int] = None,
+    courseCode: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    fields: Optional[str] = None,
+):
     try:
-        # Load student data from the file
-        data = LoadJsonFile(DATA_FILE)
+        # Tag the response with the data version, read before the data itself,
+        # and make browsers revalidate instead of reusing a stale copy
+        version = await repository.Version()
+        headers = {"ETag": f'"{version}"', "Cache-Control": "no-cache"}
+        if ETagMatches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
 
-        # Return individual student details if ID is provided
-        if studentId is not None:
-            student = GetStudentDetails(data, studentId)
-            return student
+        # Parse the requested fields, if any
+        fieldList = ParseFields(fields) if fields is not None else None
+        fieldKey = tuple(fieldList) if fieldList is not None else None
 
-        # Return list of students enrolled in a course if course code is provided
+        # Pick the cache key of the requested shape (pages are not cached)
+        if studentId is not None:
+            cacheKey = ("student", studentId, fieldKey)
         elif courseCode is not None:
-            students = GetCourseStudents(data, courseCode)
-            return students
-
-        # Return all students if no parameters provided
+            cacheKey = ("course", courseCode, fieldKey)
+        elif limit is None and cursor is None:
+            cacheKey = ("all", fieldKey)
         else:
-            return {"students": data.get("students", [])}
+            cacheKey = None
+
+        # Reuse the encoded body if this shape was already served at this version
+        body = responseCache.Get(version, cacheKey) if cacheKey is not None else None
+        if body is None:
+            # Return individual student details if ID is provided
+            if studentId is not None:
+                content = await repository.Get(studentId, fieldList)
+
+            # Return list of students enrolled in a course if course code is provided
+            elif courseCode is not None:
+                content = await repository.CourseStudents(courseCode, fieldList)
+
+            # Return one page of students if paging parameters are provided
+            elif limit is not None or cursor is not None:
+                students, nextCursor = await repository.Page(limit or MAX_PAGE_SIZE, cursor, fieldList)
+                content = {"students": students, "nextCursor": nextCursor}
+
+            # Return all students if no parameters provided
+            else:
+                content = {"students": await repository.AllStudents(fieldList)}
+
+            body = DumpJson(content)
+            if cacheKey is not None:
+                responseCache.Put(version, cacheKey, body)
+
+        return Response(body, media_type="application/json", headers=headers)
 
     except Exception as e:
         # Log and return any error that occurs
         logger.error(f"Error retrieving students: {e}")
         raise HTTPException(status_code=404, detail=str(e))
 
-# PUT - Update a student's grade for a course
-@router.put("/api/students/{studentId}")
-def UpdateGrade(studentId: int, gradeUpdate: CourseGradeUpdate):
+# GET - Find students by name or email address, best matches first
+# Matches word prefixes of the name and email prefixes; the JSON store
+# also finds fuzzy (trigram) matches for misspelt names
+@router.get("/api/students/search")
+async def SearchStudentsByName(
+    q: str,
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    fields: Optional[str] = None,
+):
+    try:
+        # Parse the requested fields, if any
+        fieldList = ParseFields(fields) if fields is not None else None
+
+        # Return the ranked matches
+        return {"students": await repository.Search(q, limit, fieldList)}
+
+    except Exception as e:
+        # Log and return any error that occurs
+        logger.error(f"Error searching students: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+# GET - Students changed since an earlier version, for clients that sync
+# instead of holding an event stream open
+# since is the version (or ETag) of the data the client has; the response
+# has the current version, the students added or changed since then and
+# the IDs of deleted students. When the change log does not reach back to
+# since, the response is {"version": ..., "resync": true} and the client
+# should reload all students
+@router.get("/api/students/changes")
+async def GetStudentChanges(since: Optional[str] = None, fields: Optional[str] = None):
+    try:
+        # Parse the requested fields, if any
+        fieldList = ParseFields(fields) if fields is not None else None
+
+        # Return the changes kept in the backend's change log
+        return await repository.Changes(since, fieldList)
+
+    except Exception as e:
+        # Log and return any error that occurs
+        logger.error(f"Error retrieving student changes: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+# GET - Server-Sent Events stream of student changes made through this app
+# Sends "added", "updated" and "deleted" events as changes are committed,
+# with a keepalive comment while idle; a client that falls too far behind
+# gets an "overflow" event and is disconnected, and should reload the students
+@router.get("/api/students/events")
+async def StreamStudentEvents():
+    # Subscribe before responding, so no change after this point is missed
+    subscription = repository.events.Subscribe()
+    return StreamingResponse(
+        repository.events.Stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# GET - Enrollment count, grade distribution and average age for a course
+@router.get("/api/courses/{courseCode}/stats")
+async def GetCourseStatistics(courseCode: str):
     try:
-        # Load student data
-        data = LoadJsonFile(DATA_FILE)
+        # Return the course aggregates kept up to date by the backend
+        return await repository.CourseStats(courseCode)
 
-        # Update the student's grade for the given course
-        UpdateStudentGrade(data, studentId, gradeUpdate.courseCode, gradeUpdate.newGrade)
+    except Exception as e:
+        # Log and return any error that occurs
+        logger.error(f"Error retrieving course statistics: {e}")
+        raise HTTPException(status_code=404, detail=str(e))
+
+# PATCH - Apply a batch of grade updates with a single commit
+# Valid updates are applied even if others in the batch fail; the response
+# lists an error for each rejected update with its position in the batch
+@router.patch("/api/students/grades")
+async def UpdateGradesBulk(updates: List[Dict[str, Any]]):
+    try:
+        # Validate each update on its own so one bad entry does not reject the batch
+        gradeUpdates, errors = [], []
+        for index, update in enumerate(updates):
+            try:
+                gradeUpdates.append((index, StudentGradeUpdate.parse_obj(update).dict()))
+            except ValidationError as e:
+                errors.append({
+                    "index": index,
+                    "studentId": update.get("studentId"),
+                    "courseCode": update.get("courseCode"),
+                    "error": str(e)
+                })
 
-        # Save the updated data
-        SaveJsonFile(DATA_FILE, data)
+        # Apply the valid updates as one batch, so they share one commit
+        updateErrors = await repository.UpdateGrades([gradeUpdate for _, gradeUpdate in gradeUpdates])
+
+        # Map the errors back to positions in the original batch
+        for error in updateErrors:
+            error["index"] = gradeUpdates[error["index"]][0]
+        errors = sorted(errors + updateErrors, key=lambda error: error["index"])
+
+        # Return how many grades were updated and why the others were not
+        return {
+            "message": "Student grades updated successfully." if not errors else "Some grades could not be updated.",
+            "updated": len(gradeUpdates) - len(updateErrors),
+            "errors": errors
+        }
+
+    except Exception as e:
+        # Log and return any error that occurs
+        logger.error(f"Error updating student grades: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+# PUT - Update a student's grade for a course
+@router.put("/api/students/{studentId}")
+async def UpdateGrade(studentId: int, gradeUpdate: CourseGradeUpdate):
+    try:
+        # Update the grade and wait for the commit
+        await repository.UpdateGrade(studentId, gradeUpdate.courseCode, gradeUpdate.newGrade)
 
         # Return success message
         return {"message": "Student grade updated successfully."}
@@ -107,16 +343,10 @@ def UpdateGrade(studentId: int, gradeUpdate: CourseGradeUpdate):
 
 # DELETE - Remove a student from the system
 @router.delete("/api/students/{studentId}")
-def DeleteStudent(studentId: int):
+async def DeleteStudent(studentId: int):
     try:
-        # Load student data
-        data = LoadJsonFile(DATA_FILE)
-
-        # Remove the student by ID
-        RemoveStudent(data, studentId)
-
-        # Save the updated data
-        SaveJsonFile(DATA_FILE, data)
+        # Remove the student and wait for the commit
+        await repository.Remove(studentId)
 
         # Return success message
         return {"message": "Student removed successfully."}
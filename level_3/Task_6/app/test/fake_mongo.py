@@ -0,0 +1,233 @@
+import copy
+import re
+from types import SimpleNamespace
+from typing import Dict, List, Any, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+class FakeCursor:
+    """
+    In-process stand-in for an async pymongo cursor.
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+
+    def sort(self, key: str, direction: int = 1) -> 'FakeCursor':
+        self.documents.sort(key=lambda document: _Lookup(document, key)[0], reverse=direction < 0)
+        return self
+
+    def limit(self, count: int) -> 'FakeCursor':
+        if count:
+            self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.documents if length is None else self.documents[:length]
+
+    def __aiter__(self):
+        return self._Iterate()
+
+    async def _Iterate(self):
+        for document in self.documents:
+            yield document
+
+class FakeCollection:
+    """
+    In-process stand-in for an AsyncCollection, covering the queries the
+    student repository uses: equality, $or and $gt/$in/$regex/$exists
+    filters (dotted paths match inside arrays), inclusion and exclusion
+    projections, unique indexes, the positional $ operator in $set,
+    $inc/$setOnInsert with upsert, $push with $each/$slice, $pull of
+    matching documents and bulk_write of UpdateOne requests.
+    """
+
+    def __init__(self, name: str = 'fake'):
+        self.name = name
+        self.documents: List[Dict[str, Any]] = []
+        self.uniqueKeys: List[str] = []
+        self.indexes: List[List] = []
+
+    async def create_index(self, keys, unique: bool = False, **kwargs) -> str:
+        self.indexes.append(list(keys))
+        if unique:
+            self.uniqueKeys.append(keys[0][0])
+        return '_'.join(f"{key}_{direction}" for key, direction in keys)
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, int]] = None) -> FakeCursor:
+        return FakeCursor([_Project(document, projection)
+                           for document in self.documents if _Matches(document, query or {})])
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None,
+                       projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        for document in self.documents:
+            if _Matches(document, query or {}):
+                return _Project(document, projection)
+        return None
+
+    async def insert_one(self, document: Dict[str, Any]):
+        self._Insert(document)
+        return SimpleNamespace(inserted_id=document['_id'])
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True):
+        writeErrors = []
+        inserted = 0
+        for index, document in enumerate(documents):
+            try:
+                self._Insert(document)
+                inserted += 1
+            except DuplicateKeyError as e:
+                writeErrors.append({'index': index, 'code': 11000, 'errmsg': str(e), 'op': document})
+                if ordered:
+                    break
+        if writeErrors:
+            raise BulkWriteError({'writeErrors': writeErrors, 'nInserted': inserted})
+        return SimpleNamespace(inserted_ids=[document['_id'] for document in documents])
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        for document in self.documents:
+            if _Matches(document, query):
+                for path, value in update.get('$set', {}).items():
+                    _Set(document, path, value, query)
+                for path, amount in update.get('$inc', {}).items():
+                    _Set(document, path, (_Lookup(document, path)[0] or 0) + amount, query)
+                for path, value in update.get('$push', {}).items():
+                    document[path] = _Push(document.get(path, []), value)
+                for path, condition in update.get('$pull', {}).items():
+                    document[path] = [item for item in document.get(path, []) if not _Matches(item, condition)]
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+            document.update(update.get('$set', {}))
+            document.update(update.get('$inc', {}))
+            document.update({path: _Push([], value) for path, value in update.get('$push', {}).items()})
+            document.update(update.get('$setOnInsert', {}))
+            self._Insert(document)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document['_id'])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True):
+        matched = 0
+        for request in requests:
+            if not isinstance(request, UpdateOne):
+                raise NotImplementedError(type(request).__name__)
+            matched += (await self.update_one(request._filter, request._doc)).matched_count
+        return SimpleNamespace(matched_count=matched, modified_count=matched)
+
+    async def delete_one(self, query: Dict[str, Any]):
+        for index, document in enumerate(self.documents):
+            if _Matches(document, query):
+                del self.documents[index]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def count_documents(self, query: Dict[str, Any]) -> int:
+        return sum(1 for document in self.documents if _Matches(document, query))
+
+    def _Insert(self, document: Dict[str, Any]) -> None:
+        for key in self.uniqueKeys:
+            value = document.get(key)
+            if any(existing.get(key) == value for existing in self.documents):
+                raise DuplicateKeyError(f"E11000 duplicate key error dup key: {{ {key}: {value!r} }}", 11000)
+        document.setdefault('_id', ObjectId())
+        self.documents.append(copy.deepcopy(document))
+
+def _Push(array: List[Any], value: Any) -> List[Any]:
+    # One value, or several with $each and an optional $slice
+    if not (isinstance(value, dict) and '$each' in value):
+        return array + [value]
+    array = array + list(value['$each'])
+    if '$slice' in value:
+        limit = value['$slice']
+        array = array[limit:] if limit < 0 else array[:limit]
+    return array
+
+def _Lookup(document: Any, path: str) -> List[Any]:
+    # Every value at a dotted path, descending into arrays
+    values = [document]
+    for part in path.split('.'):
+        found = []
+        for value in values:
+            if isinstance(value, list):
+                found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+            elif isinstance(value, dict) and part in value:
+                found.append(value[part])
+        values = found
+    return values or [None]
+
+def _Matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for path, condition in query.items():
+        if path == '$or':
+            if not any(_Matches(document, clause) for clause in condition):
+                return False
+            continue
+        # Conditions match an array field as a whole or any of its elements
+        values = _Lookup(document, path)
+        values = values + [item for value in values if isinstance(value, list) for item in value]
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator == '$gt':
+                    matched = any(value is not None and value > operand for value in values)
+                elif operator == '$in':
+                    matched = any(value in operand for value in values)
+                elif operator == '$regex':
+                    flags = re.IGNORECASE if 'i' in condition.get('$options', '') else 0
+                    matched = any(isinstance(value, str) and re.search(operand, value, flags) for value in values)
+                elif operator == '$exists':
+                    matched = (values != [None]) == operand
+                elif operator == '$options':
+                    continue
+                else:
+                    raise NotImplementedError(operator)
+                if not matched:
+                    return False
+        elif condition not in values:
+            return False
+    return True
+
+def _Project(document: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    included = [key for key, keep in projection.items() if keep and key != '_id']
+    if included:
+        projected = {'_id': document['_id']} if projection.get('_id', 1) and '_id' in document else {}
+        for path in included:
+            _Include(projected, document, path.split('.'))
+        document = projected
+    else:
+        for key, keep in projection.items():
+            if not keep:
+                document.pop(key, None)
+    return document
+
+def _Include(target: Dict[str, Any], source: Dict[str, Any], parts: List[str]) -> None:
+    # Copy one dotted path from source into target, keeping array shapes
+    key = parts[0]
+    if key not in source:
+        return
+    value = source[key]
+    if len(parts) == 1:
+        target[key] = value
+    elif isinstance(value, list):
+        items = target.setdefault(key, [{} for item in value if isinstance(item, dict)])
+        for item, projected in zip([item for item in value if isinstance(item, dict)], items):
+            _Include(projected, item, parts[1:])
+    elif isinstance(value, dict):
+        _Include(target.setdefault(key, {}), value, parts[1:])
+
+def _Set(document: Dict[str, Any], path: str, value: Any, query: Dict[str, Any]) -> None:
+    # Resolve the positional $ to the first array element the query matched
+    parts = path.split('.')
+    target = document
+    for position, part in enumerate(parts[:-1]):
+        if part == '$':
+            arrayPath = '.'.join(parts[:position])
+            conditions = {key[len(arrayPath) + 1:]: condition for key, condition in query.items()
+                          if key.startswith(arrayPath + '.')}
+            target = next(item for item in target if _Matches(item, conditions))
+        else:
+            target = target[part]
+    target[parts[-1]] = value
@@ -0,0 +1,123 @@
+import pytest
+import json
+import os
+
+from json_handler import (
+    StudentStore,
+    SaveJsonFile,
+    GetStudentDetails,
+    GetCourseStudents,
+    RemoveStudent,
+    UpdateStudentGrade
+)
+from student_snapshot import StudentSnapshot, WriteStudentSnapshot
+
+@pytest.fixture
+def SampleStudents():
+    """
+    The students from the sample data file.
+    """
+    with open("students_data.json") as f:
+        return json.load(f)["students"]
+
+@pytest.fixture
+def SnapshotStore(tmp_path, SampleStudents):
+    """
+    A loaded store over a temporary data file, with a binary snapshot.
+    """
+    SaveJsonFile(str(tmp_path / "students_data.json"), {"students": SampleStudents})
+    store = StudentStore(str(tmp_path / "students_data.json"), snapshotFile=str(tmp_path / "students_data.snap"))
+    store.Load()
+    # The first load writes the binary snapshot in the background
+    store.WaitForCompaction()
+    yield store
+    store.writer.Stop()
+
+class TestStudentSnapshot:
+    """
+    Test cases for writing and reading binary snapshots.
+    """
+
+    def test_RoundTrip(self, tmp_path, SampleStudents):
+        """Test that every student reads back equal, in order and by ID."""
+        irregular = {"id": -7, "name": "Odd", "age": "unknown", "courses": [], "contact": {}, "notes": [1]}
+        students = SampleStudents + [irregular]
+        WriteStudentSnapshot(str(tmp_path / "s.snap"), students)
+        snapshot = StudentSnapshot(str(tmp_path / "s.snap"))
+        assert len(snapshot) == 3
+        assert list(snapshot) == students
+        assert snapshot.Get(2) == SampleStudents[1]
+        assert snapshot.Get(-7) == irregular
+        assert snapshot.Get(3) is None
+
+    def test_NonStandardShapesRoundTrip(self, tmp_path, SampleStudents):
+        """Test that students with extra or reordered keys read back with their keys in order."""
+        extraContact, reordered = SampleStudents
+        extraContact['contact']['address'] = "1 Main St"
+        reordered = {key: reordered[key] for key in reversed(list(reordered))}
+        WriteStudentSnapshot(str(tmp_path / "s.snap"), [extraContact, reordered])
+        snapshot = StudentSnapshot(str(tmp_path / "s.snap"))
+        assert [json.dumps(student) for student in snapshot] == [json.dumps(extraContact), json.dumps(reordered)]
+
+    def test_EmptySnapshot(self, tmp_path):
+        """Test a snapshot without students."""
+        WriteStudentSnapshot(str(tmp_path / "s.snap"), [])
+        snapshot = StudentSnapshot(str(tmp_path / "s.snap"))
+        assert list(snapshot) == [] and snapshot.Get(1) is None
+
+    def test_InvalidFileRaises(self, tmp_path):
+        """Test that files that are not snapshots are rejected."""
+        (tmp_path / "bad.snap").write_bytes(b"{}")
+        with pytest.raises(ValueError, match="not a version"):
+            StudentSnapshot(str(tmp_path / "bad.snap"))
+
+    def test_DuplicateIdRaises(self, tmp_path, SampleStudents):
+        """Test that a snapshot cannot hold one ID twice."""
+        with pytest.raises(ValueError, match="Duplicate"):
+            WriteStudentSnapshot(str(tmp_path / "s.snap"), SampleStudents + SampleStudents[:1])
+
+class TestStoreSnapshot:
+    """
+    Test cases for starting a StudentStore from its binary snapshot.
+    """
+
+    def test_LoadWritesAndPrefersSnapshot(self, SnapshotStore, SampleStudents):
+        """Test that the first JSON load writes a snapshot that later loads use."""
+        assert os.path.exists(SnapshotStore.snapshotFile)
+        reloaded = StudentStore(SnapshotStore.filename, snapshotFile=SnapshotStore.snapshotFile)
+        assert reloaded._OpenSnapshot() is not None
+        reloaded.Load()
+        assert list(reloaded.students.values()) == SampleStudents
+
+    def test_NewerJsonFileWins(self, SnapshotStore):
+        """Test that a data file edited after the snapshot is loaded instead."""
+        SaveJsonFile(SnapshotStore.filename, {"students": []})
+        stat = os.stat(SnapshotStore.snapshotFile)
+        os.utime(SnapshotStore.filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        reloaded = StudentStore(SnapshotStore.filename, snapshotFile=SnapshotStore.snapshotFile)
+        reloaded.Load()
+        assert reloaded.students == {}
+
+    def test_CompactRewritesSnapshot(self, SnapshotStore):
+        """Test that compaction keeps the binary snapshot in step with the data file."""
+        RemoveStudent(SnapshotStore, 2)
+        SnapshotStore.Commit()
+        SnapshotStore.Compact()
+        assert [s["id"] for s in StudentSnapshot(SnapshotStore.snapshotFile)] == [1]
+
+    def test_LookupsServedWhileLoading(self, SnapshotStore):
+        """Test that Get() answers from the snapshot and journal before loading finishes."""
+        RemoveStudent(SnapshotStore, 2)
+        UpdateStudentGrade(SnapshotStore, 1, "CS101", "C")
+        SnapshotStore.Commit()
+
+        restarted = StudentStore(SnapshotStore.filename, snapshotFile=SnapshotStore.snapshotFile)
+        # Holding the lock keeps the background load from running
+        with restarted.lock:
+            restarted.StartLoading()
+            assert not restarted.loaded
+            assert GetStudentDetails(restarted, 1)["courses"][0]["grade"] == "C"
+            with pytest.raises(ValueError, match="not found"):
+                GetStudentDetails(restarted, 2)
+        assert [s["id"] for s in GetCourseStudents(restarted, "CS101")] == [1]
+        assert restarted.loaded and restarted.preview is None
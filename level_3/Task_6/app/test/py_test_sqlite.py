@@ -0,0 +1,198 @@
+import pytest
+import json
+import sqlite3
+
+from json_handler import (
+    AddStudent,
+    AddStudents,
+    RemoveStudent,
+    UpdateStudentGrade,
+    GetStudentDetails,
+    GetCourseStudents,
+    GetCourseStats,
+    GetStudentsPage,
+    SearchStudents,
+    GetStudentChanges
+)
+import sqlite_store
+from sqlite_store import SqliteStudentStore
+
+@pytest.fixture
+def SampleData():
+    """
+    Load a fresh copy of the student data from file for each test.
+    """
+    with open("students_data.json") as f:
+        return json.load(f)
+
+@pytest.fixture
+def SqliteStore(tmp_path):
+    """
+    Build a SQLite store that imports the sample student data.
+    """
+    filePath = tmp_path / "students_data.json"
+    with open("students_data.json") as f:
+        filePath.write_text(f.read())
+    store = SqliteStudentStore(str(tmp_path / "students.db"), importFile=str(filePath))
+    store.StartLoading()
+    yield store
+    store.Close()
+
+class TestSqliteStudentStore:
+    """
+    Test cases for the json_handler functions running against a SqliteStudentStore.
+    """
+
+    def test_ImportsJsonDataFile(self, SqliteStore, SampleData):
+        """Test that an empty database is filled from the JSON data file."""
+        assert SqliteStore.AllStudents() == SampleData["students"]
+
+    def test_AddAndGetStudent(self, SqliteStore):
+        """Test adding a student and reading it back after commit."""
+        AddStudent(SqliteStore, {
+            "id": 3,
+            "name": "Nihil S",
+            "age": 21,
+            "courses": [{"code": "CS202", "name": "Data Structures", "grade": "A"}],
+            "contact": {"email": "nihil@example.com", "phone": "111-222-3333"}
+        })
+        SqliteStore.Commit()
+        assert GetStudentDetails(SqliteStore, 3)["courses"][0]["code"] == "CS202"
+
+    def test_AddExistingStudentRaises(self, SqliteStore):
+        """Test that a duplicate ID is rejected without leaving partial rows."""
+        with pytest.raises(ValueError, match="already exists"):
+            AddStudent(SqliteStore, {"id": 1, "name": "Taken", "age": 20, "courses": [], "contact": {}})
+        SqliteStore.Commit()
+        assert GetStudentDetails(SqliteStore, 1)["name"] == "John Smith"
+
+    def test_RemoveAndUpdate(self, SqliteStore):
+        """Test removing a student and updating a grade."""
+        RemoveStudent(SqliteStore, 2)
+        UpdateStudentGrade(SqliteStore, 1, "CS101", "B")
+        SqliteStore.Commit()
+        with pytest.raises(ValueError, match="not found"):
+            GetStudentDetails(SqliteStore, 2)
+        assert GetStudentDetails(SqliteStore, 1)["courses"][0]["grade"] == "B"
+        with pytest.raises(ValueError, match="not found"):
+            RemoveStudent(SqliteStore, 2)
+        with pytest.raises(ValueError, match="not found"):
+            UpdateStudentGrade(SqliteStore, 1, "XX999", "A")
+
+    def test_GetCourseStudents(self, SqliteStore, SampleData):
+        """Test looking up students through the course code index."""
+        expected = [s for s in SampleData["students"] if any(c["code"] == "CS101" for c in s["courses"])]
+        assert GetCourseStudents(SqliteStore, "CS101") == expected
+        with pytest.raises(ValueError, match="No students found"):
+            GetCourseStudents(SqliteStore, "XX999")
+
+    def test_GetCourseStats(self, SqliteStore):
+        """Test that SQLite aggregates match the statistics of the plain dict."""
+        AddStudent(SqliteStore, {
+            "id": 3, "name": "A", "age": 30,
+            "courses": [{"code": "CS101", "name": "Intro", "grade": "C"},
+                        {"code": "CS101", "name": "Intro", "grade": "F"}],
+            "contact": {}
+        })
+        SqliteStore.Commit()
+        assert GetCourseStats(SqliteStore, "CS101") == GetCourseStats(SqliteStore.ToDict(), "CS101")
+        with pytest.raises(ValueError, match="No students found"):
+            GetCourseStats(SqliteStore, "XX999")
+
+    def test_SearchStudents(self, SqliteStore):
+        """Test prefix search over name words and email addresses."""
+        AddStudent(SqliteStore, {"id": 3, "name": "Anna Smithers", "age": 22, "courses": [],
+                                 "contact": {"email": "a_b%c@example.com"}})
+        SqliteStore.Commit()
+        assert [s["id"] for s in SearchStudents(SqliteStore, "smith")] == [1, 3]
+        assert [s["id"] for s in SearchStudents(SqliteStore, "A_B%")] == [3]
+        assert SearchStudents(SqliteStore, "a_bx") == []
+
+    def test_SearchRanksEveryCandidate(self, SqliteStore):
+        """Test that the best match is found when it has the highest ID of many prefix matches."""
+        AddStudents(SqliteStore, [
+            {"id": i, "name": f"Zed Hopperton{i}", "age": 20, "courses": [], "contact": {}} for i in range(10, 60)
+        ] + [{"id": 100, "name": "Zed Hopper", "age": 20, "courses": [], "contact": {"email": "zh@example.com"}}])
+        SqliteStore.Commit()
+        assert [s["id"] for s in SearchStudents(SqliteStore, "hopper", limit=1)] == [100]
+        assert SearchStudents(SqliteStore, "hopper", limit=3) == SearchStudents(SqliteStore.ToDict(), "hopper", limit=3)
+        assert [s["id"] for s in SearchStudents(SqliteStore, "zh@example.com")] == [100]
+
+    def test_SearchIndexIsBuiltForOlderDatabases(self, SqliteStore):
+        """Test that a database without the search index gets one filled on the next start."""
+        SqliteStore.connection.executescript(
+            "DROP TRIGGER students_terms_insert; DROP TRIGGER students_terms_delete; "
+            "DROP TRIGGER students_terms_update; DROP TABLE student_terms;"
+        )
+        reopened = SqliteStudentStore(SqliteStore.filename)
+        try:
+            assert [s["id"] for s in SearchStudents(reopened, "smith")] == [1]
+        finally:
+            reopened.Close()
+
+    def test_PagesFollowIdOrder(self, SqliteStore):
+        """Test that pages walk every student once in ID order."""
+        AddStudents(SqliteStore, [
+            {"id": i, "name": f"S{i}", "age": 20, "courses": [], "contact": {}} for i in (7, 4, 5)
+        ])
+        SqliteStore.Commit()
+        seen, cursor = [], None
+        while True:
+            students, cursor = GetStudentsPage(SqliteStore, 2, cursor)
+            seen.extend(s["id"] for s in students)
+            if cursor is None:
+                break
+        assert seen == [1, 2, 4, 5, 7]
+
+    def test_VersionIsSharedAndBumpedByChanges(self, SqliteStore):
+        """Test that committed changes bump the version seen by other connections."""
+        before = SqliteStore.Version()
+        with pytest.raises(ValueError):
+            RemoveStudent(SqliteStore, 999)
+        SqliteStore.Commit()
+        assert SqliteStore.Version() == before
+        SqliteStore.Submit(lambda data: RemoveStudent(data, 1)).result()
+        reopened = SqliteStudentStore(SqliteStore.filename)
+        try:
+            assert reopened.Version() == SqliteStore.Version() != before
+        finally:
+            reopened.Close()
+
+    def test_ChangesSinceVersion(self, SqliteStore, monkeypatch):
+        """Test that the change log answers from committed versions and trims old ones."""
+        since = SqliteStore.Version()
+        UpdateStudentGrade(SqliteStore, 1, "CS101", "B")
+        RemoveStudent(SqliteStore, 2)
+        SqliteStore.Commit()
+        changes = GetStudentChanges(SqliteStore, since)
+        assert changes['version'] == SqliteStore.Version()
+        assert [(s['id'], s['courses'][0]['grade']) for s in changes['students']] == [(1, "B")]
+        assert changes['deleted'] == [2]
+        monkeypatch.setattr(sqlite_store, "CHANGE_LOG_SIZE", 1)
+        assert GetStudentChanges(SqliteStore, since)['resync'] is True
+
+    def test_WritesPersistAcrossReopen(self, SqliteStore):
+        """Test that committed writes survive reopening, without importing again."""
+        SqliteStore.Submit(lambda data: RemoveStudent(data, 1)).result()
+        reopened = SqliteStudentStore(SqliteStore.filename, importFile=SqliteStore.importFile)
+        try:
+            assert [s["id"] for s in reopened.AllStudents()] == [2]
+        finally:
+            reopened.Close()
+
+    def test_FailedCommitRollsBack(self, SqliteStore, monkeypatch):
+        """Test that a failed commit fails the batch and rolls its transaction back."""
+        version = SqliteStore.Version()
+
+        def FailingCommit():
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr(SqliteStore, "Commit", FailingCommit)
+        with pytest.raises(sqlite3.OperationalError):
+            SqliteStore.Submit(lambda data: RemoveStudent(data, 1)).result()
+        monkeypatch.undo()
+        SqliteStore.Submit(lambda data: RemoveStudent(data, 2)).result()
+        assert [s["id"] for s in SqliteStore.AllStudents()] == [1]
+        # Only the committed removal bumped the version
+        epoch, number = version.split("-")
+        assert SqliteStore.Version() == f"{epoch}-{int(number) + 1}"
@@ -2,16 +2,37 @@ import pytest
 import copy
 import os
 import json
+from collections import deque
+import threading
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
+import json_handler
+import student_journal
+from atomic_file import VerifyChecksum
 # Import functions to test from StudentManager
 from json_handler import (
+    StudentStore,
     LoadJsonFile,
+    LoadJsonFileShared,
     SaveJsonFile,
     AddStudent,
+    AddStudents,
     RemoveStudent,
     UpdateStudentGrade,
+    UpdateStudentGrades,
     GetStudentDetails,
-    GetCourseStudents
+    GetCourseStudents,
+    GetCourseStats,
+    SearchStudents,
+    GetStudentChanges,
+    GetStudentsPage,
+    ParseFields,
+    ProjectStudents,
+    IterJsonStudents,
+    SaveJsonStudents,
+    ScanCourseStudents
 )
 
 @pytest.fixture
@@ -107,3 +128,666 @@ class TestStudentManager:
         assert os.path.exists(filePath)
         reloaded = LoadJsonFile(str(filePath))
         assert reloaded == SampleData
+
+@pytest.fixture
+def SampleStore(tmp_path, SampleData):
+    """
+    Build a resident StudentStore over a temporary copy of the student data.
+    """
+    filePath = tmp_path / "students_data.json"
+    SaveJsonFile(str(filePath), SampleData)
+    store = StudentStore(str(filePath))
+    store.Load()
+    yield store
+    store.writer.Stop()
+
+class TestStudentStore:
+    """
+    Test cases for the json_handler functions running against a StudentStore.
+    """
+
+    def test_LoadIndexesStudents(self, SampleStore, SampleData):
+        """Test that every student in the file is indexed by ID."""
+        assert set(SampleStore.students) == {s['id'] for s in SampleData['students']}
+
+    def test_AddAndGetStudent(self, SampleStore):
+        """Test adding a student and looking it up by ID."""
+        newStudent = {
+            "id": 3,
+            "name": "Nihil  S",
+            "age": 21,
+            "courses": [{"code": "CS202", "name": "Data Structures", "grade": "A"}],
+            "contact": {"email": "nihil@example.com", "phone": "111-222-3333"}
+        }
+        AddStudent(SampleStore, newStudent)
+        assert GetStudentDetails(SampleStore, 3)['name'] == "Nihil  S"
+
+    def test_AddExistingStudentRaises(self, SampleStore):
+        """Test that adding a duplicate ID raises an error."""
+        with pytest.raises(ValueError, match="already exists"):
+            AddStudent(SampleStore, dict(GetStudentDetails(SampleStore, 1)))
+
+    def test_RemoveStudent(self, SampleStore):
+        """Test removing a student by ID."""
+        RemoveStudent(SampleStore, 2)
+        with pytest.raises(ValueError, match="not found"):
+            GetStudentDetails(SampleStore, 2)
+        with pytest.raises(ValueError, match="not found"):
+            RemoveStudent(SampleStore, 2)
+
+    def test_UpdateStudentGrade(self, SampleStore):
+        """Test updating a grade through the store."""
+        UpdateStudentGrade(SampleStore, 1, "CS101", "A+")
+        course = next(c for c in GetStudentDetails(SampleStore, 1)['courses'] if c['code'] == "CS101")
+        assert course['grade'] == "A+"
+        with pytest.raises(ValueError, match="not found"):
+            UpdateStudentGrade(SampleStore, 1, "XX999", "B")
+
+    def test_GetCourseStudents(self, SampleStore):
+        """Test fetching the students enrolled in a course."""
+        assert {s['id'] for s in GetCourseStudents(SampleStore, "CS101")} == {1, 2}
+        with pytest.raises(ValueError, match="No students found"):
+            GetCourseStudents(SampleStore, "ZZZ999")
+
+    def test_CourseIndexFollowsMutations(self, SampleStore):
+        """Test that the course index is updated by adds and removes."""
+        AddStudent(SampleStore, {
+            "id": 3,
+            "name": "Nihil  S",
+            "age": 21,
+            "courses": [{"code": "PH201", "name": "Physics", "grade": "B"}],
+            "contact": {"email": "nihil@example.com", "phone": "111-222-3333"}
+        })
+        assert [s['id'] for s in GetCourseStudents(SampleStore, "PH201")] == [2, 3]
+        RemoveStudent(SampleStore, 2)
+        assert [s['id'] for s in GetCourseStudents(SampleStore, "PH201")] == [3]
+        assert [s['id'] for s in GetCourseStudents(SampleStore, "CS101")] == [1]
+        RemoveStudent(SampleStore, 3)
+        assert "PH201" not in SampleStore.courses
+
+    def test_VersionFollowsChanges(self, SampleStore):
+        """Test that successful changes bump the version and failed ones do not."""
+        before = SampleStore.Version()
+        with pytest.raises(ValueError):
+            RemoveStudent(SampleStore, 999)
+        assert SampleStore.Version() == before
+        UpdateStudentGrade(SampleStore, 1, "CS101", "B")
+        assert SampleStore.Version() != before
+        assert StudentStore(SampleStore.filename).Version() != SampleStore.Version()
+
+    def test_ChangesSinceVersion(self, SampleStore):
+        """Test that changes since a version list changed students and removed IDs."""
+        since = SampleStore.Version()
+        assert GetStudentChanges(SampleStore, since) == {'version': since, 'students': [], 'deleted': []}
+        UpdateStudentGrade(SampleStore, 1, "CS101", "B")
+        AddStudent(SampleStore, {"id": 3, "name": "Temp", "age": 20, "courses": [], "contact": {}})
+        RemoveStudent(SampleStore, 3)
+        changes = GetStudentChanges(SampleStore, f'W/"{since}"')
+        assert changes['version'] == SampleStore.Version()
+        assert [s['id'] for s in changes['students']] == [1]
+        assert changes['deleted'] == [3]
+        # Versions from another store or before the log reaches back need a full reload
+        assert GetStudentChanges(SampleStore, "other-0")['resync'] is True
+        SampleStore.changes = deque(SampleStore.changes, maxlen=2)
+        assert GetStudentChanges(SampleStore, since)['resync'] is True
+        assert GetStudentChanges(SampleStore, f"{SampleStore.epoch}-1")['deleted'] == [3]
+
+    def test_CommitReplaysJournalOnReload(self, SampleStore):
+        """Test that committed changes are journaled and replayed, not saved to the data file."""
+        RemoveStudent(SampleStore, 2)
+        UpdateStudentGrade(SampleStore, 1, "CS101", "B+")
+        SampleStore.Commit()
+        assert [s['id'] for s in LoadJsonFile(SampleStore.filename)['students']] == [1, 2]
+
+        reloaded = StudentStore(SampleStore.filename)
+        reloaded.Load()
+        assert list(reloaded.students) == [1]
+        assert reloaded.students[1]['courses'][0]['grade'] == "B+"
+        assert reloaded.journalLength == 2
+
+    def test_CompactFoldsJournalIntoSnapshot(self, SampleStore):
+        """Test that compaction writes a new snapshot and empties the journal."""
+        RemoveStudent(SampleStore, 2)
+        SampleStore.Commit()
+        SampleStore.Compact()
+        assert [s['id'] for s in LoadJsonFile(SampleStore.filename)['students']] == [1]
+        assert list(SampleStore.journal.Read()) == []
+
+    def test_CommitCompactsAtThreshold(self, SampleStore):
+        """Test that Commit compacts once the journal reaches compactEvery records."""
+        SampleStore.compactEvery = 2
+        UpdateStudentGrade(SampleStore, 1, "CS101", "B")
+        SampleStore.Commit()
+        assert SampleStore.journalLength == 1
+        UpdateStudentGrade(SampleStore, 1, "CS101", "C")
+        SampleStore.Commit()
+        assert SampleStore.journalLength == 0
+        # The snapshot is written in the background
+        SampleStore.WaitForCompaction()
+        assert not os.path.exists(SampleStore.journal.rotatedFile)
+        assert LoadJsonFile(SampleStore.filename)['students'][0]['courses'][0]['grade'] == "C"
+
+    def test_CompactionRunsOffTheCommitPath(self, SampleStore, monkeypatch):
+        """Test that commits go on while a snapshot is written, and survive a crash mid-write."""
+        started, release = threading.Event(), threading.Event()
+        save = json_handler.SaveJsonStudents
+
+        def SlowSave(filename, students):
+            started.set()
+            release.wait(5)
+            save(filename, students)
+
+        monkeypatch.setattr(json_handler, "SaveJsonStudents", SlowSave)
+        SampleStore.compactEvery = 1
+        RemoveStudent(SampleStore, 2)
+        SampleStore.Commit()
+        assert started.wait(5)
+        UpdateStudentGrade(SampleStore, 1, "CS101", "B")
+        SampleStore.Commit()
+
+        # A restart now finds the old data file plus both journal segments
+        restarted = StudentStore(SampleStore.filename)
+        restarted.Load()
+        assert [(s['id'], s['courses'][0]['grade']) for s in restarted.students.values()] == [(1, "B")]
+
+        release.set()
+        SampleStore.WaitForCompaction()
+        assert [s['id'] for s in LoadJsonFile(SampleStore.filename)['students']] == [1]
+        assert not os.path.exists(SampleStore.journal.rotatedFile)
+        assert [record['op'] for record in SampleStore.journal.Read()] == ['grade']
+
+    def test_RolledBackGradeStaysOutOfCompaction(self, SampleStore, monkeypatch):
+        """Test that a snapshot being written does not pick up a grade change that is then rolled back."""
+        started, release = threading.Event(), threading.Event()
+        save = json_handler.SaveJsonStudents
+
+        def SlowSave(filename, students):
+            started.set()
+            release.wait(5)
+            save(filename, students)
+
+        def FailingAppend(records):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(json_handler, "SaveJsonStudents", SlowSave)
+        SampleStore.compactEvery = 1
+        RemoveStudent(SampleStore, 2)
+        SampleStore.Commit()
+        assert started.wait(5)
+        grade = GetStudentDetails(SampleStore, 1)['courses'][0]['grade']
+        UpdateStudentGrade(SampleStore, 1, "CS101", "F")
+        monkeypatch.setattr(SampleStore.journal, "Append", FailingAppend)
+        with pytest.raises(OSError):
+            SampleStore.Commit()
+        SampleStore.Rollback()
+
+        release.set()
+        SampleStore.WaitForCompaction()
+        assert LoadJsonFile(SampleStore.filename)['students'][0]['courses'][0]['grade'] == grade
+
+    def test_TornJournalRecordIgnored(self, SampleStore):
+        """Test that a partially written final journal record is skipped on reload."""
+        RemoveStudent(SampleStore, 2)
+        SampleStore.Commit()
+        with open(SampleStore.journal.filename, 'a') as f:
+            f.write('{"op": "remove", "id"')
+        reloaded = StudentStore(SampleStore.filename)
+        reloaded.Load()
+        assert list(reloaded.students) == [1]
+
+class TestStudentPaging:
+    """
+    Test cases for paging and field selection of student listings.
+    """
+
+    @pytest.fixture(params=["dict", "store"])
+    def PagingData(self, request, SampleData, SampleStore):
+        """Five students with unordered IDs, as a plain dict and as a store."""
+        data = SampleStore if request.param == "store" else SampleData
+        for studentId in (7, 4, 5):
+            AddStudent(data, {
+                "id": studentId,
+                "name": f"Student {studentId}",
+                "age": 20,
+                "courses": [],
+                "contact": {}
+            })
+        return data
+
+    def test_PagesFollowIdOrder(self, PagingData):
+        """Test that pages walk every student once in ID order."""
+        seen, cursor = [], None
+        while True:
+            students, cursor = GetStudentsPage(PagingData, 2, cursor)
+            seen.extend(s['id'] for s in students)
+            if cursor is None:
+                break
+        assert seen == [1, 2, 4, 5, 7]
+
+    def test_PageAfterRemovedCursor(self, PagingData):
+        """Test that a cursor stays valid after its student is removed."""
+        students, cursor = GetStudentsPage(PagingData, 3)
+        assert cursor == 4
+        RemoveStudent(PagingData, 4)
+        students, cursor = GetStudentsPage(PagingData, 3, cursor)
+        assert [s['id'] for s in students] == [5, 7]
+        assert cursor is None
+
+    def test_ProjectStudents(self, PagingData):
+        """Test keeping only the requested fields."""
+        students, _ = GetStudentsPage(PagingData, 1)
+        assert ProjectStudents(students, ParseFields("id, name")) == [{"id": 1, "name": "John Smith"}]
+
+    def test_ParseUnknownFieldRaises(self):
+        """Test that unknown fields are rejected."""
+        with pytest.raises(ValueError, match="Invalid student fields"):
+            ParseFields("id,password")
+
+class TestBulkAdd:
+    """
+    Test cases for adding a batch of students in one pass.
+    """
+
+    @pytest.fixture(params=["dict", "store"])
+    def BulkData(self, request, SampleData, SampleStore):
+        """The sample students as a plain dict and as a store."""
+        return SampleStore if request.param == "store" else SampleData
+
+    def test_AddStudentsReportsPerItemErrors(self, BulkData):
+        """Test that valid students are added and the rest are reported by position."""
+        batch = [
+            {"id": 3, "name": "A", "age": 20, "courses": [], "contact": {}},
+            {"id": 1, "name": "Taken", "age": 20, "courses": [], "contact": {}},
+            {"id": 4, "name": "B"},
+            {"id": 3, "name": "Repeat", "age": 20, "courses": [], "contact": {}},
+            {"id": 5, "name": "C", "age": 20, "courses": [], "contact": {}},
+        ]
+        errors = AddStudents(BulkData, batch)
+        assert [(e['index'], e['id']) for e in errors] == [(1, 1), (2, 4), (3, 3)]
+        assert "already exists" in errors[0]['error']
+        assert "missing required fields" in errors[1]['error']
+        assert GetStudentDetails(BulkData, 3)['name'] == "A"
+        assert GetStudentDetails(BulkData, 5)['name'] == "C"
+
+    def test_BulkAddIsOneJournalCommit(self, SampleStore):
+        """Test that a committed batch is journaled and replayed as a whole."""
+        AddStudents(SampleStore, [
+            {"id": i, "name": f"S{i}", "age": 20, "courses": [], "contact": {}} for i in range(3, 103)
+        ])
+        SampleStore.Commit()
+        reloaded = StudentStore(SampleStore.filename)
+        reloaded.Load()
+        assert len(reloaded.students) == 102
+
+class TestBulkGradeUpdate:
+    """
+    Test cases for applying a batch of grade updates in one pass.
+    """
+
+    @pytest.fixture(params=["dict", "store"])
+    def GradeData(self, request, SampleData, SampleStore):
+        """The sample students as a plain dict and as a store."""
+        return SampleStore if request.param == "store" else SampleData
+
+    def test_UpdateStudentGradesReportsPerItemErrors(self, GradeData):
+        """Test that valid updates are applied in order and the rest are reported by position."""
+        errors = UpdateStudentGrades(GradeData, [
+            {"studentId": 1, "courseCode": "CS101", "newGrade": "C"},
+            {"studentId": 999, "courseCode": "CS101", "newGrade": "A"},
+            {"studentId": 2, "courseCode": "XX999", "newGrade": "A"},
+            {"studentId": 1, "courseCode": "CS101", "newGrade": "B"},
+        ])
+        assert [(e['index'], e['studentId']) for e in errors] == [(1, 999), (2, 2)]
+        assert "Student with ID 999 not found" in errors[0]['error']
+        assert "Course with code 'XX999' not found" in errors[1]['error']
+        assert GetStudentDetails(GradeData, 1)['courses'][0]['grade'] == "B"
+
+    def test_BulkGradeUpdateIsOneJournalCommit(self, SampleStore, monkeypatch):
+        """Test that a submitted batch of grade updates is journaled with one write."""
+        commits = []
+        append = SampleStore.journal.Append
+
+        def CountingAppend(records):
+            commits.append(len(records))
+            append(records)
+
+        monkeypatch.setattr(SampleStore.journal, "Append", CountingAppend)
+        updates = [{"studentId": studentId, "courseCode": "CS101", "newGrade": grade}
+                   for grade in "ABCD" for studentId in (1, 2)]
+        assert SampleStore.Submit(lambda data: UpdateStudentGrades(data, updates)).result() == []
+        assert commits == [8]
+        reloaded = StudentStore(SampleStore.filename)
+        reloaded.Load()
+        assert reloaded.Get(2)['courses'][0]['grade'] == "D"
+
+class TestCourseStats:
+    """
+    Test cases for per-course enrollment, grade and age statistics.
+    """
+
+    @pytest.fixture(params=["dict", "store"])
+    def StatsData(self, request, SampleData, SampleStore):
+        """The sample students as a plain dict and as a store."""
+        return SampleStore if request.param == "store" else SampleData
+
+    def test_GetCourseStats(self, StatsData, SampleData):
+        """Test the statistics of a course against the sample students."""
+        enrolled = [s for s in SampleData["students"] if any(c["code"] == "CS101" for c in s["courses"])]
+        stats = GetCourseStats(StatsData, "CS101")
+        assert stats["enrolled"] == len(enrolled)
+        assert stats["averageAge"] == sum(s["age"] for s in enrolled) / len(enrolled)
+        assert sum(stats["grades"].values()) == len(enrolled)
+        with pytest.raises(ValueError, match="No students found"):
+            GetCourseStats(StatsData, "XX999")
+
+    def test_StatsFollowMutationsAndReload(self, SampleStore):
+        """Test that incremental statistics match a fresh scan after mutations and a reload."""
+        AddStudent(SampleStore, {
+            "id": 3, "name": "A", "age": 30,
+            "courses": [{"code": "CS101", "name": "Intro", "grade": "C"},
+                        {"code": "CS101", "name": "Intro", "grade": "F"}],
+            "contact": {}
+        })
+        UpdateStudentGrade(SampleStore, 3, "CS101", "A")
+        RemoveStudent(SampleStore, 1)
+        expected = GetCourseStats(SampleStore.ToDict(), "CS101")
+        assert GetCourseStats(SampleStore, "CS101") == expected
+        assert expected["enrolled"] == 2
+
+        SampleStore.Commit()
+        reloaded = StudentStore(SampleStore.filename)
+        reloaded.Load()
+        assert GetCourseStats(reloaded, "CS101") == expected
+
+class TestStudentSearch:
+    """
+    Test cases for searching students by name and email.
+    """
+
+    @pytest.fixture(params=["dict", "store"])
+    def SearchData(self, request, SampleData, SampleStore):
+        """The sample students plus two more Smiths, as a plain dict and as a store."""
+        data = SampleStore if request.param == "store" else SampleData
+        AddStudents(data, [
+            {"id": 3, "name": "Anna Smithers", "age": 22, "courses": [], "contact": {"email": "anna@example.com"}},
+            {"id": 4, "name": "Smith Jones", "age": 23, "courses": [], "contact": {"email": "sj@example.com"}},
+        ])
+        return data
+
+    def test_PrefixMatchesRankWholeWordsFirst(self, SearchData):
+        """Test that whole-word matches rank above prefix matches, ties by ID."""
+        assert [s['id'] for s in SearchStudents(SearchData, "smith")] == [1, 4, 3]
+        assert [s['id'] for s in SearchStudents(SearchData, "SMI", limit=2)] == [1, 3]
+        # Every query word must prefix a word for a prefix match; near misses follow
+        assert [s['id'] for s in SearchStudents(SearchData, "john smi")] == [1, 4]
+
+    def test_EmailAndFuzzyMatches(self, SearchData):
+        """Test email prefixes and misspelt names."""
+        assert [s['id'] for s in SearchStudents(SearchData, "john.smith@exa")] == [1]
+        assert [s['id'] for s in SearchStudents(SearchData, "wilsen")] == [2]
+        assert SearchStudents(SearchData, "zzzz") == []
+
+    def test_IndexFollowsMutations(self, SampleStore):
+        """Test that the search index built at load tracks later changes."""
+        assert SearchStudents(SampleStore, "grace") == []
+        AddStudent(SampleStore, {"id": 3, "name": "Grace Hopper", "age": 30, "courses": [], "contact": {}})
+        assert [s['id'] for s in SearchStudents(SampleStore, "grace")] == [3]
+        RemoveStudent(SampleStore, 3)
+        assert SearchStudents(SampleStore, "grace") == []
+        assert SearchStudents(SampleStore, "hoper") == []
+
+    def test_IndexFindsMatchesBehindCommonWords(self):
+        """Test that the index checks every student of a common query word, as a full scan does."""
+        students = {i: {"id": i, "name": f"Maria Lee{i}", "age": 20, "courses": [], "contact": {}}
+                    for i in range(1, 3001)}
+        students[5000] = {"id": 5000, "name": "Maria Lee", "age": 20, "courses": [], "contact": {}}
+        index = json_handler.StudentSearchIndex(students)
+        for query in ("maria lee", "lee maria", "mar lee1"):
+            assert index.Search(query, 5) == json_handler.RankStudents(query, students.values(), 5)
+        # The only whole-word match comes first though its ID is the highest
+        assert [s['id'] for s in index.Search("maria lee", 5)][0] == 5000
+
+    def test_LargeStoreIndexesOffTheLock(self, SampleStore, monkeypatch):
+        """Test that a background index build keeps the store usable and catches up on changes."""
+        started, release = threading.Event(), threading.Event()
+
+        class SlowIndex(json_handler.StudentSearchIndex):
+            def __init__(self, students):
+                started.set()
+                release.wait(5)
+                super().__init__(students)
+
+        monkeypatch.setattr(json_handler, "SEARCH_INDEX_SYNC_LIMIT", 0)
+        monkeypatch.setattr(json_handler, "StudentSearchIndex", SlowIndex)
+        SampleStore.Load()
+        assert started.wait(5)
+        # Reads, writes and searches go on while the index is built
+        assert [s['id'] for s in SearchStudents(SampleStore, "john")] == [1]
+        AddStudent(SampleStore, {"id": 3, "name": "Grace Hopper", "age": 30, "courses": [], "contact": {}})
+        RemoveStudent(SampleStore, 2)
+        assert [s['id'] for s in SearchStudents(SampleStore, "grace")] == [3]
+        assert SampleStore.search is None
+        release.set()
+        assert SampleStore.WaitForSearchIndex(5)
+        assert [s['id'] for s in SearchStudents(SampleStore, "grace")] == [3]
+        assert SearchStudents(SampleStore, "wilson") == []
+
+class TestStoreOwnership:
+    """
+    Test cases for the lock that keeps a store's files to one process.
+    """
+
+    def test_SecondProcessIsRefused(self, tmp_path, SampleData):
+        """Test that loading fails while another process holds the store, and works once it exits."""
+        filePath = str(tmp_path / "students_data.json")
+        SaveJsonFile(filePath, SampleData)
+        holder = subprocess.Popen(
+            [sys.executable, "-c", "import sys; from json_handler import StudentStore; "
+             "StudentStore(sys.argv[1]).Load(); print('ready', flush=True); sys.stdin.read()", filePath],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            assert holder.stdout.readline().strip() == "ready"
+            with pytest.raises(RuntimeError, match="in use by another process"):
+                StudentStore(filePath).Load()
+        finally:
+            holder.communicate()
+        store = StudentStore(filePath)
+        store.Load()
+        # Other stores of the owning process share the files
+        StudentStore(filePath).Load()
+        assert len(store.students) == 2
+
+class TestStudentWriter:
+    """
+    Test cases for the single writer queue with group commit.
+    """
+
+    def test_ConcurrentUpdatesAreNotLost(self, SampleStore, monkeypatch):
+        """Test that concurrent submitters all land and share journal writes."""
+        commits = []
+        append = SampleStore.journal.Append
+
+        def CountingAppend(records):
+            commits.append(len(records))
+            append(records)
+
+        monkeypatch.setattr(SampleStore.journal, "Append", CountingAppend)
+        SampleStore.writer.batchWindow = 0.01
+
+        def Enroll(studentId):
+            studentInfo = {"id": studentId, "name": f"S{studentId}", "age": 20, "courses": [], "contact": {}}
+            return SampleStore.Submit(lambda data: AddStudent(data, studentInfo)).result()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(Enroll, range(3, 203)))
+
+        assert len(SampleStore.students) == 202
+        assert sum(commits) == 200
+        assert len(commits) < 200
+        reloaded = StudentStore(SampleStore.filename)
+        reloaded.Load()
+        assert len(reloaded.students) == 202
+
+    def test_FailedMutationRaisesForItsCaller(self, SampleStore):
+        """Test that a failing mutation resolves only its own future with the error."""
+        failed = SampleStore.Submit(lambda data: RemoveStudent(data, 999))
+        succeeded = SampleStore.Submit(lambda data: RemoveStudent(data, 2))
+        with pytest.raises(ValueError, match="not found"):
+            failed.result()
+        assert succeeded.result() is None
+        assert [r['op'] for r in SampleStore.journal.Read()] == ['remove']
+
+    def test_FailedCommitRollsTheBatchBack(self, SampleStore, monkeypatch):
+        """Test that a batch whose commit fails fails every caller and leaves no trace."""
+        before = SampleStore.Version()
+
+        def FailingFsync(fileno):
+            raise OSError("disk full")
+
+        # The batch is written to the journal file, then the fsync fails
+        monkeypatch.setattr(student_journal.os, "fsync", FailingFsync)
+        SampleStore.writer.batchWindow = 0.05
+        studentInfo = {"id": 3, "name": "Grace Hopper", "age": 30, "courses": [], "contact": {}}
+        futures = [SampleStore.Submit(lambda data: AddStudent(data, studentInfo)),
+                   SampleStore.Submit(lambda data: UpdateStudentGrade(data, 1, "CS101", "F"))]
+        for future in futures:
+            with pytest.raises(OSError, match="disk full"):
+                future.result()
+        monkeypatch.undo()
+
+        # Gone from memory, with a new version so readers resync
+        with pytest.raises(ValueError, match="not found"):
+            GetStudentDetails(SampleStore, 3)
+        assert GetStudentDetails(SampleStore, 1)['courses'][0]['grade'] == "A"
+        assert SampleStore.Version() != before
+        # Not committed later either, nor left in the journal
+        SampleStore.Submit(lambda data: RemoveStudent(data, 2)).result()
+        assert [r['op'] for r in SampleStore.journal.Read()] == ['remove']
+        reloaded = StudentStore(SampleStore.filename)
+        reloaded.Load()
+        assert sorted(reloaded.students) == [1]
+
+class TestStreamingJson:
+    """
+    Test cases for reading and writing student files one record at a time.
+    """
+
+    @pytest.mark.parametrize("chunkSize", [1, 7, 1 << 20])
+    def test_IterJsonStudentsMatchesLoad(self, chunkSize):
+        """Test that streamed records equal the fully parsed ones at any chunk size."""
+        streamed = list(IterJsonStudents("students_data.json", chunkSize=chunkSize))
+        assert streamed == LoadJsonFile("students_data.json")['students']
+
+    def test_IterJsonStudentsSkipsOtherKeys(self, tmp_path):
+        """Test that other top-level values around the array are skipped."""
+        filePath = tmp_path / "data.json"
+        filePath.write_text('{"version": 12345, "meta": {"a": [1, "]"]}, "students": [{"id": 1}, {"id": 2}], "n": 1.5}')
+        assert [s['id'] for s in IterJsonStudents(str(filePath), chunkSize=3)] == [1, 2]
+
+    def test_IterJsonStudentsEmpty(self, tmp_path):
+        """Test files without students."""
+        filePath = tmp_path / "data.json"
+        filePath.write_text('{"students": [ ]}')
+        assert list(IterJsonStudents(str(filePath))) == []
+        filePath.write_text('{}')
+        assert list(IterJsonStudents(str(filePath))) == []
+
+    def test_IterJsonStudentsInvalidRaises(self, tmp_path):
+        """Test that truncated files raise the same error as LoadJsonFile."""
+        filePath = tmp_path / "data.json"
+        filePath.write_text('{"students": [{"id": 1}, {"id": 2')
+        with pytest.raises(ValueError, match="invalid JSON"):
+            list(IterJsonStudents(str(filePath), chunkSize=4))
+        with pytest.raises(FileNotFoundError):
+            list(IterJsonStudents(str(tmp_path / "missing.json")))
+
+    def test_SaveJsonStudentsMatchesSaveJsonFile(self, tmp_path, SampleData):
+        """Test that streamed output is byte-identical to SaveJsonFile."""
+        for students in (SampleData['students'], []):
+            SaveJsonFile(str(tmp_path / "a.json"), {'students': students})
+            SaveJsonStudents(str(tmp_path / "b.json"), iter(students))
+            assert (tmp_path / "a.json").read_text() == (tmp_path / "b.json").read_text()
+
+    def test_ScanCourseStudents(self):
+        """Test filtering a course while streaming the file."""
+        assert [s['id'] for s in ScanCourseStudents("students_data.json", "PH201")] == [2]
+
+class TestAtomicSave:
+    """
+    Test cases for crash-safe writes of the data file.
+    """
+
+    def test_FailedSaveKeepsOldFile(self, tmp_path, SampleData):
+        """Test that a save failing midway leaves the old file and no temporary files."""
+        filePath = str(tmp_path / "data.json")
+        SaveJsonFile(filePath, SampleData)
+        with pytest.raises(TypeError):
+            SaveJsonFile(filePath, {"students": [SampleData["students"][0], object()]})
+        assert LoadJsonFile(filePath) == SampleData
+        assert sorted(os.listdir(tmp_path)) == ["data.json", "data.json.sha256"]
+
+    def test_ChecksumDetectsCorruption(self, tmp_path, SampleData):
+        """Test that the checksum file matches what was written and catches later damage."""
+        filePath = tmp_path / "data.json"
+        SaveJsonStudents(str(filePath), SampleData["students"])
+        assert VerifyChecksum(str(filePath)) is True
+        filePath.write_text(filePath.read_text().replace("John", "Jahn"))
+        assert VerifyChecksum(str(filePath)) is False
+        assert VerifyChecksum(str(tmp_path / "missing.json")) is None
+
+class TestLoadJsonCache:
+    """
+    Test cases for the stat-validated parse cache of LoadJsonFileShared.
+    """
+
+    def test_UnchangedFileIsNotReparsed(self, tmp_path, SampleData, monkeypatch):
+        """Test that loading an unchanged file returns the cached document."""
+        filePath = str(tmp_path / "data.json")
+        SaveJsonFile(filePath, SampleData)
+        first = LoadJsonFileShared(filePath)
+        monkeypatch.setattr(json_handler.json, "load", None)
+        assert LoadJsonFileShared(filePath) is first
+        assert first == SampleData
+
+    def test_CallersGetTheirOwnCopy(self, tmp_path, SampleData):
+        """Test that LoadJsonFile parses a document of its own on every call."""
+        filePath = str(tmp_path / "data.json")
+        SaveJsonFile(filePath, SampleData)
+        shared = LoadJsonFileShared(filePath)
+        first = LoadJsonFile(filePath)
+        RemoveStudent(first, 1)
+        UpdateStudentGrade(LoadJsonFile(filePath), 2, "CS101", "F")
+        assert LoadJsonFile(filePath) == SampleData
+        assert LoadJsonFileShared(filePath) is shared
+        assert shared == SampleData
+
+    def test_ExternalWriteIsDetected(self, tmp_path, SampleData):
+        """Test that a write from outside json_handler invalidates the cache."""
+        filePath = tmp_path / "data.json"
+        SaveJsonFile(str(filePath), SampleData)
+        first = LoadJsonFileShared(str(filePath))
+        filePath.write_text(json.dumps({"students": []}))
+        assert LoadJsonFileShared(str(filePath)) == {"students": []}
+        assert first['students']
+
+    def test_SameSizeRewriteIsDetected(self, tmp_path):
+        """Test that a same-size rewrite is caught through the modification time."""
+        filePath = tmp_path / "data.json"
+        filePath.write_text('{"students": [1]}')
+        LoadJsonFileShared(str(filePath))
+        filePath.write_text('{"students": [2]}')
+        stat = os.stat(filePath)
+        os.utime(filePath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        assert LoadJsonFileShared(str(filePath)) == {"students": [2]}
+
+    def test_CacheIsBounded(self, tmp_path):
+        """Test that only the most recently loaded files stay cached."""
+        paths = [str(tmp_path / f"data{i}.json") for i in range(json_handler.PARSE_CACHE_SIZE + 1)]
+        for path in paths:
+            SaveJsonFile(path, {"students": []})
+        for path in paths:
+            LoadJsonFileShared(path)
+        LoadJsonFileShared(paths[1])
+        assert len(json_handler._parseCache) == json_handler.PARSE_CACHE_SIZE
+        assert os.path.abspath(paths[0]) not in json_handler._parseCache
+        assert list(json_handler._parseCache)[-1] == os.path.abspath(paths[1])
@@ -0,0 +1,219 @@
+import json
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from main import app
+import students
+import mongo_students
+from mongo_students import MongoStudentRepository
+from response_cache import ResponseCache
+from fake_mongo import FakeCollection
+
+@pytest_asyncio.fixture(autouse=True)
+async def MongoRepository(monkeypatch):
+    # Serve the routes from an in-process stand-in seeded with the sample students
+    collection = FakeCollection("students")
+    with open("students_data.json") as f:
+        await collection.insert_many(json.load(f)["students"])
+    repository = MongoStudentRepository(collection, FakeCollection("counters"))
+    monkeypatch.setattr(students, "repository", repository)
+    monkeypatch.setattr(students, "responseCache", ResponseCache())
+    return repository
+
+@pytest.mark.asyncio
+async def test_get_students_without_mongo_ids():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/students")
+        assert response.status_code == 200
+        assert [s["id"] for s in response.json()["students"]] == [1, 2]
+        assert "_id" not in response.json()["students"][0]
+
+        response = await client.get("/api/students", params={"courseCode": "CS101", "fields": "id"})
+        assert response.json() == [{"id": 1}, {"id": 2}]
+
+        response = await client.get("/api/students", params={"courseCode": "XX999"})
+        assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_create_update_delete_student(MongoRepository):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        payload = {
+            "id": 3,
+            "name": "Nihil S",
+            "age": 21,
+            "courses": [{"code": "CS202", "name": "Data Structures", "grade": "A"}],
+            "contact": {"email": "nihil@example.com", "phone": "111-222-3333"}
+        }
+        response = await client.post("/api/students", json=payload)
+        assert response.status_code == 200
+        response = await client.post("/api/students", json=payload)
+        assert response.status_code == 400
+        assert "already exists" in response.text
+
+        response = await client.put("/api/students/3", json={"courseCode": "CS202", "newGrade": "B"})
+        assert response.status_code == 200
+        response = await client.put("/api/students/3", json={"courseCode": "XX999", "newGrade": "B"})
+        assert response.status_code == 400
+        response = await client.get("/api/students", params={"studentId": 3})
+        assert response.json() == {**payload, "courses": [{**payload["courses"][0], "grade": "B"}]}
+
+        response = await client.delete("/api/students/3")
+        assert response.status_code == 200
+        response = await client.delete("/api/students/3")
+        assert response.status_code == 404
+
+    # The unique index on id is what rejected the duplicate
+    assert [['id', 1]] in [[list(key) for key in index] for index in MongoRepository.collection.indexes]
+
+@pytest.mark.asyncio
+async def test_paged_students_with_fields():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/students", params={"limit": 1, "fields": "name"})
+        assert response.json() == {"students": [{"name": "John Smith"}], "nextCursor": 1}
+
+        response = await client.get("/api/students", params={"limit": 1, "cursor": 1, "fields": "id"})
+        assert response.json() == {"students": [{"id": 2}], "nextCursor": None}
+
+@pytest.mark.asyncio
+async def test_bulk_create_students(MongoRepository):
+    subscription = MongoRepository.events.Subscribe()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        batch = [
+            {"id": 3, "name": "A", "age": 20, "courses": [], "contact": {}},
+            {"id": 4, "name": "B", "age": "not a number", "courses": [], "contact": {}},
+            {"id": 2, "name": "Taken", "age": 20, "courses": [], "contact": {}},
+            {"id": 3, "name": "Repeat", "age": 20, "courses": [], "contact": {}},
+            {"id": 5, "name": "C", "age": 20, "courses": [], "contact": {}},
+        ]
+        response = await client.post("/api/students/bulk", json=batch)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["added"] == 2
+        assert [(e["index"], e["id"]) for e in body["errors"]] == [(1, 4), (2, 2), (3, 3)]
+        assert "already exists" in body["errors"][1]["error"]
+    assert [s["id"] for s in await MongoRepository.AllStudents(["id"])] == [1, 2, 3, 5]
+    # Only the inserted students are published
+    assert [json.loads(event.split(b"data: ")[1])["student"]["id"] for event in subscription.buffer] == [3, 5]
+
+@pytest.mark.asyncio
+async def test_bulk_update_grades(MongoRepository):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        updates = [
+            {"studentId": 1, "courseCode": "CS101", "newGrade": "C"},
+            {"studentId": 999, "courseCode": "CS101", "newGrade": "A"},
+            {"studentId": 2, "courseCode": "XX999", "newGrade": "A"},
+            {"studentId": 1, "courseCode": "CS101", "newGrade": "B"},
+        ]
+        response = await client.patch("/api/students/grades", json=updates)
+        body = response.json()
+        assert body["updated"] == 2
+        assert [(e["index"], e["studentId"]) for e in body["errors"]] == [(1, 999), (2, 2)]
+    student = await MongoRepository.Get(1)
+    assert student["courses"][0]["grade"] == "B"
+
+@pytest.mark.asyncio
+async def test_course_stats():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/courses/CS101/stats")
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["code"] == "CS101"
+        assert stats["enrolled"] == 2
+        assert sum(stats["grades"].values()) == 2
+
+        response = await client.delete("/api/students/1")
+        response = await client.get("/api/courses/CS101/stats")
+        assert response.json()["enrolled"] == 1
+
+        response = await client.get("/api/courses/XX999/stats")
+        assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_version_follows_changes(MongoRepository):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        etag = (await client.get("/api/students")).headers["etag"]
+        response = await client.get("/api/students", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        await client.delete("/api/students/2")
+        response = await client.get("/api/students", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert etag.endswith('-1"')
+
+        # A failed change leaves the version alone
+        await client.delete("/api/students/2")
+        assert f'"{await MongoRepository.Version()}"' == etag
+
+@pytest.mark.asyncio
+async def test_changes_since_version(MongoRepository, monkeypatch):
+    assert await MongoRepository.Changes("0") == {"version": "0", "students": [], "deleted": []}
+    await MongoRepository.Remove(2)
+    since = await MongoRepository.Version()
+    await MongoRepository.AddMany([{"id": i, "name": f"S{i}", "age": 20, "courses": [], "contact": {}} for i in (4, 3)])
+    await MongoRepository.UpdateGrade(1, "CS101", "B")
+    await MongoRepository.Remove(4)
+
+    changes = await MongoRepository.Changes(since, ["name"])
+    assert changes == {"version": await MongoRepository.Version(), "students": [{"name": "John Smith"}, {"name": "S3"}],
+                       "deleted": [4]}
+    assert (await MongoRepository.Changes("0"))["resync"] is True
+
+    # Only the last CHANGE_LOG_ENTRIES versions are kept
+    monkeypatch.setattr(mongo_students, "CHANGE_LOG_ENTRIES", 2)
+    await MongoRepository.Remove(3)
+    assert (await MongoRepository.Changes(since))["resync"] is True
+
+@pytest.mark.asyncio
+async def test_lost_version_bump_is_logged(MongoRepository, monkeypatch):
+    await MongoRepository.Remove(2)
+    since = await MongoRepository.Version()
+
+    # A writer announces a change and writes it, then dies before the bump
+    await MongoRepository._Announce([1])
+    await MongoRepository.collection.update_one({"id": 1, "courses.code": "CS101"},
+                                                {"$set": {"courses.$.grade": "F"}})
+    # Still in flight as far as readers can tell
+    assert (await MongoRepository.Changes(since))["students"] == []
+
+    monkeypatch.setattr(mongo_students, "PENDING_GRACE_SECONDS", -1)
+    changes = await MongoRepository.Changes(since)
+    assert [s["id"] for s in changes["students"]] == [1]
+    assert changes["version"] == await MongoRepository.Version() != since
+    assert (await MongoRepository.counters.find_one({"_id": "students"}))["pending"] == []
+
+    # Failed changes withdraw their announcement without a new version
+    version = await MongoRepository.Version()
+    with pytest.raises(ValueError):
+        await MongoRepository.Remove(2)
+    with pytest.raises(ValueError):
+        await MongoRepository.Add(changes["students"][0])
+    assert await MongoRepository.Version() == version
+    assert (await MongoRepository.counters.find_one({"_id": "students"}))["pending"] == []
+
+@pytest.mark.asyncio
+async def test_search_students():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/students/search", params={"q": "emma", "fields": "id,name"})
+        assert response.status_code == 200
+        assert response.json() == {"students": [{"id": 2, "name": "Emma Wilson"}]}
+
+        response = await client.get("/api/students/search", params={"q": "JOHN.SMITH@"})
+        assert [s["id"] for s in response.json()["students"]] == [1]
+
+        response = await client.get("/api/students/search", params={"q": "emma", "limit": 0})
+        assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_search_ranks_every_candidate(MongoRepository):
+    # The best match has the highest ID of more prefix matches than any fixed cap
+    await MongoRepository.AddMany(
+        [{"id": i, "name": f"Zed Hopperton{i}", "age": 20, "courses": [], "contact": {}} for i in range(10, 60)]
+        + [{"id": 100, "name": "Zed Hopper", "age": 20, "courses": [], "contact": {"email": "zh@example.com"}}]
+    )
+    assert [s["id"] for s in await MongoRepository.Search("hopper", 1)] == [100]
+    assert [s["id"] for s in await MongoRepository.Search("ZH@EXAMPLE", 5)] == [100]
+    # The terms are stored for the index but never returned
+    assert "searchTerms" not in (await MongoRepository.Search("hopper", 1))[0]
+    assert "searchTerms" not in await MongoRepository.Get(100)
+    assert [['searchTerms', 1]] in [[list(key) for key in index] for index in MongoRepository.collection.indexes]
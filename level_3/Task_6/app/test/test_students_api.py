@@ -0,0 +1,239 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from main import app
+import students
+from json_handler import StudentStore
+from student_repository import StudentRepository
+from response_cache import ResponseCache
+
+@pytest.fixture(autouse=True)
+def TempStore(tmp_path, monkeypatch):
+    # Serve the routes from a temporary copy of the student data
+    filePath = tmp_path / "students_data.json"
+    with open("students_data.json") as f:
+        filePath.write_text(f.read())
+    store = StudentStore(str(filePath))
+    monkeypatch.setattr(students, "repository", StudentRepository(store))
+    monkeypatch.setattr(students, "responseCache", ResponseCache())
+    yield store
+    store.writer.Stop()
+
+@pytest.mark.asyncio
+async def test_get_all_students():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/students")
+        assert response.status_code == 200
+        assert [s["id"] for s in response.json()["students"]] == [1, 2]
+
+@pytest.mark.asyncio
+async def test_create_update_delete_student(TempStore):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        payload = {
+            "id": 3,
+            "name": "Nihil S",
+            "age": 21,
+            "courses": [{"code": "CS202", "name": "Data Structures", "grade": "A"}],
+            "contact": {"email": "nihil@example.com", "phone": "111-222-3333"}
+        }
+        response = await client.post("/api/students", json=payload)
+        assert response.status_code == 200
+
+        response = await client.put("/api/students/3", json={"courseCode": "CS202", "newGrade": "B"})
+        assert response.status_code == 200
+
+        response = await client.get("/api/students", params={"studentId": 3})
+        assert response.json()["courses"][0]["grade"] == "B"
+
+        response = await client.delete("/api/students/3")
+        assert response.status_code == 200
+
+        response = await client.get("/api/students", params={"studentId": 3})
+        assert response.status_code == 404
+
+    # Changes survive a reload of the data file and journal
+    reloaded = StudentStore(TempStore.filename)
+    reloaded.Load()
+    assert list(reloaded.students) == [1, 2]
+    assert reloaded.journalLength == 3
+
+@pytest.mark.asyncio
+async def test_duplicate_student_rejected():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/students", params={"studentId": 1})
+        response = await client.post("/api/students", json=response.json())
+        assert response.status_code == 400
+        assert "already exists" in response.text
+
+@pytest.mark.asyncio
+async def test_paged_students_with_fields():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/students", params={"limit": 1, "fields": "id,name"})
+        assert response.status_code == 200
+        assert response.json() == {"students": [{"id": 1, "name": "John Smith"}], "nextCursor": 1}
+
+        response = await client.get("/api/students", params={"limit": 1, "cursor": 1, "fields": "id"})
+        assert response.json() == {"students": [{"id": 2}], "nextCursor": None}
+
+        response = await client.get("/api/students", params={"limit": 0})
+        assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_bulk_create_students(TempStore):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        batch = [
+            {"id": 3, "name": "A", "age": 20, "courses": [], "contact": {}},
+            {"id": 4, "name": "B", "age": "not a number", "courses": [], "contact": {}},
+            {"id": 2, "name": "Taken", "age": 20, "courses": [], "contact": {}},
+            {"id": 5, "name": "C", "age": 20, "courses": [], "contact": {}},
+        ]
+        response = await client.post("/api/students/bulk", json=batch)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["added"] == 2
+        assert [e["index"] for e in body["errors"]] == [1, 2]
+        assert list(TempStore.students) == [1, 2, 3, 5]
+        assert TempStore.journalLength == 2
+
+@pytest.mark.asyncio
+async def test_bulk_update_grades(TempStore):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        updates = [
+            {"studentId": 1, "courseCode": "CS101", "newGrade": "B"},
+            {"studentId": 2, "courseCode": "CS101"},
+            {"studentId": 999, "courseCode": "CS101", "newGrade": "A"},
+            {"studentId": 2, "courseCode": "CS101", "newGrade": "C"},
+        ]
+        response = await client.patch("/api/students/grades", json=updates)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["updated"] == 2
+        assert [(e["index"], e["studentId"]) for e in body["errors"]] == [(1, 2), (2, 999)]
+        assert [TempStore.Get(i)["courses"][0]["grade"] for i in (1, 2)] == ["B", "C"]
+        assert TempStore.journalLength == 2
+
+@pytest.mark.asyncio
+async def test_course_stats():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/courses/CS101/stats")
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["code"] == "CS101"
+        assert stats["enrolled"] == 2
+        assert sum(stats["grades"].values()) == 2
+
+        response = await client.delete("/api/students/1")
+        response = await client.get("/api/courses/CS101/stats")
+        assert response.json()["enrolled"] == 1
+
+        response = await client.get("/api/courses/XX999/stats")
+        assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_etag_not_modified_until_change():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/students")
+        etag = response.headers["etag"]
+        assert etag.startswith('"')
+
+        response = await client.get("/api/students", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = await client.get("/api/students", params={"studentId": 1}, headers={"If-None-Match": f'"x", W/{etag}'})
+        assert response.status_code == 304
+
+        await client.put("/api/students/1", json={"courseCode": "CS101", "newGrade": "B"})
+        response = await client.get("/api/students", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+@pytest.mark.asyncio
+async def test_encoded_responses_cached_until_change(TempStore, monkeypatch):
+    calls = []
+    courseStudents = TempStore.CourseStudents
+    monkeypatch.setattr(TempStore, "CourseStudents", lambda code: calls.append(code) or courseStudents(code))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/api/students", params={"courseCode": "CS101"})
+        assert first.headers["content-type"] == "application/json"
+
+        # A repeat of the same shape is served without reading the store
+        second = await client.get("/api/students", params={"courseCode": "CS101"})
+        assert second.content == first.content
+        assert len(calls) == 1
+
+        await client.put("/api/students/1", json={"courseCode": "CS101", "newGrade": "F"})
+        third = await client.get("/api/students", params={"courseCode": "CS101"})
+        assert third.json()[0]["courses"][0]["grade"] == "F"
+        assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_search_students():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/students/search", params={"q": "emma", "fields": "id,name"})
+        assert response.status_code == 200
+        assert response.json() == {"students": [{"id": 2, "name": "Emma Wilson"}]}
+
+        response = await client.get("/api/students/search", params={"q": "JOHN.SMITH@"})
+        assert [s["id"] for s in response.json()["students"]] == [1]
+
+        response = await client.get("/api/students/search", params={"q": "emma", "limit": 0})
+        assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_student_events_stream():
+    response = await students.StreamStudentEvents()
+    assert response.media_type == "text/event-stream"
+    events = response.body_iterator
+    assert await events.__anext__() == b"retry: 3000\n\n"
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.put("/api/students/1", json={"courseCode": "CS101", "newGrade": "B"})
+        await client.delete("/api/students/2")
+        await client.delete("/api/students/2")
+
+    assert await events.__anext__() == (
+        b'id: 1\nevent: updated\ndata: {"studentId":1,"courseCode":"CS101","grade":"B"}\n\n'
+    )
+    # The failed second delete publishes nothing
+    assert await events.__anext__() == b'id: 2\nevent: deleted\ndata: {"studentId":2}\n\n'
+    await events.aclose()
+    assert not students.repository.events.subscriptions
+
+@pytest.mark.asyncio
+async def test_slow_event_subscriber_disconnected():
+    hub = students.repository.events
+    hub.bufferSize = 2
+    slow, fast = hub.Subscribe(), hub.Subscribe()
+    for studentId in (10, 11, 12):
+        hub.Removed(studentId)
+        if studentId != 12:
+            await fast.Next(1)
+
+    # The slow subscriber fell 2 events behind and was dropped; the other was not
+    assert slow.closed and await slow.Next(1) is None
+    assert hub.subscriptions == {fast}
+    assert await fast.Next(1) == b'id: 3\nevent: deleted\ndata: {"studentId":12}\n\n'
+    assert await fast.Next(0.01) == b": keepalive\n\n"
+
+@pytest.mark.asyncio
+async def test_student_changes_since_etag():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        etag = (await client.get("/api/students")).headers["etag"]
+        await client.put("/api/students/2", json={"courseCode": "CS101", "newGrade": "C"})
+        await client.delete("/api/students/1")
+
+        response = await client.get("/api/students/changes", params={"since": etag, "fields": "id,courses"})
+        assert response.status_code == 200
+        body = response.json()
+        [student] = body["students"]
+        assert set(student) == {"id", "courses"} and student["id"] == 2
+        assert {"code": "CS101", "grade": "C"}.items() <= next(
+            c for c in student["courses"] if c["code"] == "CS101").items()
+        assert body["deleted"] == [1]
+
+        # Nothing changed since the returned version
+        response = await client.get("/api/students/changes", params={"since": body["version"]})
+        assert response.json() == {"version": body["version"], "students": [], "deleted": []}
+
+        response = await client.get("/api/students/changes")
+        assert response.json() == {"version": body["version"], "resync": True}
@@ -10,18 +10,82 @@ export const getStudents = async (params = {}) => {
   return res.data;
 };
 
+// Get one page of students ordered by ID.
+// Pass the returned nextCursor back as cursor to fetch the following page;
+// fields (e.g. 'id,name') limits the properties returned for each student.
+export const getStudentsPage = async ({ limit = 50, cursor, fields } = {}) => {
+  const res = await API.get('/students', { params: { limit, cursor, fields } });
+  return res.data;
+};
+
+// Enrollment count, grade distribution and average age for a course
+export const getCourseStats = async (courseCode) => {
+  const res = await API.get(`/courses/${encodeURIComponent(courseCode)}/stats`);
+  return res.data;
+};
+
+// Search students by name or email as the user types; returns
+// { students } ranked best first
+export const searchStudents = async (q, { limit = 20, fields } = {}) => {
+  const res = await API.get('/students/search', { params: { q, limit, fields } });
+  return res.data;
+};
+
 // Add a new student
 export const addStudent = async (student) => {
   const res = await API.post('/students', student);
   return res.data;
 };
 
+// Add a batch of students in one request; returns how many were added
+// and an error entry (with its batch index) for each rejected student
+export const addStudentsBulk = async (students) => {
+  const res = await API.post('/students/bulk', students);
+  return res.data;
+};
+
 // Edit a student's grade for a course
 export const editStudentGrade = async (studentId, courseCode, newGrade) => {
   const res = await API.put(`/students/${studentId}`, { courseCode, newGrade });
   return res.data;
 };
 
+// Publish a batch of grades in one request; updates are
+// { studentId, courseCode, newGrade } objects. Returns how many were
+// updated and an error entry (with its batch index) for each rejected update
+export const editStudentGrades = async (updates) => {
+  const res = await API.patch('/students/grades', updates);
+  return res.data;
+};
+
+// Get the students changed since a version (from an earlier response, or
+// the ETag of getStudents). Returns { version, students, deleted }, or
+// { version, resync: true } when the client should reload everything
+export const getStudentChanges = async (since, fields) => {
+  const res = await API.get('/students/changes', { params: { since, fields } });
+  return res.data;
+};
+
+// Listen for student changes pushed by the server. onEvent receives
+// ('added', { student }), ('updated', { studentId, courseCode, grade }) or
+// ('deleted', { studentId }); onResync is called when events may have been
+// missed (after a reconnect or when the server dropped a slow client), so
+// the caller should reload. Returns a function that closes the stream.
+export const subscribeStudentEvents = (onEvent, onResync) => {
+  const source = new EventSource(`${API.defaults.baseURL}/students/events`);
+  let connected = false;
+  ['added', 'updated', 'deleted'].forEach(kind => {
+    source.addEventListener(kind, e => onEvent(kind, JSON.parse(e.data)));
+  });
+  source.onopen = () => {
+    if (connected) onResync();
+    connected = true;
+  };
+  // The server closes the stream after an overflow event; EventSource reconnects
+  source.addEventListener('overflow', onResync);
+  return () => source.close();
+};
+
 // Delete a student
 export const deleteStudent = async (studentId) => {
   const res = await API.delete(`/students/${studentId}`);
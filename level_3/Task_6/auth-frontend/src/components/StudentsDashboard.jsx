@@ -1,15 +1,22 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import {
   Box, Typography, Button, Paper, Table, TableBody, TableCell, TableContainer, TableHead, TableRow, 
   Dialog, DialogTitle, DialogContent, DialogActions, TextField, Select, MenuItem, InputLabel, 
   FormControl, Alert, Chip, Card, CardContent, Grid, Snackbar, CircularProgress,
   FormGroup, FormControlLabel, Checkbox, Divider
 } from '@mui/material';
-import { getStudents, addStudent, editStudentGrade, deleteStudent } from '@/api/students';
+import {
+  getStudents, getStudentsPage, addStudent, editStudentGrade, deleteStudent, subscribeStudentEvents
+} from '@/api/students';
+
+// Number of students fetched per page
+const PAGE_SIZE = 50;
 
 const StudentsDashboard = () => {
   const [students, setStudents] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
   const [openAdd, setOpenAdd] = useState(false);
@@ -38,30 +45,78 @@ const StudentsDashboard = () => {
     setLoading(true);
     setError('');
     try {
-      // Always fetch all students
-      const data = await getStudents();
-      const allStudents = data.students || [];
-      
-      // If filter is applied, filter students who have the selected course
       if (filter) {
-        const filteredStudents = allStudents.filter(student => 
-          student.courses?.some(course => course.code === filter)
-        );
-        setStudents(filteredStudents);
+        // Let the server look up the students enrolled in the selected course
+        setStudents(await getStudents({ courseCode: filter }));
+        setNextCursor(null);
       } else {
-        setStudents(allStudents);
+        // Fetch the first page of students; more are loaded on demand
+        const data = await getStudentsPage({ limit: PAGE_SIZE });
+        setStudents(data.students || []);
+        setNextCursor(data.nextCursor);
       }
     } catch (err) {
-      setError('Failed to fetch students: ' + (err.response?.data?.detail || err.message));
+      // The server answers 404 when nobody is enrolled in the course
+      if (!(filter && err.response?.status === 404)) {
+        setError('Failed to fetch students: ' + (err.response?.data?.detail || err.message));
+      }
       setStudents([]);
+      setNextCursor(null);
     }
     setLoading(false);
   };
 
+  const loadMoreStudents = async () => {
+    setLoadingMore(true);
+    try {
+      const data = await getStudentsPage({ limit: PAGE_SIZE, cursor: nextCursor });
+      setStudents(prev => [...prev, ...(data.students || [])]);
+      setNextCursor(data.nextCursor);
+    } catch (err) {
+      setError('Failed to fetch students: ' + (err.response?.data?.detail || err.message));
+    }
+    setLoadingMore(false);
+  };
+
   useEffect(() => {
     fetchStudents(filterCourse);
   }, [filterCourse]);
 
+  // Apply a change to the loaded list: changes made here as soon as they
+  // succeed, and changes pushed by the server. Applying one twice is harmless,
+  // so changes made here do not depend on the event stream (which only
+  // carries changes made through the server process it is connected to)
+  const viewRef = useRef({ filterCourse, nextCursor });
+  viewRef.current = { filterCourse, nextCursor };
+
+  const applyChange = (kind, data) => {
+    const { filterCourse, nextCursor } = viewRef.current;
+    if (kind === 'added') {
+      const { student } = data;
+      if (filterCourse && !student.courses.some(c => c.code === filterCourse)) return;
+      // Students past the loaded pages show up when those pages are loaded
+      if (!filterCourse && nextCursor !== null && student.id > nextCursor) return;
+      setStudents(prev => prev.some(s => s.id === student.id)
+        ? prev
+        : [...prev, student].sort((a, b) => a.id - b.id));
+    } else if (kind === 'updated') {
+      setStudents(prev => prev.map(s => {
+        if (s.id !== data.studentId) return s;
+        // Like the server, only the first matching course is updated
+        const index = s.courses.findIndex(c => c.code === data.courseCode);
+        return index < 0 ? s : {
+          ...s, courses: s.courses.map((c, i) => i === index ? { ...c, grade: data.grade } : c)
+        };
+      }));
+    } else if (kind === 'deleted') {
+      setStudents(prev => prev.filter(s => s.id !== data.studentId));
+    }
+  };
+
+  useEffect(() => {
+    return subscribeStudentEvents(applyChange, () => fetchStudents(viewRef.current.filterCourse));
+  }, []);
+
   const handleOpenAdd = () => {
     setAddForm({ id: '', name: '', age: '', contact: { email: '', phone: '' } });
     setSelectedCourses({});
@@ -114,16 +169,17 @@ const StudentsDashboard = () => {
         };
       });
 
-      await addStudent({
+      const student = {
         id: Number(addForm.id),
         name: addForm.name,
         age: Number(addForm.age),
         courses,
         contact: addForm.contact
-      });
+      };
+      await addStudent(student);
+      applyChange('added', { student });
       setOpenAdd(false);
       setSuccess('Student added successfully!');
-      fetchStudents(filterCourse);
     } catch (err) {
       setError('Failed to add student: ' + (err.response?.data?.detail || err.message));
     }
@@ -144,9 +200,9 @@ const StudentsDashboard = () => {
         return;
       }
       await editStudentGrade(selectedStudent.id, selectedCourse, grade);
+      applyChange('updated', { studentId: selectedStudent.id, courseCode: selectedCourse, grade });
       setOpenEdit(false);
       setSuccess('Grade updated successfully!');
-      fetchStudents(filterCourse);
     } catch (err) {
       setError('Failed to update grade: ' + (err.response?.data?.detail || err.message));
     }
@@ -156,8 +212,8 @@ const StudentsDashboard = () => {
     if (!window.confirm('Are you sure you want to delete this student?')) return;
     try {
       await deleteStudent(studentId);
+      applyChange('deleted', { studentId });
       setSuccess('Student deleted successfully!');
-      fetchStudents(filterCourse);
     } catch (err) {
       setError('Failed to delete student: ' + (err.response?.data?.detail || err.message));
     }
@@ -214,7 +270,7 @@ const StudentsDashboard = () => {
             <Grid item xs={12} sm={3}>
               <Box sx={{ display: 'flex', flexDirection: 'column', gap: 1, textAlign: 'right' }}>
                 <Typography variant="body2" color="text.secondary">
-                  Total Students: {students.length}
+                  Students Shown: {students.length}{nextCursor !== null ? '+' : ''}
                 </Typography>
                 {filterCourse && (
                   <Chip 
@@ -317,6 +373,14 @@ const StudentsDashboard = () => {
               </Table>
             </TableContainer>
           )}
+
+          {!loading && nextCursor !== null && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+              <Button variant="outlined" onClick={loadMoreStudents} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load More'}
+              </Button>
+            </Box>
+          )}
         </CardContent>
       </Card>
 